@@ -0,0 +1,38 @@
+"""
+Compares the installed JSON decoder backends on large /runs and /protocols response bodies, including wrapping the
+decoded data in RunInfo and ProtocolInfo objects.
+
+Usage: python benchmarks/bench_decoding.py
+"""
+import json
+from timeit import repeat
+
+from opentrons_http_api.decoders import available_decoders
+from opentrons_http_api.defs.dict_data import RunInfo, ProtocolInfo
+from opentrons_http_api.utils.fake_robot import run_data, protocol_data
+
+
+NUM_RUNS = 200
+NUM_PROTOCOLS = 20
+NUM_COMMANDS = 2000
+REPEATS = 5
+
+
+def main():
+    bodies = {
+        '/runs': (json.dumps({'data': [run_data(i) for i in range(NUM_RUNS)]}).encode(), RunInfo),
+        '/protocols': (json.dumps({'data': [protocol_data(i, NUM_COMMANDS) for i in range(NUM_PROTOCOLS)]}).encode(),
+                       ProtocolInfo),
+    }
+
+    for path, (body, cls) in bodies.items():
+        print(f'{path} ({len(body) / 1e6:.1f} MB)')
+        for name, decode in available_decoders().items():
+            decode_s = min(repeat(lambda: decode(body), number=1, repeat=REPEATS))
+            wrap_s = min(repeat(lambda: tuple(cls.from_dict(d) for d in decode(body)['data']),
+                                number=1, repeat=REPEATS))
+            print(f'  {name:<8} decode {decode_s * 1e3:8.2f} ms, decode and wrap {wrap_s * 1e3:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
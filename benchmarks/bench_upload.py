@@ -0,0 +1,98 @@
+"""
+Compares uploading a large protocol bundle with requests' in memory multipart encoding (as used before streaming
+uploads) against the streaming MultipartEncoder used by API.post_protocols, measuring throughput and peak memory against
+a local server that discards the request body.
+
+Usage: python benchmarks/bench_upload.py [total MB]
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+import requests
+
+from opentrons_http_api.api import API
+
+
+NUM_FILES = 5
+CHUNK_SIZE = 1024 * 1024
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        remaining = int(self.headers['Content-Length'])
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(CHUNK_SIZE, remaining)))
+
+        body = json.dumps({'data': {'id': 'protocol_123'}}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _peak_rss_mb() -> float:
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _upload(mode: str, port: int, paths: list) -> None:
+    """
+    Upload the files once in this process, and print the results as JSON.
+    """
+    api = API('localhost', port=port)
+    files = [open(path, 'rb') for path in paths]
+    size = sum(os.path.getsize(path) for path in paths)
+
+    rss_before = _peak_rss_mb()
+    start = perf_counter()
+    if mode == 'files':
+        response = requests.post(api._url('/protocols'), headers=API._HEADERS, files=[('files', f) for f in files])
+        response.raise_for_status()
+    else:
+        api.post_protocols(files)
+    duration = perf_counter() - start
+
+    print(json.dumps({'mode': mode, 'MB/s': size / 1e6 / duration, 'peak RSS increase MB': _peak_rss_mb() - rss_before}))
+
+
+def main(total_mb: int):
+    server = ThreadingHTTPServer(('localhost', 0), _SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(NUM_FILES):
+            path = os.path.join(directory, f'labware_{i}.json')
+            with open(path, 'wb') as f:
+                for _ in range(total_mb // NUM_FILES):
+                    f.write(os.urandom(1024 * 1024))
+            paths.append(path)
+
+        print(f'Uploading {NUM_FILES} files, {total_mb} MB in total')
+        for mode in ('files', 'stream'):
+            # Run each upload in a fresh process so that peak memory is measured separately
+            output = subprocess.run([sys.executable, __file__, '--upload', mode, str(port), *paths],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output)
+            print(f'  {mode:<7} {result["MB/s"]:8.1f} MB/s, peak RSS increase {result["peak RSS increase MB"]:7.1f} MB')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--upload']:
+        _upload(sys.argv[2], int(sys.argv[3]), sys.argv[4:])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,194 @@
+"""
+Benchmarks the client against local FakeRobot servers, covering request rate and latency, memory per RunInfo, parse
+time for a large /runs list and concurrent fan-out over a fleet. Results are saved to benchmarks/results/ and compared
+with the previous results, flagging any that are worse by more than a threshold.
+
+The fan-out benchmark serves each fake robot on its own loopback address, 127.0.0.2 and up, which only Linux routes by
+default. Elsewhere it's skipped unless the addresses are added as loopback aliases, e.g. on macOS with
+"sudo ifconfig lo0 alias 127.0.0.2 up" for each address.
+
+Usage: python benchmarks/run_benchmarks.py [--threshold 0.2] [--latency 0.002]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from statistics import quantiles
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from opentrons_http_api.api import API
+from opentrons_http_api.defs.dict_data import RunInfo
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.fleet import Fleet
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot, run_data
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+NUM_CALLS = 500
+NUM_RUNS = 2000
+NUM_RUN_INFOS = 10000
+NUM_ROBOTS = 8
+NUM_FLEET_CALLS = 20
+
+# Benchmark name to its value, unit and whether higher values are better
+Results = Dict[str, Dict[str, object]]
+
+
+def _result(results: Results, name: str, value: float, unit: str, higher_is_better: bool = False) -> None:
+    results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+    print(f'  {name:<36} {value:12.3f} {unit}')
+
+
+def _time_calls(call: Callable[[], object], n: int) -> List[float]:
+    times = []
+    for _ in range(n):
+        start = perf_counter()
+        call()
+        times.append(perf_counter() - start)
+    return times
+
+
+def bench_health(results: Results, latency: float) -> None:
+    """
+    Calls per second and p50/p99 latency of GET /health with pooled connections, against a new connection per call.
+    """
+    with FakeRobot(latency=latency) as robot, API(robot.host, port=robot.port) as api:
+        url = f'http://{robot.host}:{robot.port}{Paths.HEALTH}'
+        calls = {
+            'pooled': api.get_health,
+            'unpooled': lambda: requests.get(url).json(),
+        }
+        for name, call in calls.items():
+            call()
+            times = _time_calls(call, NUM_CALLS)
+            percentiles = quantiles(times, n=100)
+            _result(results, f'health_{name}_calls_per_s', len(times) / sum(times), 'calls/s', True)
+            _result(results, f'health_{name}_p50_ms', percentiles[49] * 1e3, 'ms')
+            _result(results, f'health_{name}_p99_ms', percentiles[98] * 1e3, 'ms')
+
+
+def bench_run_info_memory(results: Results) -> None:
+    """
+    Memory allocated per RunInfo wrapping a decoded run, excluding the decoded data itself.
+    """
+    data = [run_data(i) for i in range(NUM_RUN_INFOS)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    runs = [RunInfo.from_dict(d) for d in data]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    _result(results, 'run_info_bytes', (after - before) / len(runs), 'B')
+
+
+def bench_runs_parse(results: Results) -> None:
+    """
+    Time to fetch, decode and wrap a large /runs list.
+    """
+    with FakeRobot(num_runs=NUM_RUNS) as robot, RobotClient(robot.host, port=robot.port) as client:
+        client.runs()
+        times = _time_calls(client.runs, 10)
+
+    _result(results, f'runs_{NUM_RUNS}_ms', min(times) * 1e3, 'ms')
+
+
+def bench_fan_out(results: Results, latency: float) -> None:
+    """
+    Time to call GET /health on a fleet of robots concurrently, against calling each robot in turn. Each robot listens
+    on its own loopback address with the same port, since Fleet uses one port for all hosts.
+    """
+    robots = [FakeRobot('127.0.0.1', latency=latency)]
+    robots[0].start()
+    try:
+        for i in range(2, NUM_ROBOTS + 1):
+            try:
+                robot = FakeRobot(f'127.0.0.{i}', port=robots[0].port, latency=latency)
+            except OSError:
+                print(f'  skipped fan_out, since 127.0.0.{i} is not a loopback address on this system')
+                return
+            robot.start()
+            robots.append(robot)
+
+        with Fleet([robot.host for robot in robots], port=robots[0].port) as fleet:
+            fleet.health()
+            fleet_times = _time_calls(fleet.health, NUM_FLEET_CALLS)
+            sequential_times = _time_calls(lambda: [fleet.client(host).health() for host in fleet.hosts],
+                                           NUM_FLEET_CALLS)
+    finally:
+        for robot in robots:
+            robot.stop()
+
+    _result(results, f'fan_out_{NUM_ROBOTS}_concurrent_ms', min(fleet_times) * 1e3, 'ms')
+    _result(results, f'fan_out_{NUM_ROBOTS}_sequential_ms', min(sequential_times) * 1e3, 'ms')
+
+
+def previous_results() -> Optional[Results]:
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(name for name in os.listdir(RESULTS_DIR) if name.endswith('.json'))
+    if not names:
+        return None
+    with open(os.path.join(RESULTS_DIR, names[-1])) as f:
+        return json.load(f)
+
+
+def compare(results: Results, previous: Results, threshold: float) -> List[str]:
+    """
+    Get the names of results that are worse than the previous results by more than threshold, as a fraction.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in previous:
+            continue
+        value, previous_value = result['value'], previous[name]['value']
+        change = (value - previous_value) / previous_value if previous_value else 0.
+        if result['higher_is_better']:
+            change = -change
+        if change > threshold:
+            regressions.append(name)
+            print(f'  {name:<36} {previous_value:12.3f} -> {value:.3f} {result["unit"]} ({change:+.0%} worse)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction by which a result must be worse than before to be a regression')
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds each fake robot waits per request')
+    args = parser.parse_args()
+
+    results: Results = {}
+    print('Running benchmarks')
+    bench_health(results, args.latency)
+    bench_run_info_memory(results)
+    bench_runs_parse(results)
+    bench_fan_out(results, args.latency)
+
+    previous = previous_results()
+    regressions = []
+    if previous is not None:
+        print('Regressions')
+        regressions = compare(results, previous, args.threshold)
+        if not regressions:
+            print('  none')
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{datetime.now().strftime("%Y%m%d-%H%M%S")}.json')
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Saved results to {path}')
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
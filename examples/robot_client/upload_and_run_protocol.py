@@ -1,5 +1,3 @@
-from time import sleep
-
 from opentrons_http_api.robot_client import RobotClient, Action
 
 
@@ -16,9 +14,10 @@ with open('../example_protocol.py', 'rb') as f:
 run_info = robot.create_run(protocol_info.id)
 robot.action_run(run_info.id, Action.PLAY)
 
-# Poll run status
-while not run_info.status_.is_done:
-    run_info = robot.run(run_info.id)
-    print(run_info.status, [(error.errorType, error.detail)
-                            for error in run_info.errors_])
-    sleep(1)
+# Watch run status until done
+for old_status, new_status in robot.watch_run(run_info.id):
+    print(old_status, '->', new_status)
+
+run_info = robot.run(run_info.id)
+print(run_info.status, [(error.errorType, error.detail)
+                        for error in run_info.errors_])
@@ -1,5 +1,7 @@
+from io import BytesIO
+
 from opentrons_http_api.robot_client import RobotClient
-from opentrons_http_api.utils.parameterize_protocol import parameterize_protocol, Parameter
+from opentrons_http_api.utils.parameterize_protocol import ProtocolTemplate, Parameter
 
 
 ROBOT_IP = 'localhost'
@@ -11,9 +13,10 @@ PARAMS = (
 
 robot = RobotClient(ROBOT_IP)
 
-# Doesn't work with buffer_out as a BytesIO or tempfile object
-with open('_temp.py', 'w+b') as buffer_out:
-    with open('../example_parameterized_protocol.py', 'rb') as buffer_in:
-        parameterize_protocol(buffer_in, buffer_out, PARAMS)
+with open('../example_parameterized_protocol.py', 'rb') as f:
+    template = ProtocolTemplate(f.read())
 
-    print(robot.upload_protocol(buffer_out))
+# The robot requires the file name to end in .py
+protocol = BytesIO(template.render(PARAMS))
+protocol.name = 'example_parameterized_protocol.py'
+print(robot.upload_protocol(protocol))
@@ -1,9 +1,23 @@
-from typing import Sequence, BinaryIO, Optional
-import urllib
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from functools import partial
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, Collection, Hashable, Sequence, BinaryIO, Callable, Optional, Union, Tuple
+from urllib.parse import urljoin
 
-import requests
+from opentrons_http_api.decoders import Decoder, get_decoder
+from opentrons_http_api.defs.paths import Paths, path_template
+from opentrons_http_api.resilience import CircuitBreaker, RetryPolicy
 
-from opentrons_http_api.defs.paths import Paths
+# Imported when first used, so that importing this module is fast enough for short-lived processes
+if TYPE_CHECKING:
+    import requests
+
+    from opentrons_http_api.cache import ResponseCache
+    from opentrons_http_api.instrumentation import Instrumentation, RequestMetrics
+    from opentrons_http_api.single_flight import SingleFlight
+    from opentrons_http_api.utils.multipart import ProgressCallback
 
 
 class API:
@@ -16,36 +30,279 @@ class API:
     _PORT = 31950
     _BASE = 'http://{host}:{port}'
 
-    def __init__(self, host: str = 'localhost'):
-        self._base = self._BASE.format(host=host, port=self._PORT)
+    _RETRY_STATUSES = (502, 503, 504)
+    # (connect, read) timeout in seconds, so that an unreachable or unresponsive robot can't block a caller forever
+    _TIMEOUT = (5., 60.)
+    # Number of responses to POSTs with a dedup key to remember
+    _DEDUP_SIZE = 256
+
+    # GET endpoints that are commonly polled by many callers at once, e.g. dashboards, for use as coalesce
+    COALESCED_PATHS = (Paths.HEALTH, Paths.ROBOT_LIGHTS, Paths.RUNS, Paths.RUNS_RUN_ID, Paths.RUNS_RUN_ID_COMMANDS)
+
+    TRANSPORTS = ('requests', 'minimal')
+
+    def __init__(self, host: str = 'localhost', port: int = _PORT, pool_maxsize: int = 10, retries: int = 0,
+                 backoff_factor: float = 0.5, timeout: Optional[Union[float, Tuple[float, float]]] = _TIMEOUT,
+                 decoder: Optional[Union[str, Decoder]] = None, cache: Optional[ResponseCache] = None,
+                 instrumentation: Optional[Instrumentation] = None, transport: str = 'requests',
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 coalesce: Collection[str] = ()):
+        """
+        Requests are sent over a persistent session, so connections to the robot are kept alive and reused between
+        calls. Call close() when done, or use the API as a context manager.
+        :param host: Host name or IP address of the robot.
+        :param port: Port of the robot's HTTP API.
+        :param pool_maxsize: Maximum number of keep-alive connections to keep open to the robot, e.g. the number of
+        threads sharing this object.
+        :param retries: Number of times to retry idempotent requests, i.e. GETs and POSTs with a dedup key, after a
+        connection error, a timeout or a 502, 503 or 504 response.
+        :param backoff_factor: Backoff in seconds before the first retry, doubling after each retry, with jitter.
+        :param timeout: Timeout in seconds, either a single value or a (connect, read) tuple. None waits forever.
+        :param decoder: JSON decoder for responses, either a backend name ("orjson", "msgspec" or "json"), a function
+        taking bytes, or None to use the fastest installed backend.
+        :param cache: An optional cache for responses of read only endpoints.
+        :param instrumentation: Optional hooks and middleware for every request, e.g. to record metrics.
+        :param transport: "requests" to send requests with a requests session, or "minimal" to send them with the
+        standard library's http.client over a single connection, which avoids importing requests, for one-shot calls
+        from short-lived processes. The minimal transport doesn't measure connection times.
+        :param retry_policy: Optional policy for retrying idempotent requests, instead of retries and backoff_factor.
+        :param circuit_breaker: An optional circuit breaker, which can be shared with the APIs of other robots, that
+        fails requests fast with CircuitOpenError once the robot has failed too many requests in a row.
+        :param coalesce: Paths constants of GET endpoints, e.g. COALESCED_PATHS, where identical concurrent requests
+        share one request and its response, which is then shared between callers, so should not be modified.
+        """
+        self._host = host
+        self._base = self._BASE.format(host=host, port=port)
+        self._timeout = timeout
+        self._decoder = get_decoder(decoder)
+        self._cache = cache
+        self._instrumentation = instrumentation
+        self._retry_policy = RetryPolicy(retries, backoff_factor, statuses=self._RETRY_STATUSES) \
+            if retry_policy is None else retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._deduped: OrderedDict[str, dict] = OrderedDict()
+        self._deduped_lock = threading.Lock()
+        self._coalesce = frozenset(coalesce)
+        self._single_flight: Optional[SingleFlight] = None
+        if self._coalesce:
+            from opentrons_http_api.single_flight import SingleFlight as _SingleFlight
+            self._single_flight = _SingleFlight()
+
+        self._transport = transport
+        if transport == 'requests':
+            from opentrons_http_api.transport import requests_session
+            # Only measure connection times when instrumented, since it resolves host names itself
+            self._session = requests_session(pool_maxsize, timed=instrumentation is not None)
+        elif transport == 'minimal':
+            from opentrons_http_api.minimal_transport import MinimalSession
+            self._session = MinimalSession()
+        else:
+            raise ValueError(f'unknown transport "{transport}", expected one of {self.TRANSPORTS}')
+
+    def __enter__(self) -> API:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close all pooled connections to the robot.
+        """
+        self._session.close()
 
     def _url(self, path):
-        return urllib.parse.urljoin(self._base, path)
+        return urljoin(self._base, path)
 
     @staticmethod
     def _check_response(response: requests.Response):
         response.raise_for_status()
 
-    def _get(self, path: str) -> dict:
+    def _instrument(self, method: str, path: str, send: Callable[[Optional[RequestMetrics]], dict]) -> dict:
         """
+        Send a request through the instrumentation, if any.
+        :param method: The HTTP method.
         :param path: Path to call (not the full URL).
+        :param send: A function that sends the request and returns the decoded response, filling in the metrics if
+        given.
+        """
+        if self._instrumentation is None:
+            return send(None)
+
+        from opentrons_http_api.instrumentation import RequestMetrics as _RequestMetrics
+        metrics = _RequestMetrics(self._host, method, path_template(path))
+        start = perf_counter()
+        try:
+            return self._instrumentation.wrap(metrics, partial(send, metrics))()
+        except Exception as e:
+            metrics.error = e
+            raise
+        finally:
+            metrics.total = perf_counter() - start
+            # Responses served from the cache without a request have no status
+            if metrics.status is not None or metrics.error is not None:
+                self._instrumentation.record(metrics)
+
+    @staticmethod
+    def _is_connection_error(error: Exception) -> bool:
+        """
+        Whether a request failed to get a response, i.e. raised a connection error or timeout.
+        """
+        import requests as _requests
+        return isinstance(error, (_requests.ConnectionError, _requests.Timeout))
+
+    def _record(self, failed: bool) -> None:
+        """
+        Record the result of a request in the circuit breaker, if any.
+        """
+        if self._circuit_breaker is not None:
+            if failed:
+                self._circuit_breaker.record_failure(self._host)
+            else:
+                self._circuit_breaker.record_success(self._host)
+
+    def _deduped_response(self, dedup_key: str) -> Optional[dict]:
+        with self._deduped_lock:
+            data = self._deduped.get(dedup_key)
+            if data is not None:
+                self._deduped.move_to_end(dedup_key)
+            return data
+
+    def _dedup(self, dedup_key: str, data: dict) -> None:
+        with self._deduped_lock:
+            self._deduped[dedup_key] = data
+            if len(self._deduped) > self._DEDUP_SIZE:
+                self._deduped.popitem(last=False)
+
+    def _coalesces(self, path: str) -> bool:
+        return bool(self._coalesce) and path_template(path) in self._coalesce
+
+    @staticmethod
+    def _flight_key(path: str, query: Optional[dict]) -> Hashable:
+        return path, None if not query else tuple(sorted(query.items()))
+
+    def _send(self, method: str, path: str, metrics: Optional[RequestMetrics], idempotent: bool = False,
+              **kwargs) -> requests.Response:
+        """
+        Send a request, retrying it if idempotent according to the retry policy.
+        :raises CircuitOpenError: If the robot's circuit is open.
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.check(self._host)
+        if idempotent and method == 'POST' and self._transport == 'minimal':
+            # So that the minimal transport can also send it again on a new connection
+            kwargs['idempotent'] = True
+
+        retries = 0
+        while True:
+            try:
+                response = self._send_once(method, path, metrics, **kwargs)
+            except Exception as e:
+                if not self._is_connection_error(e):
+                    raise
+                if not (idempotent and self._retry_policy.should_retry(retries)):
+                    self._record(failed=True)
+                    raise
+            else:
+                if not (idempotent and self._retry_policy.should_retry(retries, response.status_code)):
+                    self._record(failed=response.status_code in self._retry_policy.statuses)
+                    return response
+
+            sleep(self._retry_policy.backoff(retries))
+            retries += 1
+            if metrics is not None:
+                metrics.retries = retries
+
+    def _send_once(self, method: str, path: str, metrics: Optional[RequestMetrics], **kwargs) -> requests.Response:
+        request = self._session.get if method == 'GET' else self._session.post
+        if metrics is None:
+            return request(self._url(path), timeout=self._timeout, **kwargs)
+
+        from opentrons_http_api.instrumentation import body_size, connection_timings, reset_connection_timings
+        reset_connection_timings()
+        response = request(self._url(path), timeout=self._timeout, **kwargs)
+        metrics.status = response.status_code
+        metrics.bytes_sent = body_size(response.request.body)
+        metrics.bytes_received = len(response.content)
+        metrics.dns = connection_timings.dns
+        metrics.connect = connection_timings.connect
+        metrics.ttfb = response.elapsed.total_seconds()
+        return response
+
+    def _decode(self, content: bytes, metrics: Optional[RequestMetrics]) -> dict:
+        if metrics is None:
+            return self._decoder(content)
+
+        start = perf_counter()
+        data = self._decoder(content)
+        metrics.decode = perf_counter() - start
+        return data
+
+    def _get(self, path: str, query: Optional[dict] = None) -> dict:
+        """
+        :param path: Path to call (not the full URL).
+        :param query: Parameters to use as a query.
         :return: The response as a dictionary.
         """
-        response = requests.get(self._url(path), headers=self._HEADERS)
+        get = partial(self._instrument, 'GET', path, partial(self._send_get, path, query))
+        if not self._coalesces(path):
+            return get()
+        return self._single_flight.do(self._flight_key(path, query), get)
+
+    def _send_get(self, path: str, query: Optional[dict], metrics: Optional[RequestMetrics]) -> dict:
+        cache = self._cache if self._cache is not None and query is None and self._cache.is_cached(path) else None
+
+        # Use a cached response if fresh, or else check if it is still valid
+        entry = None
+        headers = self._HEADERS
+        if cache is not None:
+            entry = cache.get(path)
+            if entry is not None:
+                if entry.is_fresh:
+                    return entry.data
+                headers = {**headers, **entry.validators()}
+
+        response = self._send('GET', path, metrics, idempotent=True, headers=headers, params=query)
+        if entry is not None and response.status_code == 304:
+            cache.renew(path)
+            return entry.data
+
         self._check_response(response)
-        return response.json()
+        data = self._decode(response.content, metrics)
+        if cache is not None:
+            cache.put(path, data, len(response.content), response.headers)
+        return data
 
-    def _post(self, path: str, query: Optional[dict] = None, body: Optional[dict] = None, **kwargs) -> dict:
+    def _post(self, path: str, query: Optional[dict] = None, body: Optional[dict] = None,
+              headers: Optional[dict] = None, dedup_key: Optional[str] = None, **kwargs) -> dict:
         """
         :param path: Path to call (not the full URL).
         :param query: Parameters to use as a query.
         :param body: A JSON serializable Python object to send in the body of the request.
-        :param kwargs: Any specific kwargs to send, e.g. "files".
+        :param headers: Any headers to send in addition to the default headers.
+        :param dedup_key: An optional key that makes the request idempotent, so that it can be retried, and a call with
+        the same key as a previous successful call returns the same response without sending the request again.
+        :param kwargs: Any specific kwargs to send, e.g. "data".
         :return: The response as a dictionary.
         """
-        response = requests.post(self._url(path), headers=self._HEADERS, params=query, json=body, **kwargs)
+        if dedup_key is not None:
+            data = self._deduped_response(dedup_key)
+            if data is not None:
+                return data
+
+        headers = self._HEADERS if headers is None else {**self._HEADERS, **headers}
+        data = self._instrument('POST', path, partial(self._send_post, path, headers=headers, params=query, json=body,
+                                                      idempotent=dedup_key is not None, **kwargs))
+        if dedup_key is not None:
+            self._dedup(dedup_key, data)
+        return data
+
+    def _send_post(self, path: str, metrics: Optional[RequestMetrics], **kwargs) -> dict:
+        response = self._send('POST', path, metrics, **kwargs)
         self._check_response(response)
-        return response.json()
+        if self._cache is not None:
+            self._cache.invalidate_post(path)
+        return self._decode(response.content, metrics)
 
     # v1
 
@@ -138,20 +395,26 @@ class API:
 
     # RUN MANAGEMENT
 
-    def get_runs(self) -> dict:
+    def get_runs(self, page_length: Optional[int] = None) -> dict:
         """
-        Get a list of all active and inactive runs.
+        Get a list of all active and inactive runs. The response links to the current run, if any.
+        :param page_length: The maximum number of runs to return, the most recent first. If omitted, all runs are
+        returned.
         """
-        return self._get(Paths.RUNS)
+        query = None if page_length is None else {'pageLength': page_length}
+        return self._get(Paths.RUNS, query=query)
 
-    def post_runs(self, data: dict) -> dict:
+    def post_runs(self, data: dict, dedup_key: Optional[str] = None) -> dict:
         """
         Create a new run to track robot interaction.
 
         When too many runs already exist, old ones will be automatically deleted to make room for the new one.
+        :param dedup_key: An optional key, unique to this run, that allows the request to be retried. Calling again with
+        the same key returns the run created by the first call rather than creating another. If the robot created the
+        run but the response was lost, the retry creates a new run, which replaces the lost one as the current run.
         """
         body = {'data': data}
-        return self._post(Paths.RUNS, body=body)
+        return self._post(Paths.RUNS, body=body, dedup_key=dedup_key)
 
     def get_runs_run_id(self, run_id: str) -> dict:
         """
@@ -160,13 +423,19 @@ class API:
         path = Paths.RUNS_RUN_ID.format(run_id=run_id)
         return self._get(path)
 
-    def get_runs_run_id_commands(self, run_id: str) -> dict:
+    def get_runs_run_id_commands(self, run_id: str, cursor: Optional[int] = None,
+                                 page_length: Optional[int] = None) -> dict:
         """
         Get a list of all commands in the run and their statuses. This endpoint returns command summaries. Use GET
         /runs/{runId}/commands/{commandId} to get all information available for a given command.
+        :param cursor: The starting index of the desired first command in the list. If omitted, the last page is
+        returned.
+        :param page_length: The maximum number of commands to return.
         """
         path = Paths.RUNS_RUN_ID_COMMANDS.format(run_id=run_id)
-        return self._get(path)
+        query = {'cursor': cursor, 'pageLength': page_length}
+        query = {key: value for key, value in query.items() if value is not None}
+        return self._get(path, query=query)
 
     def get_runs_run_id_commands_command_id(self, run_id: str, command_id: str) -> dict:
         """
@@ -183,6 +452,32 @@ class API:
         body = {'data': data}
         return self._post(path, body=body)
 
+    def post_runs_run_id_labware_offsets(self, run_id: str, data: Union[dict, Sequence[dict]]) -> dict:
+        """
+        Add a labware offset to an existing run, before the run is started.
+        :param data: The labware offset, with its definitionUri, location and vector. Robot software 8.4 and later also
+        accepts a list of offsets.
+        """
+        path = Paths.RUNS_RUN_ID_LABWARE_OFFSETS.format(run_id=run_id)
+        body = {'data': data}
+        return self._post(path, body=body)
+
+    def post_runs_run_id_labware_definitions(self, run_id: str, data: dict) -> dict:
+        """
+        Add a labware definition to a run, before the run is started, so that the run can load custom labware.
+        :param data: The labware definition.
+        """
+        path = Paths.RUNS_RUN_ID_LABWARE_DEFINITIONS.format(run_id=run_id)
+        body = {'data': data}
+        return self._post(path, body=body)
+
+    def get_runs_run_id_loaded_labware_definitions(self, run_id: str) -> dict:
+        """
+        Get the definitions of the labware loaded by a run.
+        """
+        path = Paths.RUNS_RUN_ID_LOADED_LABWARE_DEFINITIONS.format(run_id=run_id)
+        return self._get(path)
+
     # MAINTENANCE RUN MANAGEMENT
 
     # PROTOCOL MANAGEMENT
@@ -193,7 +488,7 @@ class API:
         """
         return self._get(Paths.PROTOCOLS)
 
-    def post_protocols(self, files: Sequence[BinaryIO]) -> dict:
+    def post_protocols(self, files: Sequence[BinaryIO], progress: Optional[ProgressCallback] = None) -> dict:
         """
         Upload a protocol to your device. You may include the following files:
 
@@ -202,9 +497,14 @@ class API:
 
         When too many protocols already exist, old ones will be automatically deleted to make room for the new one. A
         protocol will never be automatically deleted if there's a run referring to it, though.
+
+        Files are streamed in chunks rather than read into memory.
+        :param files: Binary file objects to upload.
+        :param progress: Optional function called with the number of bytes sent so far and the total number of bytes.
         """
-        files = tuple(('files', f) for f in files)
-        return self._post(Paths.PROTOCOLS, files=files)
+        from opentrons_http_api.utils.multipart import MultipartEncoder
+        encoder = MultipartEncoder([('files', f) for f in files], progress=progress)
+        return self._post(Paths.PROTOCOLS, headers={'Content-Type': encoder.content_type}, data=encoder)
 
     def get_protocols_protocol_id(self, protocol_id: str) -> dict:
         """
@@ -215,6 +515,41 @@ class API:
 
     # SIMPLE COMMANDS
 
+    def get_commands(self, cursor: Optional[int] = None, page_length: Optional[int] = None) -> dict:
+        """
+        Get a list of stateless commands that have been run on the robot.
+        :param cursor: The starting index of the desired first command in the list. If omitted, the last page is
+        returned.
+        :param page_length: The maximum number of commands to return.
+        """
+        query = {'cursor': cursor, 'pageLength': page_length}
+        query = {key: value for key, value in query.items() if value is not None}
+        return self._get(Paths.COMMANDS, query=query)
+
+    def post_commands(self, data: dict, wait_until_complete: bool = False, timeout: Optional[int] = None) -> dict:
+        """
+        Run a single stateless command, e.g. home or setRailLights, outside of a run. Commands are queued and run in the
+        order they were sent.
+        :param data: The command, with its commandType and params.
+        :param wait_until_complete: If True, return only once the command has succeeded or failed, or timeout has
+        elapsed. Otherwise return as soon as the command is queued.
+        :param timeout: If waiting until complete, the maximum time in milliseconds to wait before returning the
+        command, which may not be complete. Should be less than the read timeout of requests.
+        """
+        # As a string, since aiohttp doesn't accept bool parameters
+        query = {'waitUntilComplete': 'true' if wait_until_complete else 'false'}
+        if timeout is not None:
+            query['timeout'] = timeout
+        body = {'data': data}
+        return self._post(Paths.COMMANDS, query=query, body=body)
+
+    def get_commands_command_id(self, command_id: str) -> dict:
+        """
+        Get a stateless command along with any associated payload, result, and execution information.
+        """
+        path = Paths.COMMANDS_COMMAND_ID.format(command_id=command_id)
+        return self._get(path)
+
     # DECK CONFIGURATION
 
     # ATTACHED MODULES
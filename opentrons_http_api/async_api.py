@@ -0,0 +1,255 @@
+from __future__ import annotations
+import asyncio
+import threading
+from collections import OrderedDict
+from functools import partial
+from time import perf_counter
+from typing import Collection, Sequence, BinaryIO, Awaitable, Callable, Optional, Union, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from opentrons_http_api.api import API
+from opentrons_http_api.decoders import Decoder, get_decoder
+from opentrons_http_api.defs.paths import Paths, path_template
+from opentrons_http_api.instrumentation import Instrumentation, RequestMetrics
+from opentrons_http_api.resilience import CircuitBreaker, RetryPolicy
+from opentrons_http_api.single_flight import AsyncSingleFlight
+
+
+class AsyncAPI(API):
+    """
+    Basic asyncio Python client for Opentrons HTTP API. Every endpoint method of API is available with the same name
+    and arguments, but must be awaited.
+
+    Requires the optional aiohttp dependency. Use the AsyncRobotClient class for a friendlier interface.
+    """
+    def __init__(self, host: str = 'localhost', port: int = API._PORT, pool_maxsize: int = 100, retries: int = 0,
+                 backoff_factor: float = 0.5, timeout: Optional[Union[float, Tuple[float, float]]] = API._TIMEOUT,
+                 session: Optional[aiohttp.ClientSession] = None, decoder: Optional[Union[str, Decoder]] = None,
+                 instrumentation: Optional[Instrumentation] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, coalesce: Collection[str] = ()):
+        """
+        Connections to the robot are kept alive and reused between calls. Call close() when done, or use the AsyncAPI
+        as an async context manager.
+        :param host: Host name or IP address of the robot.
+        :param port: Port of the robot's HTTP API.
+        :param pool_maxsize: Maximum number of simultaneous connections to the robot, further requests wait for a free
+        connection.
+        :param retries: Number of times to retry idempotent requests, see API.
+        :param backoff_factor: Backoff in seconds before the first retry, see API.
+        :param timeout: Timeout in seconds, either a single value or a (connect, read) tuple. None waits forever.
+        :param session: An optional aiohttp session to use instead of creating one, e.g. to share a connection pool
+        between many robots. It is not closed by close().
+        :param decoder: JSON decoder for responses, see API.
+        :param instrumentation: Optional hooks and middleware for every request, see API. Middleware is passed a
+        function returning an awaitable. Connection timings and bytes sent are only measured if session is None.
+        :param retry_policy: Optional policy for retrying idempotent requests, see API.
+        :param circuit_breaker: An optional circuit breaker, see API.
+        :param coalesce: Paths constants of GET endpoints where identical concurrent requests share one request, see
+        API.
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncAPI requires aiohttp, install it with "pip install opentrons-http-api[async]"')
+
+        self._host = host
+        self._base = self._BASE.format(host=host, port=port)
+        self._pool_maxsize = pool_maxsize
+        self._timeout = timeout
+        self._session = session
+        self._owns_session = session is None
+        self._decoder = get_decoder(decoder)
+        self._instrumentation = instrumentation
+        self._retry_policy = RetryPolicy(retries, backoff_factor, statuses=self._RETRY_STATUSES) \
+            if retry_policy is None else retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._deduped: OrderedDict[str, dict] = OrderedDict()
+        self._deduped_lock = threading.Lock()
+        self._coalesce = frozenset(coalesce)
+        self._single_flight = AsyncSingleFlight() if self._coalesce else None
+
+    def __enter__(self):
+        raise TypeError('use "async with" with AsyncAPI')
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    async def __aenter__(self) -> AsyncAPI:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close all pooled connections to the robot.
+        """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _client_timeout(self) -> aiohttp.ClientTimeout:
+        if self._timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        if isinstance(self._timeout, tuple):
+            connect, read = self._timeout
+            return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=None, sock_connect=self._timeout, sock_read=self._timeout)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # The session must be created inside a running event loop
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._pool_maxsize)
+            trace_configs = None if self._instrumentation is None else [_trace_config()]
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._client_timeout(),
+                                                  trace_configs=trace_configs)
+        return self._session
+
+    async def _instrument(self, method: str, path: str,
+                          send: Callable[[Optional[RequestMetrics]], Awaitable[dict]]) -> dict:
+        if self._instrumentation is None:
+            return await send(None)
+
+        metrics = RequestMetrics(self._host, method, path_template(path))
+        start = perf_counter()
+        try:
+            return await self._instrumentation.wrap(metrics, partial(send, metrics))()
+        except Exception as e:
+            metrics.error = e
+            raise
+        finally:
+            metrics.total = perf_counter() - start
+            self._instrumentation.record(metrics)
+
+    async def _send(self, method: str, path: str, metrics: Optional[RequestMetrics], idempotent: bool = False,
+                    **kwargs) -> dict:
+        """
+        Send a request, retrying it if idempotent according to the retry policy.
+        :raises CircuitOpenError: If the robot's circuit is open.
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.check(self._host)
+
+        retries = 0
+        while True:
+            try:
+                data = await self._send_once(method, path, metrics, **kwargs)
+            except aiohttp.ClientResponseError as e:
+                if not (idempotent and self._retry_policy.should_retry(retries, e.status)):
+                    self._record(failed=e.status in self._retry_policy.statuses)
+                    raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not (idempotent and self._retry_policy.should_retry(retries)):
+                    self._record(failed=True)
+                    raise
+            else:
+                self._record(failed=False)
+                return data
+
+            await asyncio.sleep(self._retry_policy.backoff(retries))
+            retries += 1
+            if metrics is not None:
+                metrics.retries = retries
+
+    async def _send_once(self, method: str, path: str, metrics: Optional[RequestMetrics], **kwargs) -> dict:
+        # The metrics are filled in by the session's trace config, if any
+        trace = {} if metrics is None else {'trace_request_ctx': metrics}
+        async with self._get_session().request(method, self._url(path), **kwargs, **trace) as response:
+            if metrics is not None:
+                metrics.status = response.status
+            self._check_response(response)
+            content = await response.read()
+            if metrics is not None:
+                metrics.bytes_received = len(content)
+            return self._decode(content, metrics)
+
+    async def _get(self, path: str, query: Optional[dict] = None) -> dict:
+        """
+        :param path: Path to call (not the full URL).
+        :param query: Parameters to use as a query.
+        :return: The response as a dictionary.
+        """
+        get = partial(self._instrument, 'GET', path, partial(self._send, 'GET', path, idempotent=True,
+                                                             headers=self._HEADERS, params=query))
+        if not self._coalesces(path):
+            return await get()
+        return await self._single_flight.do(self._flight_key(path, query), get)
+
+    async def _post(self, path: str, query: Optional[dict] = None, body: Optional[dict] = None,
+                    headers: Optional[dict] = None, dedup_key: Optional[str] = None, **kwargs) -> dict:
+        """
+        :param path: Path to call (not the full URL).
+        :param query: Parameters to use as a query.
+        :param body: A JSON serializable Python object to send in the body of the request.
+        :param headers: Any headers to send in addition to the default headers.
+        :param dedup_key: An optional key that makes the request idempotent, see API._post.
+        :param kwargs: Any specific kwargs to send, e.g. "data".
+        :return: The response as a dictionary.
+        """
+        if dedup_key is not None:
+            data = self._deduped_response(dedup_key)
+            if data is not None:
+                return data
+
+        headers = self._HEADERS if headers is None else {**self._HEADERS, **headers}
+        data = await self._instrument('POST', path, partial(self._send, 'POST', path, headers=headers, params=query,
+                                                            json=body, idempotent=dedup_key is not None, **kwargs))
+        if dedup_key is not None:
+            self._dedup(dedup_key, data)
+        return data
+
+    # PROTOCOL MANAGEMENT
+
+    async def post_protocols(self, files: Sequence[BinaryIO]) -> dict:
+        """
+        Upload a protocol to your device. See API.post_protocols. Files are streamed in chunks by aiohttp.
+        """
+        data = aiohttp.FormData()
+        for f in files:
+            data.add_field('files', f)
+        return await self._post(Paths.PROTOCOLS, data=data)
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """
+    A trace config that fills in the connection timings, bytes sent and time to first byte of the RequestMetrics passed
+    to a request as its trace_request_ctx.
+    """
+    async def on_request_start(_, context, __):
+        context.request_start = perf_counter()
+
+    async def on_connection_create_start(_, context, __):
+        context.connection_start = perf_counter()
+
+    async def on_dns_resolvehost_start(_, context, __):
+        context.dns_start = perf_counter()
+
+    async def on_dns_resolvehost_end(_, context, __):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.dns = perf_counter() - context.dns_start
+
+    async def on_connection_create_end(_, context, __):
+        # Creating a connection includes resolving the host name, if not cached
+        metrics = context.trace_request_ctx
+        if metrics is not None:
+            metrics.connect = perf_counter() - context.connection_start - (metrics.dns or 0.)
+
+    async def on_request_chunk_sent(_, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.bytes_sent += len(params.chunk)
+
+    async def on_request_end(_, context, __):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.ttfb = perf_counter() - context.request_start
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
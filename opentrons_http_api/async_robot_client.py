@@ -0,0 +1,358 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import TYPE_CHECKING, Tuple, AsyncIterator, BinaryIO, Iterable, Optional, Sequence, Union
+from weakref import WeakValueDictionary
+
+from opentrons_http_api.async_api import AsyncAPI, aiohttp
+from opentrons_http_api.defs.dict_data import LabwareOffset, Setting, RobotSettings, HealthInfo, RunInfo, ProtocolInfo, \
+    Status, CommandInfo
+from opentrons_http_api.defs.enums import SettingId, Action, EngineStatus
+from opentrons_http_api.run_watcher import AsyncRunWatcher
+from opentrons_http_api.utils.labware_offset_store import LabwareOffsets, offset_dicts
+from opentrons_http_api.utils.labware_registry import LabwareDefinitions, missing_definitions
+from opentrons_http_api.utils.protocol_index import ProtocolIndex
+
+if TYPE_CHECKING:
+    from opentrons_http_api.notifications import NotificationClient
+
+
+class AsyncRobotClient:
+    """
+    Asyncio robot client interface that utilises the Opentrons HTTP API. Mirrors RobotClient, but every method must be
+    awaited.
+    """
+    def __init__(self, host: str = 'localhost', protocol_index: Optional[ProtocolIndex] = None,
+                 notifications: Optional[NotificationClient] = None, **api_kwargs):
+        """
+        :param host: Host name or IP address of the robot.
+        :param protocol_index: An optional index of uploaded protocols, see RobotClient.
+        :param notifications: An optional client of the robot's notification broker, see RobotClient.
+        :param api_kwargs: Connection settings passed through to AsyncAPI, e.g. pool_maxsize, timeout or session.
+        """
+        self._host = host
+        self._protocol_index = protocol_index
+        self._notifications = notifications
+        self._api = AsyncAPI(host, **api_kwargs)
+        self._watchers: WeakValueDictionary[str, AsyncRunWatcher] = WeakValueDictionary()
+
+    async def __aenter__(self) -> AsyncRobotClient:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close all pooled connections to the robot.
+        """
+        await self._api.close()
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    async def identify(self, seconds: int) -> None:
+        await self._api.post_identify(seconds)
+
+    async def lights(self) -> bool:
+        return (await self._api.get_robot_lights())['on']
+
+    async def set_lights(self, on: bool) -> None:
+        await self._api.post_robot_lights(on)
+
+    async def settings(self) -> Tuple[Setting, ...]:
+        d = await self._api.get_settings()
+        return tuple(Setting.from_dict(setting)
+                     for setting in d['settings'])
+
+    async def set_setting(self, id_: Union[str, SettingId], value: bool) -> None:
+        if isinstance(id_, SettingId):
+            id_ = id_.value
+
+        await self._api.post_settings(id_, value)
+
+    async def robot_settings(self) -> RobotSettings:
+        d = await self._api.get_robot_settings()
+        return RobotSettings.from_dict(d)
+
+    async def health(self) -> HealthInfo:
+        info = await self._api.get_health()
+        return HealthInfo.from_dict(info)
+
+    async def runs(self) -> Tuple[RunInfo, ...]:
+        d = await self._api.get_runs()
+        return tuple(RunInfo.from_dict(run_info)
+                     for run_info in d['data'])
+
+    async def current_run(self) -> Optional[RunInfo]:
+        """
+        Get the current run, or None if there isn't one. See RobotClient.current_run.
+        """
+        d = await self._api.get_runs(page_length=1)
+        for run_info in d['data']:
+            if run_info['current']:
+                return RunInfo.from_dict(run_info)
+
+        current = d.get('links', {}).get('current')
+        if current is None:
+            return None
+        return await self.run(current['href'].rsplit('/', 1)[-1])
+
+    async def create_run(self, protocol_id: str,
+                         labware_offsets: Optional[LabwareOffsets] = None,
+                         dedup_key: Optional[str] = None) -> RunInfo:
+        """
+        Create a run of a protocol.
+        :param labware_offsets: Optional labware offsets as dicts, LabwareOffset objects or a LabwareOffsetStore.
+        :param dedup_key: An optional key, unique to this run, that allows creating the run to be retried, see
+        API.post_runs.
+        """
+        data = {
+            'protocolId': protocol_id,
+            'labwareOffsets': [] if labware_offsets is None else offset_dicts(labware_offsets),
+        }
+        d = await self._api.post_runs(data, dedup_key)
+        return RunInfo.from_dict(d['data'])
+
+    async def run(self, run_id: str) -> RunInfo:
+        d = await self._api.get_runs_run_id(run_id)
+        return RunInfo.from_dict(d['data'])
+
+    async def add_labware_offsets(self, run_id: str, labware_offsets: LabwareOffsets) -> Tuple[LabwareOffset, ...]:
+        """
+        Add labware offsets to an existing run, see RobotClient.add_labware_offsets. Offsets are sent in order, since
+        the robot applies the one added last for each labware and location.
+        """
+        offsets = []
+        for offset in offset_dicts(labware_offsets):
+            d = await self._api.post_runs_run_id_labware_offsets(run_id, offset)
+            offsets.append(LabwareOffset.from_dict(d['data']))
+        return tuple(offsets)
+
+    async def loaded_labware_definitions(self, run_id: str) -> Tuple[dict, ...]:
+        """
+        Get the definitions of the labware loaded by a run.
+        """
+        d = await self._api.get_runs_run_id_loaded_labware_definitions(run_id)
+        return tuple(d['data'])
+
+    async def add_labware_definitions(self, run_id: str, labware_definitions: LabwareDefinitions) -> Tuple[str, ...]:
+        """
+        Add custom labware definitions to an existing run, see RobotClient.add_labware_definitions.
+        """
+        missing = missing_definitions(labware_definitions, await self.loaded_labware_definitions(run_id))
+        ds = await asyncio.gather(*(self._api.post_runs_run_id_labware_definitions(run_id, definition)
+                                    for definition in missing))
+        return tuple(d['data']['definitionUri']
+                     for d in ds)
+
+    async def iter_commands(self, run_id: str, follow: bool = False, cursor: int = 0, page_length: int = 100,
+                            poll_interval: float = 1.) -> AsyncIterator[dict]:
+        """
+        Iterate over the command summaries of a run with "async for". See RobotClient.iter_commands.
+        """
+        done = False
+
+        while True:
+            d = await self._api.get_runs_run_id_commands(run_id, cursor=cursor, page_length=page_length)
+            commands = d['data']
+            for command in commands:
+                yield command
+            cursor += len(commands)
+
+            total = d.get('meta', {}).get('totalLength')
+            if cursor < total if total is not None else len(commands) == page_length:
+                continue
+
+            if not follow or done:
+                return
+            done = Status(EngineStatus((await self._api.get_runs_run_id(run_id))['data']['status'])).is_done
+            if not done:
+                await asyncio.sleep(poll_interval)
+
+    async def run_command(self, run_id: str, command_id: str) -> dict:
+        """
+        Get a command of a run along with any associated payload, result, and execution information.
+        """
+        return (await self._api.get_runs_run_id_commands_command_id(run_id, command_id))['data']
+
+    def watch_run(self, run_id: str, **watcher_kwargs) -> AsyncRunWatcher:
+        """
+        Get a watcher that delivers the status transitions of a run, e.g.
+
+            async for old, new in robot.watch_run(run_id):
+                print(old, '->', new)
+
+        All callers watching the same run share a single watcher and poller, as long as it is in use.
+        :param run_id: ID of the run to watch.
+        :param watcher_kwargs: Poll settings passed through to a newly created AsyncRunWatcher, e.g. interval.
+        """
+        watcher_kwargs.setdefault('notifications', self._notifications)
+        watcher = self._watchers.get(run_id)
+        if watcher is None or watcher.is_finished:
+            watcher = AsyncRunWatcher(self._api, run_id, **watcher_kwargs)
+            self._watchers[run_id] = watcher
+        return watcher
+
+    async def action_run(self, run_id: str, action: Union[str, Action]) -> None:
+        if isinstance(action, Action):
+            action = action.value
+
+        data = {
+            'actionType': action
+        }
+        await self._api.post_runs_run_id_actions(run_id, data)
+
+    async def command(self, command_id: str) -> CommandInfo:
+        d = await self._api.get_commands_command_id(command_id)
+        return CommandInfo.from_dict(d['data'])
+
+    async def send_command(self, command_type: str, params: Optional[dict] = None, wait: bool = True,
+                           timeout: float = 30.) -> CommandInfo:
+        """
+        Run a stateless command outside of a run, see RobotClient.send_command.
+        """
+        data = {'commandType': command_type, 'params': {} if params is None else params}
+        d = await self._api.post_commands(data, wait_until_complete=wait,
+                                          timeout=round(timeout * 1000) if wait else None)
+        command = CommandInfo.from_dict(d['data'])
+        if wait and not command.status_.is_done:
+            raise TimeoutError(f'command {command.id} not complete after {timeout} s')
+        return command
+
+    async def send_commands(self, commands: Sequence[dict], timeout: float = 30.) -> Tuple[CommandInfo, ...]:
+        """
+        Run a sequence of stateless commands without waiting for each command before sending the next, see
+        RobotClient.send_commands.
+        """
+        if not commands:
+            return ()
+
+        queued = [await self.send_command(command['commandType'], command.get('params'), wait=False)
+                  for command in commands[:-1]]
+        last = await self.send_command(commands[-1]['commandType'], commands[-1].get('params'), timeout=timeout)
+        return (*await asyncio.gather(*(self.command(command.id) for command in queued)), last)
+
+    async def home(self) -> CommandInfo:
+        return await self.send_command('home')
+
+    async def set_rail_lights(self, on: bool) -> CommandInfo:
+        return await self.send_command('setRailLights', {'on': on})
+
+    async def protocols(self) -> Tuple[ProtocolInfo, ...]:
+        d = await self._api.get_protocols()
+        return tuple(ProtocolInfo.from_dict(protocol_info)
+                     for protocol_info in d['data'])
+
+    async def upload_protocol(self, protocol_file: BinaryIO,
+                              labware_definitions: Optional[Sequence[BinaryIO]] = None) -> ProtocolInfo:
+        """
+        Upload a protocol with optional labware definitions to the robot.
+        :param protocol_file: A Python or JSON protocol binary file object.
+        :param labware_definitions: An optional sequence of JSON labware definition binary file objects, only if the
+        protocol_file is in Python format.
+        :return: ProtocolInfo object containing information about the protocol.
+        """
+        files = (protocol_file, ) if labware_definitions is None else (protocol_file, *labware_definitions)
+
+        if self._protocol_index is None:
+            d = await self._api.post_protocols(files)
+            return ProtocolInfo.from_dict(d['data'])
+
+        # Reuse an identical protocol if it's still on the robot
+        digest = ProtocolIndex.hash_files(files)
+        protocol_id = self._protocol_index.get(self._host, digest)
+        if protocol_id is not None:
+            try:
+                return await self.protocol(protocol_id)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
+                self._protocol_index.remove(self._host, digest)
+
+        d = await self._api.post_protocols(files)
+        protocol_info = ProtocolInfo.from_dict(d['data'])
+        self._protocol_index.put(self._host, digest, protocol_info.id)
+        return protocol_info
+
+    async def protocol(self, protocol_id: str) -> ProtocolInfo:
+        d = await self._api.get_protocols_protocol_id(protocol_id)
+        return ProtocolInfo.from_dict(d['data'])
+
+    async def wait_for_analysis(self, protocol_id: str, timeout: Optional[float] = None,
+                                poll_interval: float = 0.5) -> ProtocolInfo:
+        """
+        Wait until the robot has analysed a protocol, see RobotClient.wait_for_analysis.
+        """
+        end = None if timeout is None else monotonic() + timeout
+        while True:
+            protocol_info = await self.protocol(protocol_id)
+            if protocol_info.is_analyzed:
+                return protocol_info
+            if end is not None and monotonic() >= end:
+                raise TimeoutError(f'protocol {protocol_id} not analysed after {timeout} s')
+            await asyncio.sleep(poll_interval if end is None else min(poll_interval, max(end - monotonic(), 0.)))
+
+    async def run_protocols(self, protocols: Iterable[Sequence[BinaryIO]], prefetch: int = 2,
+                            labware_offsets: Optional[LabwareOffsets] = None,
+                            labware_definitions: Optional[LabwareDefinitions] = None,
+                            analysis_timeout: Optional[float] = None, **watcher_kwargs) -> AsyncIterator[RunInfo]:
+        """
+        Run protocols one after another with "async for", yielding each run once it's done, while the next protocols
+        are uploaded and analysed in the background. See RobotClient.run_protocols.
+        """
+        async def prepare(files: Sequence[BinaryIO]) -> str:
+            protocol_id = (await self.upload_protocol(files[0], files[1:] or None)).id
+            await self.wait_for_analysis(protocol_id, analysis_timeout)
+            return protocol_id
+
+        protocols = iter(protocols)
+        prepared = deque()
+
+        def top_up(n: int) -> None:
+            while len(prepared) < n:
+                files = next(protocols, None)
+                if files is None:
+                    return
+                prepared.append(asyncio.ensure_future(prepare(files)))
+
+        try:
+            run_id = None
+            while True:
+                # Prepare the next protocols while the current run is in progress
+                top_up(prefetch)
+                finished = None
+                if run_id is not None:
+                    watcher = self.watch_run(run_id, **watcher_kwargs)
+                    await watcher.wait()
+                    finished = watcher.run_info
+
+                # Start the next run straight away, before handing over the finished run
+                top_up(1)
+                run_id = None
+                if prepared:
+                    run_info = await self.create_run(await prepared.popleft(), labware_offsets)
+                    if labware_definitions is not None:
+                        await self.add_labware_definitions(run_info.id, labware_definitions)
+                    await self.action_run(run_info.id, Action.PLAY)
+                    run_id = run_info.id
+
+                if finished is not None:
+                    yield finished
+                if run_id is None:
+                    return
+        finally:
+            # Don't upload protocols that won't be run, and retrieve the exceptions of those already prepared, so they
+            # aren't logged as never retrieved
+            for task in prepared:
+                if not task.cancel() and not task.cancelled():
+                    task.exception()
+
+    async def prune_protocol_index(self) -> None:
+        """
+        Remove protocols that are no longer on the robot from the protocol index.
+        """
+        if self._protocol_index is not None:
+            self._protocol_index.prune(self._host, [protocol_info.id for protocol_info in await self.protocols()])
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from opentrons_http_api.defs.dict_data import ProtocolInfo
+from opentrons_http_api.defs.paths import Paths, path_template
+
+
+def _is_analyzed(data: dict) -> bool:
+    return ProtocolInfo.from_dict(data['data']).is_analyzed
+
+
+@dataclass
+class CacheEntry:
+    """
+    A cached response, with any validators the server sent for conditional requests.
+    """
+    data: dict
+    size: int
+    expires: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return monotonic() < self.expires
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Headers to make a conditional request that returns 304 Not Modified if the response hasn't changed.
+        """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    LRU cache of GET responses for read only endpoints that rarely change, for use with API.
+
+    Responses are cached per path for a time to live (TTL) set per Paths constant, and endpoints without a TTL are not
+    cached. Once expired, a response is revalidated with a conditional request if the server sent an ETag or
+    Last-Modified header. A successful POST through the same API invalidates the responses it may have changed.
+
+    Cached responses are shared between callers, so should not be modified.
+    """
+    DEFAULT_TTLS: Mapping[str, float] = {
+        Paths.ROBOT_LIGHTS: 5.,
+        Paths.SETTINGS: 60.,
+        Paths.SETTINGS_ROBOT: 60.,
+        Paths.CALIBRATION_STATUS: 60.,
+        Paths.HEALTH: 10.,
+        Paths.PROTOCOLS_PROTOCOL_ID: 300.,
+    }
+
+    # Responses of these paths are only cached once they pass the check, since until then they change without a POST
+    # through the API, e.g. a protocol while it's being analysed
+    CACHE_IF: Mapping[str, Callable[[dict], bool]] = {
+        Paths.PROTOCOLS_PROTOCOL_ID: _is_analyzed,
+    }
+
+    # The GET paths each POST path invalidates
+    INVALIDATES: Mapping[str, Tuple[str, ...]] = {
+        Paths.ROBOT_LIGHTS: (Paths.ROBOT_LIGHTS, ),
+        Paths.SETTINGS: (Paths.SETTINGS, Paths.SETTINGS_ROBOT),
+        Paths.MOTORS_DISENGAGE: (Paths.MOTORS_ENGAGED, ),
+        Paths.RUNS: (Paths.RUNS, ),
+        Paths.RUNS_RUN_ID_ACTIONS: (Paths.RUNS, Paths.RUNS_RUN_ID),
+        Paths.PROTOCOLS: (Paths.PROTOCOLS, Paths.PROTOCOLS_PROTOCOL_ID),
+        Paths.COMMANDS: (Paths.COMMANDS, Paths.ROBOT_LIGHTS),
+    }
+
+    def __init__(self, ttls: Optional[Mapping[str, float]] = None, max_bytes: int = 16 * 1024 * 1024):
+        """
+        :param ttls: Time to live in seconds per Paths constant, defaults to DEFAULT_TTLS. A TTL of 0 revalidates every
+        request, which only saves time if the server sends validators.
+        :param max_bytes: Maximum total size of the cached response bodies, after which the least recently used
+        responses are evicted.
+        """
+        self._ttls = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self._max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._templates: Dict[str, str] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """
+        Total size in bytes of the cached response bodies.
+        """
+        return self._size
+
+    def is_cached(self, path: str) -> bool:
+        """
+        Returns True iff responses for the path are cached.
+        """
+        return path_template(path) in self._ttls
+
+    def get(self, path: str) -> Optional[CacheEntry]:
+        """
+        Get the cached response for a path, which may have expired.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+            return entry
+
+    def put(self, path: str, data: dict, size: int, headers: Mapping[str, str]) -> None:
+        """
+        Cache a response for a path, if its endpoint is cached.
+        :param path: The requested path.
+        :param data: The decoded response.
+        :param size: Size of the response body in bytes.
+        :param headers: The response headers.
+        """
+        template = path_template(path)
+        ttl = self._ttls.get(template)
+        if ttl is None or size > self._max_bytes:
+            return
+        check = self.CACHE_IF.get(template)
+        if check is not None and not check(data):
+            # Also drop a previous response, which is no newer
+            with self._lock:
+                self._remove(path)
+            return
+
+        entry = CacheEntry(data, size, monotonic() + ttl, headers.get('ETag'), headers.get('Last-Modified'))
+        with self._lock:
+            self._remove(path)
+            self._entries[path] = entry
+            self._templates[path] = template
+            self._size += size
+
+            while self._size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def renew(self, path: str) -> None:
+        """
+        Restart the time to live of a cached response, e.g. after the server confirmed it is not modified.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                entry.expires = monotonic() + self._ttls[self._templates[path]]
+
+    def invalidate(self, *templates: str) -> None:
+        """
+        Remove all cached responses for the given Paths constants, or all responses if none are given.
+        """
+        with self._lock:
+            for path, template in tuple(self._templates.items()):
+                if not templates or template in templates:
+                    self._remove(path)
+
+    def invalidate_post(self, path: str) -> None:
+        """
+        Remove the cached responses that a POST to a path may have changed.
+        """
+        template = path_template(path)
+        self.invalidate(*self.INVALIDATES.get(template, (template, )))
+
+    def _remove(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            del self._templates[path]
+            self._size -= entry.size
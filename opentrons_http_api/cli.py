@@ -0,0 +1,277 @@
+"""
+The opentrons-http command line tool, which runs RobotClient calls on many robots at once, e.g.
+
+    opentrons-http --hosts 10.0.0.1,10.0.0.2 health
+    opentrons-http --hosts-file robots.txt --format ndjson runs --current | jq .data.status
+    opentrons-http --hosts 10.0.0.1 run protocol.py --follow
+
+Each result is a JSON record with the robot's host and either its data or an error. By default the records of each
+call are printed as a JSON array once every robot has responded, while with --format ndjson each record is printed on
+its own line as soon as it arrives.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import threading
+from enum import Enum
+from io import BytesIO
+from time import sleep
+from typing import Any, BinaryIO, Callable, List, Optional, Sequence, TextIO, Tuple
+
+from opentrons_http_api.api import API
+from opentrons_http_api.defs.enums import Action, EngineStatus
+from opentrons_http_api.fleet import Fleet, HostResult
+from opentrons_http_api.robot_client import RobotClient
+
+
+# Commands that only read from the robots, so can be repeated with --watch
+_WATCHABLE = ('health', 'runs', 'lights', 'settings')
+
+
+def _jsonable(value: Any) -> Any:
+    """
+    Convert a value returned by RobotClient to JSON serializable objects.
+    """
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (tuple, list)):
+        return [_jsonable(item) for item in value]
+    if callable(getattr(value, 'dict', None)) and not isinstance(value, dict):
+        return value.dict()
+    return value
+
+
+class _Output:
+    """
+    Writes records either as a JSON array per call, or as NDJSON as they arrive. Records can be written from many
+    threads.
+    """
+    def __init__(self, format_: str, stream: TextIO):
+        self._ndjson = format_ == 'ndjson'
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._records: List[dict] = []
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            if self._ndjson:
+                self._stream.write(json.dumps(record) + '\n')
+                self._stream.flush()
+            else:
+                self._records.append(record)
+
+    def write_result(self, result: HostResult) -> None:
+        if result.ok:
+            self.write({'host': result.host, 'data': _jsonable(result.value)})
+        else:
+            self.write({'host': result.host, 'error': f'{type(result.exception).__name__}: {result.exception}'})
+
+    def end(self) -> None:
+        """
+        Finish the output of a call.
+        """
+        with self._lock:
+            if not self._ndjson:
+                self._stream.write(json.dumps(self._records, indent=2) + '\n')
+                self._stream.flush()
+                self._records.clear()
+
+
+def _read_files(paths: Sequence[str]) -> Tuple[Tuple[str, bytes], ...]:
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append((path, f.read()))
+    return tuple(contents)
+
+
+def _open_files(contents: Sequence[Tuple[str, bytes]]) -> List[BinaryIO]:
+    """
+    Get a new file object for each file, since each robot reads its own copy.
+    """
+    files = []
+    for path, data in contents:
+        f = BytesIO(data)
+        f.name = path
+        files.append(f)
+    return files
+
+
+def _split(files: List[BinaryIO]) -> Tuple[BinaryIO, Optional[List[BinaryIO]]]:
+    return files[0], files[1:] or None
+
+
+def _parse_bool(value: str) -> bool:
+    if value.lower() in ('on', 'true', '1'):
+        return True
+    if value.lower() in ('off', 'false', '0'):
+        return False
+    raise argparse.ArgumentTypeError(f'expected on/off or true/false, got "{value}"')
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='opentrons-http', description='Run commands on Opentrons robots at once.')
+    # Not nargs='+', which would also take the command as a host
+    parser.add_argument('--hosts', action='append', default=[], metavar='HOSTS',
+                        help='host names or IP addresses of the robots, separated by commas, may be repeated')
+    parser.add_argument('--hosts-file', metavar='PATH',
+                        help='file of robot host names or IP addresses, one per line, ignoring # comments')
+    parser.add_argument('--port', type=int, default=API._PORT, help='port of the robots\' HTTP API')
+    parser.add_argument('--timeout', type=float, default=10., help='timeout in seconds of each request')
+    parser.add_argument('--transport', choices=API.TRANSPORTS, default='minimal',
+                        help='HTTP transport, where minimal starts fastest (default: minimal)')
+    parser.add_argument('--format', choices=('json', 'ndjson'), default='json', dest='format_',
+                        help='print a JSON array per call, or a JSON record per line as they arrive (default: json)')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help=f'repeat the command every SECONDS until interrupted, one of {", ".join(_WATCHABLE)}')
+
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+
+    commands.add_parser('health', help='get the health of the robots')
+
+    runs = commands.add_parser('runs', help='get the runs of the robots')
+    runs.add_argument('--current', action='store_true', help='only the current run of each robot, if any')
+
+    upload = commands.add_parser('upload', help='upload a protocol to the robots')
+    upload.add_argument('protocol', help='protocol file')
+    upload.add_argument('--labware', nargs='+', default=[], metavar='PATH', help='labware definition files')
+
+    run = commands.add_parser('run', help='create and play a run of a protocol on the robots')
+    protocol = run.add_mutually_exclusive_group(required=True)
+    protocol.add_argument('protocol', nargs='?', help='protocol file to upload and run')
+    protocol.add_argument('--protocol-id', help='ID of a protocol already on the robots')
+    run.add_argument('--labware', nargs='+', default=[], metavar='PATH', help='labware definition files')
+    run.add_argument('--follow', action='store_true',
+                     help='print each command of the runs as they happen, until the runs are done')
+    run.add_argument('--poll-interval', type=float, default=1., metavar='SECONDS',
+                     help='seconds between checks for new commands with --follow')
+
+    lights = commands.add_parser('lights', help='get, or turn on or off, the rail lights of the robots')
+    lights.add_argument('state', nargs='?', type=_parse_bool, help='on or off')
+
+    settings = commands.add_parser('settings', help='get, or change, the advanced settings of the robots')
+    settings.add_argument('setting', nargs='?', help='ID of a setting to change')
+    settings.add_argument('value', nargs='?', type=_parse_bool, help='true or false')
+
+    return parser
+
+
+def _hosts(parser: argparse.ArgumentParser, args: argparse.Namespace) -> List[str]:
+    hosts = [host for value in args.hosts for host in value.split(',') if host]
+    if args.hosts_file is not None:
+        with open(args.hosts_file) as f:
+            for line in f:
+                host = line.split('#', 1)[0].strip()
+                if host:
+                    hosts.append(host)
+
+    if not hosts:
+        parser.error('no hosts given, use --hosts or --hosts-file')
+    # Without duplicates, in order
+    return list(dict.fromkeys(hosts))
+
+
+def _command(args: argparse.Namespace, output: _Output) -> Callable[[RobotClient], Any]:
+    """
+    Get the function that runs the command on a robot.
+    """
+    if args.command == 'health':
+        return RobotClient.health
+
+    if args.command == 'runs':
+        return RobotClient.current_run if args.current else RobotClient.runs
+
+    if args.command == 'upload':
+        contents = _read_files([args.protocol, *args.labware])
+        return lambda client: client.upload_protocol(*_split(_open_files(contents)))
+
+    if args.command == 'run':
+        contents = _read_files([args.protocol, *args.labware] if args.protocol is not None else [])
+
+        def run(client: RobotClient):
+            protocol_id = args.protocol_id
+            if protocol_id is None:
+                protocol_id = client.upload_protocol(*_split(_open_files(contents))).id
+
+            run_info = client.create_run(protocol_id)
+            client.action_run(run_info.id, Action.PLAY)
+            if args.follow:
+                for command in client.iter_commands(run_info.id, follow=True, poll_interval=args.poll_interval):
+                    output.write({'host': client.host, 'runId': run_info.id, 'command': command})
+            return client.run(run_info.id)
+
+        return run
+
+    if args.command == 'lights':
+        def lights(client: RobotClient) -> dict:
+            if args.state is not None:
+                client.set_lights(args.state)
+            return {'on': client.lights()}
+
+        return lights
+
+    if args.command == 'settings':
+        def settings(client: RobotClient):
+            if args.setting is not None:
+                client.set_setting(args.setting, args.value)
+            return client.settings()
+
+        return settings
+
+    raise ValueError(f'unknown command "{args.command}"')
+
+
+def _failed(args: argparse.Namespace, result: HostResult) -> bool:
+    """
+    Whether a robot failed the command, including a run that finished without succeeding.
+    """
+    if not result.ok:
+        return True
+    if args.command != 'run':
+        return False
+    status = result.value.status_
+    return status.is_done and status.status is not EngineStatus.SUCCEEDED
+
+
+def main(argv: Optional[Sequence[str]] = None, stream: Optional[TextIO] = None) -> int:
+    """
+    Run the command line tool.
+    :return: The exit status, 1 if any robot failed, or 130 if interrupted.
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    hosts = _hosts(parser, args)
+
+    if args.watch is not None and args.command not in _WATCHABLE:
+        parser.error(f'--watch only applies to {", ".join(_WATCHABLE)}')
+    if args.watch is not None and (args.command == 'lights' and args.state is not None
+                                   or args.command == 'settings' and args.setting is not None):
+        parser.error('--watch only applies to getting, not changing')
+    if args.command == 'settings' and args.setting is not None and args.value is None:
+        parser.error('a value is required to change a setting')
+
+    output = _Output(args.format_, sys.stdout if stream is None else stream)
+    command = _command(args, output)
+
+    # The robots' connections are kept alive between refreshes
+    with Fleet(hosts, port=args.port, timeout=args.timeout, transport=args.transport) as fleet:
+        try:
+            while True:
+                # A JSON array is in the order of the hosts, while NDJSON streams records as they arrive
+                results = fleet.as_completed(command) if args.format_ == 'ndjson' else fleet.map(command).values()
+                failed = False
+                for result in results:
+                    output.write_result(result)
+                    failed |= _failed(args, result)
+                output.end()
+
+                if args.watch is None:
+                    return int(failed)
+                sleep(args.watch)
+        except KeyboardInterrupt:
+            return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+JSON decoders for response bodies. By default the fastest installed backend is used, falling back to the standard
+library json module.
+"""
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+
+Decoder = Callable[[bytes], Any]
+
+
+def _orjson() -> Decoder:
+    import orjson
+    return orjson.loads
+
+
+def _msgspec() -> Decoder:
+    import msgspec
+    return msgspec.json.Decoder().decode
+
+
+def _json() -> Decoder:
+    return json.loads
+
+
+# In order of preference
+_BACKENDS: Dict[str, Callable[[], Decoder]] = {
+    'orjson': _orjson,
+    'msgspec': _msgspec,
+    'json': _json,
+}
+
+
+def available_decoders() -> Dict[str, Decoder]:
+    """
+    Get all installed decoder backends by name, in order of preference.
+    """
+    decoders = {}
+    for name, load in _BACKENDS.items():
+        try:
+            decoders[name] = load()
+        except ImportError:
+            pass
+    return decoders
+
+
+def get_decoder(decoder: Optional[Union[str, Decoder]] = None) -> Decoder:
+    """
+    Get a decoder that decodes a JSON response body into Python objects.
+    :param decoder: The name of a backend, i.e. "orjson", "msgspec" or "json", a custom decoder function, or None to use
+    the fastest installed backend.
+    """
+    if callable(decoder):
+        return decoder
+
+    if decoder is None:
+        # Only import backends until one is installed
+        for load in _BACKENDS.values():
+            try:
+                return load()
+            except ImportError:
+                pass
+
+    try:
+        load = _BACKENDS[decoder]
+    except KeyError:
+        raise ValueError(f'unknown decoder "{decoder}", expected one of {tuple(_BACKENDS)}') from None
+    return load()
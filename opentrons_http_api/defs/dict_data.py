@@ -1,23 +1,151 @@
 """
-Dataclasses for easier creation and handling of data usually represented by a dict. Some classes with nested dicts also
-provide a property representing the nested dict as a class, with a trailing underscore following its name.
+Classes for easier handling of data usually represented by a dict. Each class lazily wraps the dict without copying it,
+exposing its keys as read only attributes. Some classes with nested dicts also provide a cached property representing
+the nested dict as a class, with a trailing underscore following its name.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
-from typing import Optional, Union
+from typing import Any, Callable, ClassVar, Dict, Optional, Tuple, Union
 
-from opentrons_http_api.defs.enums import EngineStatus
+from opentrons_http_api.defs.enums import AnalysisStatus, CommandStatus, EngineStatus
+
+
+_MISSING = object()
+
+
+class _Field:
+    """
+    Read only attribute that gets its value from the wrapped dict.
+    """
+    __slots__ = ('name', 'default')
+
+    def __init__(self, name: str, default: Any = _MISSING):
+        self.name = name
+        self.default = default
+
+    def __get__(self, instance: Optional[_DictData], owner: type) -> Any:
+        if instance is None:
+            return self
+        try:
+            return instance._d[self.name]
+        except KeyError:
+            if self.default is _MISSING:
+                raise AttributeError(f"'{owner.__name__}' data has no key '{self.name}'") from None
+            return self.default
 
 
-@dataclass(frozen=True)
 class _DictData:
+    """
+    Base class that declares its fields with class annotations in the same way as a frozen dataclass, but stores the
+    dict it is created from instead of copying its values.
+    """
+    __slots__ = ('_d', '_cache')
+
+    _fields: ClassVar[Tuple[str, ...]] = ()
+    _defaults: ClassVar[Dict[str, Any]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        fields = dict.fromkeys(cls._fields)
+        defaults = dict(cls._defaults)
+        for name in cls.__dict__.get('__annotations__', {}):
+            default = cls.__dict__.get(name, _MISSING)
+            if default is not _MISSING:
+                defaults[name] = default
+            setattr(cls, name, _Field(name, default))
+            fields[name] = None
+
+        cls._fields = tuple(fields)
+        cls._defaults = defaults
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self._fields):
+            raise TypeError(f'{type(self).__name__} takes {len(self._fields)} arguments but {len(args)} were given')
+
+        d = dict(zip(self._fields, args))
+        for name, value in kwargs.items():
+            if name not in self._fields:
+                raise TypeError(f"{type(self).__name__} got an unexpected keyword argument '{name}'")
+            if name in d:
+                raise TypeError(f"{type(self).__name__} got multiple values for argument '{name}'")
+            d[name] = value
+
+        for name in self._fields:
+            if name not in d:
+                if name not in self._defaults:
+                    raise TypeError(f"{type(self).__name__} missing required argument '{name}'")
+                d[name] = self._defaults[name]
+
+        object.__setattr__(self, '_d', d)
+        object.__setattr__(self, '_cache', None)
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        """
+        Wrap a dict, e.g. from a parsed response, without copying or validating it. Missing keys only raise an
+        AttributeError when accessed, and any extra keys are ignored.
+        """
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, '_d', d)
+        object.__setattr__(instance, '_cache', None)
+        return instance
+
+    # FrozenInstanceError is imported when raised, since importing dataclasses is slow
+
+    def __setattr__(self, name: str, value: Any):
+        from dataclasses import FrozenInstanceError
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name: str):
+        from dataclasses import FrozenInstanceError
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
+
+    def __reduce__(self):
+        return self.from_dict, (self._d, )
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name, _MISSING)!r}'
+                           for name in self._fields)
+        return f'{type(self).__name__}({fields})'
+
+    def _values(self) -> tuple:
+        # Missing keys compare as their defaults, or as None, so that comparing never raises
+        return tuple(self._d.get(name, self._defaults.get(name))
+                     for name in self._fields)
+
+    def _cached(self, name: str, create: Callable[[], Any]) -> Any:
+        """
+        Get a value derived from the dict, creating it on first use.
+        """
+        if self._cache is None:
+            object.__setattr__(self, '_cache', {})
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = create()
+            return value
+
     def dict(self) -> dict:
-        return asdict(self)
+        """
+        The fields as a new dict, without any extra keys of the wrapped dict, or missing keys without a default. Nested
+        values are shared with the wrapped dict, so should not be modified.
+        """
+        values = ((name, getattr(self, name, _MISSING)) for name in self._fields)
+        return {name: value for name, value in values if value is not _MISSING}
 
 
-@dataclass(frozen=True)
 class Status(_DictData):
+    __slots__ = ()
+
     status: EngineStatus
 
     @property
@@ -62,8 +190,9 @@ class Status(_DictData):
         )
 
 
-@dataclass(frozen=True)
 class Error(_DictData):
+    __slots__ = ()
+
     id: str
     createdAt: str
     errorCode: str
@@ -73,15 +202,17 @@ class Error(_DictData):
     wrappedErrors: list[dict]
 
 
-@dataclass(frozen=True)
 class Vector(_DictData):
+    __slots__ = ()
+
     x: float
     y: float
     z: float
 
 
-@dataclass(frozen=True)
 class LabwareOffset(_DictData):
+    __slots__ = ()
+
     id: str
     createdAt: str
     definitionUri: str
@@ -94,7 +225,7 @@ class LabwareOffset(_DictData):
 
     @property
     def vector_(self) -> Vector:
-        return Vector(**self.vector)
+        return self._cached('vector_', lambda: Vector.from_dict(self.vector))
 
     @staticmethod
     def create(definitionUri: str, location: dict[str, str], vector: Union[dict[str, float], Vector]) -> LabwareOffset:
@@ -107,8 +238,9 @@ class LabwareOffset(_DictData):
         return LabwareOffset(id='', createdAt='', definitionUri=definitionUri, location=location, vector=vector)
 
 
-@dataclass(frozen=True)
 class Setting(_DictData):
+    __slots__ = ()
+
     id: str
     old_id: str
     title: str
@@ -117,8 +249,9 @@ class Setting(_DictData):
     value: bool
 
 
-@dataclass(frozen=True)
 class RobotSettings(_DictData):
+    __slots__ = ()
+
     model: str
     name: str
     version: int
@@ -135,8 +268,9 @@ class RobotSettings(_DictData):
     left_mount_offset: list[int]
 
 
-@dataclass(frozen=True)
 class HealthInfo(_DictData):
+    __slots__ = ()
+
     name: str
     robot_model: str
     api_version: str
@@ -150,8 +284,9 @@ class HealthInfo(_DictData):
     links: dict[str, str]
 
 
-@dataclass(frozen=True)
 class RunInfo(_DictData):
+    __slots__ = ()
+
     id: str
     createdAt: str
     status: str
@@ -169,21 +304,22 @@ class RunInfo(_DictData):
 
     @property
     def status_(self) -> Status:
-        return Status(EngineStatus(self.status))
+        return self._cached('status_', lambda: Status(EngineStatus(self.status)))
 
     @property
     def errors_(self) -> list[Error]:
-        return [Error(**error)
-                for error in self.errors]
+        return self._cached('errors_', lambda: [Error.from_dict(error)
+                                                for error in self.errors])
 
     @property
     def labwareOffsets_(self) -> list[LabwareOffset]:
-        return [LabwareOffset(**offset)
-                for offset in self.labwareOffsets]
+        return self._cached('labwareOffsets_', lambda: [LabwareOffset.from_dict(offset)
+                                                        for offset in self.labwareOffsets])
 
 
-@dataclass(frozen=True)
 class ProtocolInfo(_DictData):
+    __slots__ = ()
+
     id: str
     createdAt: str
     files: list[dict]
@@ -192,3 +328,36 @@ class ProtocolInfo(_DictData):
     metadata: dict
     analyses: list
     analysisSummaries: list[dict]
+
+    @property
+    def is_analyzed(self) -> bool:
+        """
+        Returns True iff the protocol has been analysed and every analysis has completed (assuming the info is up to
+        date), whether or not the analysis found errors. Right after upload there may be no analysis yet.
+        """
+        return bool(self.analysisSummaries) and all(AnalysisStatus(summary['status']) is AnalysisStatus.COMPLETED
+                                                    for summary in self.analysisSummaries)
+
+
+class CommandInfo(_DictData):
+    __slots__ = ()
+
+    id: str
+    createdAt: str
+    commandType: str
+    key: str
+    status: str
+    params: dict
+    result: Optional[dict] = None
+    error: Optional[dict] = None
+    startedAt: Optional[str] = None
+    completedAt: Optional[str] = None
+    intent: Optional[str] = None
+
+    @property
+    def status_(self) -> CommandStatus:
+        return CommandStatus(self.status)
+
+    @property
+    def error_(self) -> Optional[Error]:
+        return self._cached('error_', lambda: None if self.error is None else Error.from_dict(self.error))
@@ -46,3 +46,25 @@ class EngineStatus(str, Enum):
     FINISHING = "finishing"
     FAILED = "failed"
     SUCCEEDED = "succeeded"
+
+
+class CommandStatus(str, Enum):
+    """
+    Copied from opentrons.protocol_engine.commands.CommandStatus.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def is_done(self) -> bool:
+        return self in (CommandStatus.SUCCEEDED, CommandStatus.FAILED)
+
+
+class AnalysisStatus(str, Enum):
+    """
+    Copied from robot_server.protocols.analysis_models.AnalysisStatus.
+    """
+    PENDING = "pending"
+    COMPLETED = "completed"
@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+import re
+from functools import lru_cache
+from typing import Dict, Pattern
 
 
-@dataclass(frozen=True)
 class Paths:
     """
     HTTP API paths.
@@ -75,3 +76,27 @@ class Paths:
     # SYSTEM CONTROL
 
     # SUBSYSTEM MANAGEMENT
+
+
+def _template_patterns() -> Dict[str, Pattern]:
+    templates = (value for name, value in vars(Paths).items() if name.isupper())
+    return {template: re.compile('^' + re.sub(r'\\{\w+\\}', '[^/]+', re.escape(template)) + '$')
+            for template in templates}
+
+
+_TEMPLATE_PATTERNS = _template_patterns()
+
+
+@lru_cache(maxsize=1024)
+def path_template(path: str) -> str:
+    """
+    Get the Paths constant that a path was formatted from, e.g. '/runs/123' gives Paths.RUNS_RUN_ID. Returns the path
+    itself if it doesn't match any constant.
+    """
+    if path in _TEMPLATE_PATTERNS:
+        return path
+
+    for template, pattern in _TEMPLATE_PATTERNS.items():
+        if pattern.match(path):
+            return template
+    return path
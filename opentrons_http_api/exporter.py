@@ -0,0 +1,306 @@
+"""
+Export of the run history of robots, i.e. each run with its commands and errors, to NDJSON or Parquet files. Records
+are streamed to the files a page of commands at a time, and exports resume from a checkpoint of the runs already
+exported.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, IO, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from opentrons_http_api.defs.dict_data import RunInfo
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.atomic_json import dump_atomic
+
+
+RUNS = 'runs'
+COMMANDS = 'commands'
+ERRORS = 'errors'
+
+
+class RecordWriter(ABC):
+    """
+    Base class of writers of records, i.e. JSON serializable dicts, to the runs, commands and errors tables. Writers are
+    called from many threads at once.
+    """
+    def __enter__(self) -> RecordWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @abstractmethod
+    def write(self, table: str, records: Sequence[dict]) -> None:
+        pass
+
+    @abstractmethod
+    def flush(self) -> None:
+        """
+        Make all records written so far durable.
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+class NdjsonWriter(RecordWriter):
+    """
+    Appends the records of each table to a newline delimited JSON file in a directory, e.g. commands.ndjson.
+    """
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._files: Dict[str, IO[str]] = {}
+
+    def write(self, table: str, records: Sequence[dict]) -> None:
+        text = ''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                       for record in records)
+        with self._lock:
+            f = self._files.get(table)
+            if f is None:
+                f = self._files[table] = open(os.path.join(self._directory, f'{table}.ndjson'), 'a')
+            f.write(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            for f in self._files.values():
+                f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+
+class ParquetWriter(RecordWriter):
+    """
+    Writes the records of each table to Parquet files in a directory, with a column per known field and the rest of
+    each record as JSON in an "extra" column. Fields that hold objects or arrays are stored as JSON strings.
+
+    A Parquet file can't be appended to, so each flush starts new part files, e.g. commands-<session>-0001.parquet.
+    Requires the optional pyarrow dependency.
+    """
+    # Known fields of each table and their types, where "json" is a JSON string
+    COLUMNS: Dict[str, Dict[str, str]] = {
+        RUNS: {
+            'host': 'string', 'id': 'string', 'createdAt': 'string', 'startedAt': 'string', 'completedAt': 'string',
+            'status': 'string', 'current': 'bool', 'protocolId': 'string', 'actions': 'json', 'errors': 'json',
+            'pipettes': 'json', 'modules': 'json', 'labware': 'json', 'liquids': 'json', 'labwareOffsets': 'json',
+        },
+        COMMANDS: {
+            'host': 'string', 'runId': 'string', 'index': 'int64', 'id': 'string', 'key': 'string',
+            'commandType': 'string', 'createdAt': 'string', 'startedAt': 'string', 'completedAt': 'string',
+            'status': 'string', 'intent': 'string', 'params': 'json', 'result': 'json', 'error': 'json',
+        },
+        ERRORS: {
+            'host': 'string', 'runId': 'string', 'id': 'string', 'createdAt': 'string', 'errorCode': 'string',
+            'errorType': 'string', 'detail': 'string', 'errorInfo': 'json', 'wrappedErrors': 'json',
+        },
+    }
+
+    def __init__(self, directory: str, compression: str = 'zstd'):
+        """
+        :param directory: Directory to write the files to.
+        :param compression: Parquet compression codec.
+        """
+        if pyarrow is None:
+            raise ImportError('ParquetWriter requires pyarrow, install it with "pip install pyarrow"')
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._compression = compression
+        self._session = f'{datetime.now().strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        self._part = 0
+        self._lock = threading.Lock()
+        # Buffered column values per table
+        self._columns: Dict[str, Dict[str, list]] = {}
+
+    @classmethod
+    def _schema(cls, table: str) -> pyarrow.Schema:
+        types = {'string': pyarrow.string(), 'json': pyarrow.string(), 'bool': pyarrow.bool_(),
+                 'int64': pyarrow.int64()}
+        fields = [(name, types[type_]) for name, type_ in cls.COLUMNS[table].items()]
+        return pyarrow.schema([*fields, ('extra', pyarrow.string())])
+
+    def write(self, table: str, records: Sequence[dict]) -> None:
+        columns = self.COLUMNS[table]
+        with self._lock:
+            buffer = self._columns.get(table)
+            if buffer is None:
+                buffer = self._columns[table] = {name: [] for name in (*columns, 'extra')}
+
+            for record in records:
+                for name, type_ in columns.items():
+                    value = record.get(name)
+                    buffer[name].append(value if type_ != 'json' or value is None else json.dumps(value))
+                extra = {key: value for key, value in record.items() if key not in columns}
+                buffer['extra'].append(json.dumps(extra) if extra else None)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._columns:
+                return
+
+            self._part += 1
+            for table, buffer in self._columns.items():
+                path = os.path.join(self._directory, f'{table}-{self._session}-{self._part:04}.parquet')
+                pyarrow.parquet.write_table(pyarrow.table(buffer, schema=self._schema(table)), path,
+                                            compression=self._compression)
+            self._columns.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class ExportCheckpoint:
+    """
+    The runs already exported from each robot, by run ID, with the time each run completed. Saved to a JSON file.
+    """
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: Optional JSON file to load the checkpoint from, if it exists, and save it to.
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._runs: Dict[str, Dict[str, str]] = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._runs = json.load(f)
+
+    def is_exported(self, host: str, run_info: RunInfo) -> bool:
+        """
+        Returns True iff the run was exported after it completed.
+        """
+        with self._lock:
+            return self._runs.get(host, {}).get(run_info.id) == run_info.completedAt
+
+    def update(self, host: str, runs: Sequence[RunInfo]) -> None:
+        """
+        Record runs as exported, and save the checkpoint.
+        """
+        with self._lock:
+            exported = self._runs.setdefault(host, {})
+            for run_info in runs:
+                exported[run_info.id] = run_info.completedAt
+            self._save()
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+
+        dump_atomic(self._runs, self._path)
+
+
+@dataclass(frozen=True)
+class ExportSummary:
+    runs: int
+    # Runs that were already exported, or haven't completed yet
+    skipped: int
+    commands: int
+    errors: int
+
+
+class RunExporter:
+    """
+    Exports the completed runs of a robot, with their commands and errors, to a RecordWriter, e.g.
+
+        with RobotClient(host) as client, NdjsonWriter('history') as writer:
+            RunExporter(client, writer, ExportCheckpoint('history/checkpoint.json')).export()
+
+    Runs are exported in parallel, and each run's commands are fetched and written a page at a time so that memory use
+    doesn't grow with the length of the run. Each record has the robot's host, and commands and errors have the ID of
+    their run.
+
+    Runs are skipped if the checkpoint shows they were already exported after they completed, and runs that haven't
+    completed are left for a later export. The checkpoint is updated after the writer is flushed, so the records of a
+    run are durable once it's in the checkpoint, although the records of a run interrupted mid-export are written again
+    when the export resumes.
+    """
+    def __init__(self, client: RobotClient, writer: RecordWriter, checkpoint: Optional[ExportCheckpoint] = None,
+                 max_workers: int = 4, page_length: int = 500, command_details: bool = False,
+                 checkpoint_interval: int = 10):
+        """
+        :param client: Client of the robot to export from.
+        :param writer: Writer of the records.
+        :param checkpoint: Checkpoint of the runs already exported, which is updated as runs are exported.
+        :param max_workers: Maximum number of runs to export at once.
+        :param page_length: Number of commands to fetch and write at a time.
+        :param command_details: If True, fetch the full details of each command including its result, at the cost of a
+        request per command. Otherwise export the command summaries.
+        :param checkpoint_interval: Number of exported runs between flushing the writer and updating the checkpoint.
+        """
+        self._client = client
+        self._writer = writer
+        self._checkpoint = ExportCheckpoint() if checkpoint is None else checkpoint
+        self._max_workers = max_workers
+        self._page_length = page_length
+        self._command_details = command_details
+        self._checkpoint_interval = checkpoint_interval
+
+    def export(self) -> ExportSummary:
+        host = self._client.host
+        runs = self._client.runs()
+        pending = [run_info for run_info in runs
+                   if run_info.completedAt is not None and not self._checkpoint.is_exported(host, run_info)]
+
+        commands = errors = 0
+        exported: List[RunInfo] = []
+        with ThreadPoolExecutor(self._max_workers, thread_name_prefix='exporter') as executor:
+            for run_info, (num_commands, num_errors) in zip(pending, executor.map(self._export_run, pending)):
+                commands += num_commands
+                errors += num_errors
+                exported.append(run_info)
+                if len(exported) >= self._checkpoint_interval:
+                    self._commit(exported)
+
+        self._commit(exported)
+        return ExportSummary(len(pending), len(runs) - len(pending), commands, errors)
+
+    def _commit(self, exported: List[RunInfo]) -> None:
+        if exported:
+            self._writer.flush()
+            self._checkpoint.update(self._client.host, exported)
+            exported.clear()
+
+    def _export_run(self, run_info: RunInfo) -> Tuple[int, int]:
+        """
+        Write the records of a run. Returns the number of commands and errors written.
+        """
+        host = self._client.host
+        num_commands = 0
+        batch = []
+        for command in self._client.iter_commands(run_info.id, page_length=self._page_length):
+            if self._command_details:
+                command = self._client.run_command(run_info.id, command['id'])
+            batch.append({'host': host, 'runId': run_info.id, 'index': num_commands, **command})
+            num_commands += 1
+            if len(batch) >= self._page_length:
+                self._writer.write(COMMANDS, batch)
+                batch = []
+        if batch:
+            self._writer.write(COMMANDS, batch)
+
+        errors = [{'host': host, 'runId': run_info.id, **error}
+                  for error in run_info.errors]
+        if errors:
+            self._writer.write(ERRORS, errors)
+
+        # Written last, so that a run's record means all its commands and errors were written
+        self._writer.write(RUNS, [{'host': host, **run_info.dict()}])
+        return num_commands, len(errors)
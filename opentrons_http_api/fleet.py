@@ -0,0 +1,136 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import partial
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from opentrons_http_api.defs.dict_data import ProtocolInfo
+from opentrons_http_api.robot_client import RobotClient
+
+
+@dataclass(frozen=True)
+class HostResult:
+    """
+    The outcome of a call on a single robot, holding either the returned value or the raised exception.
+    """
+    host: str
+    value: Any = None
+    exception: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.exception is None
+
+    def result(self) -> Any:
+        """
+        Returns the value, or raises the exception if the call failed.
+        """
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+
+class Fleet:
+    """
+    A group of robots that RobotClient calls are run on concurrently, e.g. fleet.health() calls RobotClient.health() on
+    every robot at once. Each call returns a dict of host to HostResult, and a failure on one robot does not affect the
+    others.
+    """
+    def __init__(self, hosts: Sequence[str], max_workers: Optional[int] = None, **client_kwargs):
+        """
+        :param hosts: Host names or IP addresses of the robots.
+        :param max_workers: Maximum number of concurrent calls, defaults to one per robot.
+        :param client_kwargs: Settings passed through to each RobotClient, e.g. timeout or protocol_index.
+        """
+        if len(set(hosts)) != len(hosts):
+            raise ValueError('hosts must be unique')
+
+        self._clients = {host: RobotClient(host, **client_kwargs)
+                         for host in hosts}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(len(hosts), 1),
+                                            thread_name_prefix='fleet')
+
+    def __enter__(self) -> Fleet:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Callable[..., Dict[str, HostResult]]:
+        if name.startswith('_') or not callable(getattr(RobotClient, name, None)):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return partial(self.call, name)
+
+    def close(self) -> None:
+        """
+        Stop the worker pool and close all pooled connections.
+        """
+        self._executor.shutdown()
+        for client in self._clients.values():
+            client.close()
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        return tuple(self._clients)
+
+    def client(self, host: str) -> RobotClient:
+        return self._clients[host]
+
+    def map(self, function: Callable[[RobotClient], Any]) -> Dict[str, HostResult]:
+        """
+        Call a function with each robot's client concurrently.
+        :param function: A function taking a RobotClient.
+        :return: A dict of host to HostResult, in the same order as the hosts.
+        """
+        futures = [self._executor.submit(self._call, function, host, client)
+                   for host, client in self._clients.items()]
+        return {result.host: result
+                for result in (future.result() for future in futures)}
+
+    def as_completed(self, function: Callable[[RobotClient], Any]) -> Iterator[HostResult]:
+        """
+        Call a function with each robot's client concurrently, yielding each robot's HostResult as soon as it's done,
+        e.g. to show results from fast robots without waiting for slow ones.
+        :param function: A function taking a RobotClient.
+        """
+        futures = [self._executor.submit(self._call, function, host, client)
+                   for host, client in self._clients.items()]
+        for future in as_completed(futures):
+            yield future.result()
+
+    @staticmethod
+    def _call(function: Callable[[RobotClient], Any], host: str, client: RobotClient) -> HostResult:
+        try:
+            return HostResult(host, value=function(client))
+        except Exception as e:
+            return HostResult(host, exception=e)
+
+    def call(self, method: str, *args, **kwargs) -> Dict[str, HostResult]:
+        """
+        Call a RobotClient method by name on each robot concurrently.
+        """
+        return self.map(lambda client: getattr(client, method)(*args, **kwargs))
+
+    def upload_protocol(self, protocol_file: BinaryIO,
+                        labware_definitions: Optional[Sequence[BinaryIO]] = None) -> Dict[str, HostResult]:
+        """
+        Upload a protocol with optional labware definitions to every robot. The files are read once and each robot is
+        sent its own copy, since a file object can't be read by several uploads at the same time.
+        """
+        files = (protocol_file, ) if labware_definitions is None else (protocol_file, *labware_definitions)
+        contents = tuple((getattr(f, 'name', None), f.read()) for f in files)
+
+        def upload(client: RobotClient) -> ProtocolInfo:
+            copies = tuple(_copy(content) for content in contents)
+            return client.upload_protocol(copies[0], None if labware_definitions is None else copies[1:])
+
+        return self.map(upload)
+
+
+def _copy(content: Tuple[Optional[str], bytes]) -> BinaryIO:
+    name, data = content
+    f = BytesIO(data)
+    if name is not None:
+        f.name = name
+    return f
@@ -0,0 +1,282 @@
+"""
+Instrumentation of the requests API and AsyncAPI send to robots. Hooks are called with the metrics of every request,
+including its status, sizes and timings, and middleware wraps every request, e.g. to add tracing or logging.
+
+HistogramAggregator is a hook that aggregates metrics in memory, and exports them in the Prometheus text format.
+"""
+from __future__ import annotations
+import bisect
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class RequestMetrics:
+    """
+    Metrics of a request to a robot. Times are in seconds, and are None if not measured, e.g. dns and connect are None
+    when an existing connection was reused.
+    """
+    host: str
+    method: str
+    # The Paths constant of the request, e.g. "/runs/{run_id}"
+    path: str
+    status: Optional[int] = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    dns: Optional[float] = None
+    connect: Optional[float] = None
+    # From sending the request to receiving the response headers
+    ttfb: Optional[float] = None
+    total: float = 0.
+    decode: Optional[float] = None
+    # The exception raised by the request, if any
+    error: Optional[BaseException] = None
+    # Number of times the request was retried
+    retries: int = 0
+
+
+Hook = Callable[[RequestMetrics], None]
+
+# Called with the metrics of a request, which are filled in as it progresses, and a function without arguments that
+# sends the request and returns the decoded response. Must return the result of calling that function, e.g.
+#
+#     def log(metrics, send):
+#         logger.debug('%s %s', metrics.method, metrics.path)
+#         return send()
+#
+# With AsyncAPI, send returns an awaitable, so middleware is usually a coroutine function that awaits it.
+Middleware = Callable[[RequestMetrics, Callable[[], Any]], Any]
+
+
+class Instrumentation:
+    """
+    Hooks and middleware for the requests of API or AsyncAPI, e.g. API(host, instrumentation=Instrumentation([hook])).
+    Can be shared by many clients, e.g. every robot in a Fleet.
+
+    Hooks are not called for responses served from a ResponseCache without a request.
+    """
+    def __init__(self, hooks: Sequence[Hook] = (), middleware: Sequence[Middleware] = ()):
+        """
+        :param hooks: Functions called with the metrics of every request once it has finished, successfully or not.
+        :param middleware: Functions wrapping every request, see Middleware. The first is the outermost.
+        """
+        self.hooks = list(hooks)
+        self.middleware = list(middleware)
+
+    def wrap(self, metrics: RequestMetrics, send: Callable[[], Any]) -> Callable[[], Any]:
+        """
+        Wrap a function that sends a request in the middleware.
+        """
+        for middleware in reversed(self.middleware):
+            send = partial(middleware, metrics, send)
+        return send
+
+    def record(self, metrics: RequestMetrics) -> None:
+        for hook in self.hooks:
+            hook(metrics)
+
+
+def body_size(body: Any) -> int:
+    """
+    Get the size in bytes of a request body sent by requests or aiohttp.
+    """
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    try:
+        return len(body)
+    except TypeError:
+        return getattr(body, 'size', None) or 0
+
+
+# Connection timings measured by TimedHTTPAdapter's connections, handed to the API in the thread that made the request
+connection_timings = threading.local()
+
+
+def reset_connection_timings() -> None:
+    connection_timings.dns = None
+    connection_timings.connect = None
+
+
+class Histogram:
+    """
+    A histogram of values with fixed bucket upper bounds, as in Prometheus.
+    """
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # Counts per bucket, not cumulative, with a final bucket for values above the last bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: Histogram) -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation within its bucket, as Prometheus' histogram_quantile() does. Values
+        above the last bucket are estimated as its bound. Returns None if there are no values.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+# Labels of a series: host, method, path and status
+Labels = Tuple[str, str, str, str]
+
+
+class HistogramAggregator:
+    """
+    A hook that aggregates request metrics in memory into histograms of each timing and counters of bytes, per robot,
+    endpoint and status, e.g.
+
+        metrics = HistogramAggregator()
+        client = RobotClient(host, instrumentation=Instrumentation([metrics]))
+        ...
+        print(metrics.quantile('total', 0.99, path=Paths.RUNS))
+        print(metrics.to_prometheus())
+
+    Requests that raised an exception before receiving a response have the exception's class name as their status.
+    """
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+    TIMINGS = ('dns', 'connect', 'ttfb', 'total', 'decode')
+
+    _HELP = {
+        'dns': 'Time to resolve the robot host name for a new connection',
+        'connect': 'Time to open a new connection to the robot',
+        'ttfb': 'Time from sending a request to receiving the response headers',
+        'total': 'Total time of a request, including decoding the response',
+        'decode': 'Time to decode the JSON response body',
+    }
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        :param buckets: Upper bounds of the histogram buckets in seconds, in increasing order.
+        """
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._bytes_sent: Dict[Labels, int] = {}
+        self._bytes_received: Dict[Labels, int] = {}
+
+    def __call__(self, metrics: RequestMetrics) -> None:
+        if metrics.status is not None:
+            status = str(metrics.status)
+        elif metrics.error is not None:
+            status = type(metrics.error).__name__
+        else:
+            status = ''
+        labels = (metrics.host, metrics.method, metrics.path, status)
+
+        with self._lock:
+            for timing in self.TIMINGS:
+                value = getattr(metrics, timing)
+                if value is not None:
+                    self._histogram(timing, labels).observe(value)
+            self._bytes_sent[labels] = self._bytes_sent.get(labels, 0) + metrics.bytes_sent
+            self._bytes_received[labels] = self._bytes_received.get(labels, 0) + metrics.bytes_received
+
+    def _histogram(self, timing: str, labels: Labels) -> Histogram:
+        histogram = self._histograms.get((timing, labels))
+        if histogram is None:
+            histogram = self._histograms[(timing, labels)] = Histogram(self._buckets)
+        return histogram
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._bytes_sent.clear()
+            self._bytes_received.clear()
+
+    def histogram(self, timing: str, host: Optional[str] = None, method: Optional[str] = None,
+                  path: Optional[str] = None, status: Optional[str] = None) -> Histogram:
+        """
+        Get a histogram of a timing, merged over all series matching the given labels.
+        :param timing: One of TIMINGS.
+        """
+        if timing not in self.TIMINGS:
+            raise ValueError(f'unknown timing "{timing}", expected one of {self.TIMINGS}')
+
+        match = (host, method, path, status)
+        merged = Histogram(self._buckets)
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                if name == timing and all(m is None or m == label for m, label in zip(match, labels)):
+                    merged.merge(histogram)
+        return merged
+
+    def quantile(self, timing: str, q: float, **labels: Optional[str]) -> Optional[float]:
+        """
+        Estimate a quantile of a timing over all series matching the given labels, e.g. quantile('ttfb', 0.5,
+        host='10.0.0.1'). Returns None if there are no values.
+        """
+        return self.histogram(timing, **labels).quantile(q)
+
+    def to_prometheus(self, prefix: str = 'opentrons_http') -> str:
+        """
+        Export the metrics in the Prometheus text exposition format, e.g. to serve from a /metrics endpoint.
+        """
+        with self._lock:
+            histograms = {key: (tuple(histogram.counts), histogram.sum, histogram.count)
+                          for key, histogram in self._histograms.items()}
+            counters = {'sent': dict(self._bytes_sent), 'received': dict(self._bytes_received)}
+
+        lines: List[str] = []
+        for timing in self.TIMINGS:
+            series = sorted((labels, values) for (name, labels), values in histograms.items() if name == timing)
+            if not series:
+                continue
+
+            name = f'{prefix}_request_{timing}_seconds'
+            lines.append(f'# HELP {name} {self._HELP[timing]}.')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, (counts, total, count) in series:
+                label_text = _labels(labels)
+                cumulative = 0
+                for bound, bucket_count in zip((*map(repr, self._buckets), '+Inf'), counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label_text}}} {total!r}')
+                lines.append(f'{name}_count{{{label_text}}} {count}')
+
+        for direction, counter in counters.items():
+            if not counter:
+                continue
+            name = f'{prefix}_request_{direction}_bytes_total'
+            body = 'request' if direction == 'sent' else 'response'
+            lines.append(f'# HELP {name} Bytes {direction} in {body} bodies.')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(counter.items()):
+                lines.append(f'{name}{{{_labels(labels)}}} {value}')
+
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def _labels(labels: Labels) -> str:
+    return ','.join(f'{name}="{_escape(value)}"'
+                    for name, value in zip(('host', 'method', 'path', 'status'), labels))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,161 @@
+"""
+A minimal transport for API on the standard library's http.client, selected with API(host, transport='minimal'), for
+one-shot calls from short-lived processes, e.g. CLI commands or health checks, where importing requests would take
+longer than the call itself.
+
+Errors are raised as the same requests exceptions as the default transport, so that callers can handle both alike,
+with requests only imported once an error is raised.
+"""
+from __future__ import annotations
+import http.client
+import json as json_
+import socket
+import threading
+from datetime import timedelta
+from time import perf_counter
+from typing import Any, Mapping, Optional, Tuple, Union
+from urllib.parse import urlencode, urlsplit
+
+
+Timeout = Optional[Union[float, Tuple[float, float]]]
+
+
+class MinimalRequest:
+    """
+    The parts of a sent request used by API, as in requests.PreparedRequest.
+    """
+    def __init__(self, method: str, url: str, body: Any):
+        self.method = method
+        self.url = url
+        self.body = body
+
+
+class MinimalResponse:
+    """
+    The parts of a response used by API, as in requests.Response.
+    """
+    def __init__(self, request: MinimalRequest, status_code: int, reason: str, headers: http.client.HTTPMessage,
+                 content: bytes, elapsed: float):
+        self.request = request
+        self.url = request.url
+        self.status_code = status_code
+        self.reason = reason
+        # Case insensitive, like the headers of requests
+        self.headers = headers
+        self.content = content
+        # From sending the request to receiving the response headers
+        self.elapsed = timedelta(seconds=elapsed)
+
+    def raise_for_status(self) -> None:
+        if self.status_code < 400:
+            return
+
+        import requests
+        kind = 'Client' if self.status_code < 500 else 'Server'
+        raise requests.HTTPError(f'{self.status_code} {kind} Error: {self.reason} for url: {self.url}',
+                                 response=self)
+
+
+class MinimalSession:
+    """
+    Sends requests over a single keep-alive connection, with the same get() and post() arguments as requests.Session
+    that API uses. Requests from many threads are sent one at a time.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._address: Optional[Tuple[str, int]] = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+    def get(self, url: str, timeout: Timeout = None, headers: Optional[Mapping[str, str]] = None,
+            params: Optional[Mapping[str, Any]] = None) -> MinimalResponse:
+        return self.request('GET', url, timeout, headers, params, idempotent=True)
+
+    def post(self, url: str, timeout: Timeout = None, headers: Optional[Mapping[str, str]] = None,
+             params: Optional[Mapping[str, Any]] = None, json: Any = None, data: Any = None,
+             idempotent: bool = False) -> MinimalResponse:
+        """
+        :param idempotent: Whether the request can be sent again if the kept alive connection is closed while it's
+        sent, e.g. a POST with a dedup key, since the robot may have handled it before closing the connection.
+        """
+        headers = dict(headers or {})
+        if data is None and json is not None:
+            data = json_.dumps(json).encode()
+            headers.setdefault('Content-Type', 'application/json')
+        # A file-like body, e.g. a MultipartEncoder, would otherwise be sent with chunked encoding
+        headers['Content-Length'] = str(0 if data is None else len(data))
+        return self.request('POST', url, timeout, headers, params, data, idempotent)
+
+    def request(self, method: str, url: str, timeout: Timeout = None, headers: Optional[Mapping[str, str]] = None,
+                params: Optional[Mapping[str, Any]] = None, body: Any = None,
+                idempotent: bool = False) -> MinimalResponse:
+        parts = urlsplit(url)
+        target = parts.path or '/'
+        if params:
+            # As with requests, parameters that are None are left out
+            target += '?' + urlencode({key: value for key, value in params.items() if value is not None}, doseq=True)
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+        with self._lock:
+            # Retry an idempotent request once on a new connection if the robot closed the kept alive one
+            for attempt in range(2):
+                connection, reused = self._connect((parts.hostname, parts.port or 80), connect_timeout, read_timeout,
+                                                   new=attempt > 0)
+                start = perf_counter()
+                try:
+                    connection.request(method, target, body=body, headers=dict(headers or {}))
+                    response = connection.getresponse()
+                    elapsed = perf_counter() - start
+                    content = response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                    self._drop()
+                    # A body read from a file can't be sent again
+                    if reused and idempotent and not hasattr(body, 'read'):
+                        continue
+                    self._raise(e, connect=False)
+                except (OSError, http.client.HTTPException) as e:
+                    self._drop()
+                    self._raise(e, connect=False)
+
+                if response.will_close:
+                    self._drop()
+                return MinimalResponse(MinimalRequest(method, url, body), response.status, response.reason,
+                                       response.headers, content, elapsed)
+
+    def _connect(self, address: Tuple[str, int], connect_timeout: Optional[float], read_timeout: Optional[float],
+                 new: bool) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Get the kept alive connection to an address, or else open a new one. Returns the connection and whether it was
+        reused.
+        """
+        if new or address != self._address:
+            self._drop()
+        if self._connection is not None:
+            self._connection.sock.settimeout(read_timeout)
+            return self._connection, True
+
+        connection = http.client.HTTPConnection(*address, timeout=connect_timeout)
+        try:
+            connection.connect()
+        except OSError as e:
+            self._raise(e, connect=True)
+        connection.sock.settimeout(read_timeout)
+        self._connection = connection
+        self._address = address
+        return connection, False
+
+    def _drop(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @staticmethod
+    def _raise(error: Exception, connect: bool) -> None:
+        import requests
+        # socket.timeout is only an alias of TimeoutError from Python 3.10
+        if isinstance(error, (TimeoutError, socket.timeout)):
+            raise (requests.ConnectTimeout if connect else requests.ReadTimeout)(error) from error
+        raise requests.ConnectionError(error) from error
@@ -0,0 +1,349 @@
+"""
+A local SQLite mirror of the runs, protocols, settings and health of robots, kept up to date by a background syncer, so
+that queries across robots and history are local indexed lookups rather than requests.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import requests
+
+from opentrons_http_api.api import API
+from opentrons_http_api.defs.dict_data import HealthInfo, ProtocolInfo, RunInfo, Setting, Status
+from opentrons_http_api.defs.enums import EngineStatus
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    host TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created_at REAL,
+    completed_at REAL,
+    status TEXT NOT NULL,
+    -- Whether the run won't change, i.e. it's done or was deleted from the robot
+    final INTEGER NOT NULL,
+    protocol_id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (host, id)
+);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, created_at);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_protocol_id ON runs (protocol_id);
+CREATE INDEX IF NOT EXISTS runs_not_final ON runs (host) WHERE NOT final;
+
+CREATE TABLE IF NOT EXISTS protocols (
+    host TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created_at REAL,
+    protocol_type TEXT,
+    robot_type TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (host, id)
+);
+CREATE INDEX IF NOT EXISTS protocols_protocol_type ON protocols (protocol_type);
+
+CREATE TABLE IF NOT EXISTS settings (
+    host TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (host, id)
+);
+
+CREATE TABLE IF NOT EXISTS health (
+    host TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+'''
+
+
+def _timestamp(value: Optional[Union[str, datetime]]) -> Optional[float]:
+    """
+    Convert an ISO 8601 time from the robot, or a datetime, to a POSIX timestamp.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # fromisoformat only accepts Z from Python 3.11
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value.timestamp()
+
+
+def _is_done(run: dict) -> bool:
+    return Status(EngineStatus(run['status'])).is_done
+
+
+class RobotMirror:
+    """
+    A SQLite database of the runs, protocols, settings and health of robots, updated by a MirrorSyncer. Can be shared by
+    many threads.
+
+    Runs and protocols are kept after they're deleted from a robot, e.g. when the robot deletes its oldest runs to make
+    room for new ones, so the mirror also serves as a history.
+    """
+    def __init__(self, path: str = ':memory:'):
+        """
+        :param path: Path of the database file, which is created if it doesn't exist, or ":memory:" for a database that
+        only lasts as long as this object.
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            # Readers don't block the syncer, and vice versa
+            self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> RobotMirror:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql: str, parameters: Sequence = ()) -> List[tuple]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    # Updates, called by MirrorSyncer
+
+    def put_runs(self, host: str, runs: Iterable[dict]) -> None:
+        rows = [(host, run['id'], _timestamp(run.get('createdAt')), _timestamp(run.get('completedAt')), run['status'],
+                 _is_done(run), run.get('protocolId'), json.dumps(run))
+                for run in runs]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def finalize_run(self, host: str, run_id: str) -> None:
+        """
+        Mark a run that wasn't done as final, e.g. because it was deleted from the robot, so that it isn't synced again.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('UPDATE runs SET final = 1 WHERE host = ? AND id = ?', (host, run_id))
+
+    def put_protocols(self, host: str, protocols: Iterable[dict]) -> None:
+        rows = [(host, protocol['id'], _timestamp(protocol.get('createdAt')), protocol.get('protocolType'),
+                 protocol.get('robotType'), json.dumps(protocol))
+                for protocol in protocols]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO protocols VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def put_settings(self, host: str, settings: Iterable[dict]) -> None:
+        rows = [(host, setting['id'], json.dumps(setting))
+                for setting in settings]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO settings VALUES (?, ?, ?)', rows)
+
+    def put_health(self, host: str, health: dict) -> None:
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO health VALUES (?, ?, ?)',
+                                     (host, time(), json.dumps(health)))
+
+    # Queries
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        """
+        The robots that have been synced at least once.
+        """
+        return tuple(host for host, in self._query('SELECT host FROM health ORDER BY host'))
+
+    def run_ids(self, host: str) -> Set[str]:
+        return {run_id for run_id, in self._query('SELECT id FROM runs WHERE host = ?', (host, ))}
+
+    def unfinished_run_ids(self, host: str) -> Set[str]:
+        """
+        IDs of the runs of a robot that weren't done when last synced.
+        """
+        return {run_id for run_id, in self._query('SELECT id FROM runs WHERE host = ? AND NOT final', (host, ))}
+
+    def runs(self, host: Optional[str] = None, status: Optional[Union[str, EngineStatus]] = None,
+             since: Optional[Union[str, datetime]] = None, until: Optional[Union[str, datetime]] = None,
+             protocol_id: Optional[str] = None) -> List[Tuple[str, RunInfo]]:
+        """
+        Get runs matching all the given filters, e.g. runs(status=EngineStatus.FAILED, since=a_week_ago) for all failed
+        runs this week on any robot.
+        :param host: Only runs of this robot.
+        :param status: Only runs with this status.
+        :param since: Only runs created at or after this time.
+        :param until: Only runs created before this time.
+        :param protocol_id: Only runs of this protocol.
+        :return: (host, run) pairs, most recent first.
+        """
+        if isinstance(status, EngineStatus):
+            status = status.value
+
+        conditions = {
+            'host = ?': host,
+            'status = ?': status,
+            'created_at >= ?': _timestamp(since),
+            'created_at < ?': _timestamp(until),
+            'protocol_id = ?': protocol_id,
+        }
+        where, parameters = self._where(conditions)
+        rows = self._query(f'SELECT host, data FROM runs {where} ORDER BY created_at DESC', parameters)
+        return [(host, RunInfo.from_dict(json.loads(data)))
+                for host, data in rows]
+
+    def protocols(self, host: Optional[str] = None,
+                  protocol_type: Optional[str] = None) -> List[Tuple[str, ProtocolInfo]]:
+        """
+        Get protocols matching all the given filters, e.g. protocols(protocol_type='python').
+        :return: (host, protocol) pairs, most recent first.
+        """
+        where, parameters = self._where({'host = ?': host, 'protocol_type = ?': protocol_type})
+        rows = self._query(f'SELECT host, data FROM protocols {where} ORDER BY created_at DESC', parameters)
+        return [(host, ProtocolInfo.from_dict(json.loads(data)))
+                for host, data in rows]
+
+    def settings(self, host: str) -> Tuple[Setting, ...]:
+        rows = self._query('SELECT data FROM settings WHERE host = ? ORDER BY id', (host, ))
+        return tuple(Setting.from_dict(json.loads(data))
+                     for data, in rows)
+
+    def health(self, host: str) -> Optional[HealthInfo]:
+        """
+        Get the health of a robot when it was last synced, or None if it hasn't been.
+        """
+        rows = self._query('SELECT data FROM health WHERE host = ?', (host, ))
+        return HealthInfo.from_dict(json.loads(rows[0][0])) if rows else None
+
+    def synced_at(self, host: str) -> Optional[float]:
+        """
+        Get the POSIX time a robot was last synced, or None if it hasn't been.
+        """
+        rows = self._query('SELECT synced_at FROM health WHERE host = ?', (host, ))
+        return rows[0][0] if rows else None
+
+    @staticmethod
+    def _where(conditions: Dict[str, object]) -> Tuple[str, list]:
+        conditions = {condition: value for condition, value in conditions.items() if value is not None}
+        if not conditions:
+            return '', []
+        return 'WHERE ' + ' AND '.join(conditions), list(conditions.values())
+
+
+class MirrorSyncer:
+    """
+    Keeps a RobotMirror up to date with robots, syncing every robot at once in a background thread, e.g.
+
+        with RobotMirror('robots.db') as mirror, MirrorSyncer(mirror, hosts, interval=30) as syncer:
+            ...
+            failed = mirror.runs(status=EngineStatus.FAILED)
+
+    Each sync only downloads the runs that are new or weren't done when last synced, since a done run doesn't change.
+    New runs are found by fetching the most recent runs in pages of increasing length until reaching a run that was
+    already done, and each other unfinished run is fetched individually.
+    """
+    def __init__(self, mirror: RobotMirror, hosts: Sequence[str], interval: float = 60., page_length: int = 10,
+                 **api_kwargs):
+        """
+        :param mirror: The mirror to update.
+        :param hosts: Host names or IP addresses of the robots.
+        :param interval: Seconds between syncs.
+        :param page_length: Number of recent runs to fetch first each sync, doubling until reaching known runs.
+        :param api_kwargs: Settings passed through to each API, e.g. timeout.
+        """
+        if len(set(hosts)) != len(hosts):
+            raise ValueError('hosts must be unique')
+
+        self._mirror = mirror
+        self._apis = {host: API(host, **api_kwargs)
+                      for host in hosts}
+        self._interval = interval
+        self._page_length = page_length
+
+        # The exception raised by the latest sync of each robot that failed
+        self.errors: Dict[str, Exception] = {}
+
+        self._executor = ThreadPoolExecutor(max_workers=max(len(hosts), 1), thread_name_prefix='mirror')
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> MirrorSyncer:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """
+        Start syncing in the background, starting with a sync now.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mirror-syncer', daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop syncing, and close all pooled connections.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown()
+        for api in self._apis.values():
+            api.close()
+
+    def sync(self) -> None:
+        """
+        Sync every robot now, waiting until done. Errors are recorded in errors rather than raised.
+        """
+        for host, error in zip(self._apis, self._executor.map(self._sync_host, self._apis)):
+            if error is None:
+                self.errors.pop(host, None)
+            else:
+                self.errors[host] = error
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(self._interval)
+
+    def _sync_host(self, host: str) -> Optional[Exception]:
+        api = self._apis[host]
+        try:
+            self._sync_runs(host, api)
+            self._mirror.put_protocols(host, api.get_protocols()['data'])
+            self._mirror.put_settings(host, api.get_settings()['settings'])
+            # Last, so that the sync time is only updated once everything else is
+            self._mirror.put_health(host, api.get_health())
+        except Exception as e:
+            return e
+        return None
+
+    def _sync_runs(self, host: str, api: API) -> None:
+        known = self._mirror.run_ids(host)
+        unfinished = self._mirror.unfinished_run_ids(host)
+
+        # Fetch the most recent runs until reaching a known run that was done, before which every run is known
+        page_length = self._page_length
+        while True:
+            if not known:
+                runs = api.get_runs()['data']
+                break
+            runs = api.get_runs(page_length=page_length)['data']
+            if len(runs) < page_length or any(run['id'] in known and run['id'] not in unfinished for run in runs):
+                break
+            page_length *= 2
+        self._mirror.put_runs(host, runs)
+
+        # Refetch the other runs that weren't done
+        for run_id in unfinished - {run['id'] for run in runs}:
+            try:
+                run = api.get_runs_run_id(run_id)['data']
+            except requests.HTTPError as e:
+                # Deleted from the robot before it was seen to finish
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                self._mirror.finalize_run(host, run_id)
+                continue
+            self._mirror.put_runs(host, [run])
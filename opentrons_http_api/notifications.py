@@ -0,0 +1,160 @@
+"""
+Push notifications from the MQTT broker that newer robot server versions run next to the HTTP API, on port 1883. When
+a resource changes, the robot publishes {"refetch": true} on its topic, e.g. robot-server/runs/<run ID>, telling
+clients to fetch it again over HTTP, rather than having to poll it.
+
+RunWatcher and AsyncRunWatcher use a NotificationClient, if given, to only fetch a run when it changes, and fall back to
+polling while the broker is unreachable, e.g. on older robots. Requires the optional paho-mqtt dependency.
+"""
+from __future__ import annotations
+import json
+import threading
+from typing import Callable, Dict, List
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:
+    mqtt = None
+
+
+class Topics:
+    """
+    Topics the robot server publishes notifications on.
+    """
+    # The list of runs, e.g. a run was created or deleted
+    RUNS = 'robot-server/runs'
+    # A run, formatted with its ID
+    RUN = 'robot-server/runs/{run_id}'
+    CURRENT_COMMAND = 'robot-server/runs/current_command'
+    COMMANDS_LINKS = 'robot-server/runs/commands_links'
+    MAINTENANCE_CURRENT_RUN = 'robot-server/maintenance_runs/current_run'
+    DECK_CONFIGURATION = 'robot-server/deck_configuration'
+
+
+# Called with the payload of a notification, e.g. {"refetch": true}
+NotificationCallback = Callable[[dict], None]
+
+# The payload callbacks are called with on connecting, since notifications may have been missed while disconnected
+_REFETCH = {'refetch': True}
+
+
+class NotificationClient:
+    """
+    Subscribes to a robot's notifications, e.g.
+
+        notifications = NotificationClient(host)
+        unsubscribe = notifications.subscribe(Topics.RUNS, lambda payload: print('runs changed'))
+
+    Connects in a background thread, and keeps reconnecting while the broker is unreachable. Callbacks are called from
+    that thread, so should return quickly.
+    """
+    PORT = 1883
+
+    def __init__(self, host: str = 'localhost', port: int = PORT, keepalive: int = 60, connect_timeout: float = 1.,
+                 max_reconnect_delay: float = 30.):
+        """
+        :param host: Host name or IP address of the robot.
+        :param port: Port of the robot's MQTT broker.
+        :param keepalive: Seconds between keep alive pings to the broker.
+        :param connect_timeout: Seconds to wait for the first connection before returning, after which connected is
+        False until the connection succeeds.
+        :param max_reconnect_delay: Maximum seconds between attempts to connect, which back off from 1 second.
+        """
+        if mqtt is None:
+            raise ImportError('NotificationClient requires paho-mqtt, install it with '
+                              '"pip install opentrons-http-api[notifications]"')
+
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, List[NotificationCallback]] = {}
+        self._connected = threading.Event()
+
+        # paho-mqtt 2 requires choosing the callback API version
+        if hasattr(mqtt, 'CallbackAPIVersion'):
+            self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        else:
+            self._client = mqtt.Client()
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_message = self._on_message
+        self._client.reconnect_delay_set(min_delay=min(1., max_reconnect_delay), max_delay=max_reconnect_delay)
+        self._client.connect_async(host, port, keepalive)
+        self._client.loop_start()
+        self._connected.wait(connect_timeout)
+
+    def __enter__(self) -> NotificationClient:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._client.disconnect()
+        self._client.loop_stop()
+        self._connected.clear()
+
+    @property
+    def connected(self) -> bool:
+        """
+        Whether connected to the broker, i.e. notifications are being received.
+        """
+        return self._connected.is_set()
+
+    def subscribe(self, topic: str, callback: NotificationCallback) -> Callable[[], None]:
+        """
+        Call a function with the payload of each notification on a topic, which may contain MQTT wildcards. The function
+        is also called with {"refetch": true} whenever the client (re)connects, since notifications may have been
+        missed while disconnected.
+        :return: A function that unsubscribes.
+        """
+        with self._lock:
+            callbacks = self._callbacks.setdefault(topic, [])
+            callbacks.append(callback)
+            if len(callbacks) == 1 and self.connected:
+                self._client.subscribe(topic)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                callbacks_ = self._callbacks.get(topic, [])
+                if callback in callbacks_:
+                    callbacks_.remove(callback)
+                if not callbacks_ and self._callbacks.pop(topic, None) is not None and self.connected:
+                    self._client.unsubscribe(topic)
+
+        return unsubscribe
+
+    def _on_connect(self, client: mqtt.Client, userdata, flags, reason_code, *args) -> None:
+        if reason_code != 0:
+            return
+
+        with self._lock:
+            self._connected.set()
+            topics = list(self._callbacks)
+            for topic in topics:
+                client.subscribe(topic)
+        for topic in topics:
+            self._dispatch(topic, _REFETCH, exact=True)
+
+    def _on_disconnect(self, *args) -> None:
+        self._connected.clear()
+
+    def _on_message(self, client: mqtt.Client, userdata, message: mqtt.MQTTMessage) -> None:
+        try:
+            payload = json.loads(message.payload)
+        except ValueError:
+            return
+        self._dispatch(message.topic, payload)
+
+    def _dispatch(self, topic: str, payload: dict, exact: bool = False) -> None:
+        """
+        Call the callbacks of the subscriptions matching a topic, or if exact, only those of the topic itself.
+        """
+        with self._lock:
+            callbacks = [callback for subscription, subscribed in self._callbacks.items()
+                         if subscription == topic or not exact and mqtt.topic_matches_sub(subscription, topic)
+                         for callback in subscribed]
+        for callback in callbacks:
+            # So that a failing callback doesn't stop the client's thread
+            try:
+                callback(payload)
+            except Exception:
+                pass
@@ -0,0 +1,183 @@
+"""
+Retries and circuit breaking for the requests API and AsyncAPI send to robots.
+
+RetryPolicy decides which failed requests are retried and how long to wait first, with jittered exponential backoff so
+that many clients retrying a robot at once don't retry in lockstep. Only idempotent requests are retried: GETs, and
+POSTs sent with a dedup key.
+
+CircuitBreaker tracks the failures of each robot, and once a robot has failed too many requests in a row, fails its
+requests fast with CircuitOpenError rather than waiting for each one to time out, e.g. while the robot reboots.
+"""
+from __future__ import annotations
+import threading
+from enum import Enum
+from random import uniform
+from time import monotonic
+from typing import Callable, Dict, Optional, Sequence
+
+
+class RetryPolicy:
+    """
+    When to retry an idempotent request after a connection error, a timeout or a response with a retry status.
+    """
+    def __init__(self, retries: int = 0, backoff_factor: float = 0.5, max_backoff: float = 10.,
+                 statuses: Sequence[int] = (502, 503, 504), jitter: bool = True):
+        """
+        :param retries: Maximum number of times to retry a request.
+        :param backoff_factor: Backoff in seconds before the first retry, doubling after each retry.
+        :param max_backoff: Maximum backoff in seconds before a retry.
+        :param statuses: Response statuses to retry.
+        :param jitter: If True, wait a random time between 0 and the backoff ("full jitter"), otherwise the backoff.
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.jitter = jitter
+
+    def __repr__(self) -> str:
+        return (f'{type(self).__name__}(retries={self.retries}, backoff_factor={self.backoff_factor}, '
+                f'max_backoff={self.max_backoff}, statuses={tuple(sorted(self.statuses))}, jitter={self.jitter})')
+
+    def should_retry(self, retries: int, status: Optional[int] = None) -> bool:
+        """
+        Whether to retry a request that failed with a connection error or timeout, or if status is given, that got a
+        response with that status.
+        :param retries: Number of times the request has been retried so far.
+        :param status: The response status, if any.
+        """
+        return retries < self.retries and (status is None or status in self.statuses)
+
+    def backoff(self, retries: int) -> float:
+        """
+        Seconds to wait before retrying a request again.
+        :param retries: Number of times the request has been retried so far.
+        """
+        backoff = min(self.backoff_factor * 2 ** retries, self.max_backoff)
+        return uniform(0., backoff) if self.jitter else backoff
+
+
+class BreakerState(str, Enum):
+    # Requests are sent
+    CLOSED = 'closed'
+    # Requests fail fast
+    OPEN = 'open'
+    # Requests are sent to find out if the robot has recovered, and the next result closes or opens the circuit
+    HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Raised instead of sending a request to a robot whose circuit is open.
+    """
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f'circuit open for {host} after repeated failures, retrying in {retry_in:.1f}s')
+        self.host = host
+        self.retry_in = retry_in
+
+
+# Called with the host, old state and new state whenever the state of a robot's circuit changes
+StateListener = Callable[[str, BreakerState, BreakerState], None]
+
+
+class _Circuit:
+    __slots__ = ('failures', 'opened_at')
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+
+class CircuitBreaker:
+    """
+    The circuits of robots by host. Can be shared by the APIs of many robots, e.g.
+
+        breaker = CircuitBreaker()
+        fleet = Fleet(hosts, circuit_breaker=breaker)
+        ...
+        print(breaker.states())
+
+    A request fails if it raises a connection error or timeout, or gets a response with a retry status, after any
+    retries. Any other response, including 4xx errors, shows the robot is reachable.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.,
+                 on_change: Optional[StateListener] = None):
+        """
+        :param failure_threshold: Number of consecutive failed requests that opens a robot's circuit.
+        :param reset_timeout: Seconds a circuit stays open before requests are sent again to try the robot.
+        :param on_change: Optional function called whenever the state of a robot's circuit changes, e.g. to log it.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def state(self, host: str) -> BreakerState:
+        with self._lock:
+            circuit = self._circuits.get(host)
+            return BreakerState.CLOSED if circuit is None else self._state(circuit)
+
+    def states(self) -> Dict[str, BreakerState]:
+        """
+        The states of the circuits of all robots that have sent requests.
+        """
+        with self._lock:
+            return {host: self._state(circuit)
+                    for host, circuit in self._circuits.items()}
+
+    def failures(self, host: str) -> int:
+        """
+        Number of consecutive failed requests to a robot.
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            return 0 if circuit is None else circuit.failures
+
+    def reset(self, host: str) -> None:
+        """
+        Close a robot's circuit, e.g. once it's known to be back up.
+        """
+        self.record_success(host)
+
+    def check(self, host: str) -> None:
+        """
+        Called before sending a request to a robot.
+        :raises CircuitOpenError: If the robot's circuit is open.
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or self._state(circuit) is not BreakerState.OPEN:
+                return
+            retry_in = circuit.opened_at + self.reset_timeout - monotonic()
+        raise CircuitOpenError(host, retry_in)
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            old = self._state(circuit)
+            circuit.failures = 0
+            circuit.opened_at = None
+        self._changed(host, old, BreakerState.CLOSED)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            old = self._state(circuit)
+            circuit.failures += 1
+            # A failure while half open opens the circuit again for another reset_timeout
+            if circuit.failures >= self.failure_threshold and old is not BreakerState.OPEN:
+                circuit.opened_at = monotonic()
+            new = self._state(circuit)
+        self._changed(host, old, new)
+
+    def _state(self, circuit: _Circuit) -> BreakerState:
+        if circuit.opened_at is None:
+            return BreakerState.CLOSED
+        if monotonic() - circuit.opened_at < self.reset_timeout:
+            return BreakerState.OPEN
+        return BreakerState.HALF_OPEN
+
+    def _changed(self, host: str, old: BreakerState, new: BreakerState) -> None:
+        if self._on_change is not None and new is not old:
+            self._on_change(host, old, new)
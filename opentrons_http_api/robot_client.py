@@ -1,17 +1,61 @@
 from __future__ import annotations
-from typing import Tuple, BinaryIO, Optional, Sequence, Union
+import threading
+from collections import deque
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Tuple, BinaryIO, Iterable, Iterator, Optional, Sequence, Union
+from weakref import WeakValueDictionary
 
 from opentrons_http_api.api import API
-from opentrons_http_api.defs.dict_data import LabwareOffset, Setting, RobotSettings, HealthInfo, RunInfo, ProtocolInfo
-from opentrons_http_api.defs.enums import SettingId, Action
+from opentrons_http_api.defs.dict_data import LabwareOffset, Setting, RobotSettings, HealthInfo, RunInfo, ProtocolInfo, \
+    Status, CommandInfo
+from opentrons_http_api.defs.enums import SettingId, Action, EngineStatus
+from opentrons_http_api.utils.labware_offset_store import LabwareOffsets, offset_dicts
+from opentrons_http_api.utils.labware_registry import LabwareDefinitions, missing_definitions
+
+# Imported when first used, so that importing this module is fast enough for short-lived processes
+if TYPE_CHECKING:
+    from opentrons_http_api.notifications import NotificationClient
+    from opentrons_http_api.run_watcher import RunWatcher
+    from opentrons_http_api.utils.multipart import ProgressCallback
+    from opentrons_http_api.utils.protocol_index import ProtocolIndex
 
 
 class RobotClient:
     """
     Robot client interface that utilises the Opentrons HTTP API.
     """
-    def __init__(self, host: str = 'localhost'):
-        self._api = API(host)
+    def __init__(self, host: str = 'localhost', protocol_index: Optional[ProtocolIndex] = None,
+                 notifications: Optional[NotificationClient] = None, **api_kwargs):
+        """
+        :param host: Host name or IP address of the robot.
+        :param protocol_index: An optional index of uploaded protocols, used to skip uploading a protocol with the same
+        files as one already on the robot.
+        :param notifications: An optional client of the robot's notification broker, used by run watchers to poll
+        runs only when the robot notifies that they changed.
+        :param api_kwargs: Connection settings passed through to API, e.g. pool_maxsize, retries or timeout.
+        """
+        self._host = host
+        self._protocol_index = protocol_index
+        self._notifications = notifications
+        self._api = API(host, **api_kwargs)
+        self._watchers: WeakValueDictionary[str, RunWatcher] = WeakValueDictionary()
+        self._watchers_lock = threading.Lock()
+
+    def __enter__(self) -> RobotClient:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close all pooled connections to the robot.
+        """
+        self._api.close()
+
+    @property
+    def host(self) -> str:
+        return self._host
 
     def identify(self, seconds: int) -> None:
         self._api.post_identify(seconds)
@@ -24,7 +68,7 @@ class RobotClient:
 
     def settings(self) -> Tuple[Setting, ...]:
         d = self._api.get_settings()
-        return tuple(Setting(**setting)
+        return tuple(Setting.from_dict(setting)
                      for setting in d['settings'])
 
     def set_setting(self, id_: Union[str, SettingId], value: bool) -> None:
@@ -35,37 +79,134 @@ class RobotClient:
 
     def robot_settings(self) -> RobotSettings:
         d = self._api.get_robot_settings()
-        return RobotSettings(**d)
+        return RobotSettings.from_dict(d)
 
     def health(self) -> HealthInfo:
         info = self._api.get_health()
-        return HealthInfo(**info)
+        return HealthInfo.from_dict(info)
 
     def runs(self) -> Tuple[RunInfo, ...]:
         d = self._api.get_runs()
-        return tuple(RunInfo(**run_info)
+        return tuple(RunInfo.from_dict(run_info)
                      for run_info in d['data'])
 
-    def create_run(self, protocol_id: str,
-                   labware_offsets: Optional[Union[Sequence[dict], Sequence[LabwareOffset]]] = None) -> RunInfo:
-        if labware_offsets is None:
-            labware_offsets = []
+    def current_run(self) -> Optional[RunInfo]:
+        """
+        Get the current run, i.e. the run that controls the robot until it is done, or None if there isn't one.
+        """
+        # The current run is usually the most recent, in which case it's included
+        d = self._api.get_runs(page_length=1)
+        for run_info in d['data']:
+            if run_info['current']:
+                return RunInfo.from_dict(run_info)
 
-        # Get labware offsets as dicts
-        else:
-            if isinstance(labware_offsets[0], LabwareOffset):
-                labware_offsets = [offset.dict() for offset in labware_offsets]
+        current = d.get('links', {}).get('current')
+        if current is None:
+            return None
+        return self.run(current['href'].rsplit('/', 1)[-1])
 
+    def create_run(self, protocol_id: str,
+                   labware_offsets: Optional[LabwareOffsets] = None,
+                   dedup_key: Optional[str] = None) -> RunInfo:
+        """
+        Create a run of a protocol.
+        :param labware_offsets: Optional labware offsets as dicts, LabwareOffset objects or a LabwareOffsetStore.
+        :param dedup_key: An optional key, unique to this run, that allows creating the run to be retried, see
+        API.post_runs.
+        """
         data = {
             'protocolId': protocol_id,
-            'labwareOffsets': labware_offsets,
+            'labwareOffsets': [] if labware_offsets is None else offset_dicts(labware_offsets),
         }
-        d = self._api.post_runs(data)
-        return RunInfo(**d['data'])
+        d = self._api.post_runs(data, dedup_key)
+        return RunInfo.from_dict(d['data'])
 
     def run(self, run_id: str) -> RunInfo:
         d = self._api.get_runs_run_id(run_id)
-        return RunInfo(**d['data'])
+        return RunInfo.from_dict(d['data'])
+
+    def add_labware_offsets(self, run_id: str, labware_offsets: LabwareOffsets) -> Tuple[LabwareOffset, ...]:
+        """
+        Add labware offsets to an existing run, before the run is started, e.g. from a LabwareOffsetStore. Each offset
+        is sent in its own request, since older robots only accept one offset at a time.
+        :return: The added offsets.
+        """
+        return tuple(LabwareOffset.from_dict(self._api.post_runs_run_id_labware_offsets(run_id, offset)['data'])
+                     for offset in offset_dicts(labware_offsets))
+
+    def loaded_labware_definitions(self, run_id: str) -> Tuple[dict, ...]:
+        """
+        Get the definitions of the labware loaded by a run.
+        """
+        return tuple(self._api.get_runs_run_id_loaded_labware_definitions(run_id)['data'])
+
+    def add_labware_definitions(self, run_id: str, labware_definitions: LabwareDefinitions) -> Tuple[str, ...]:
+        """
+        Add custom labware definitions to an existing run, before the run is started, e.g. from a LabwareRegistry. Only
+        definitions the run hasn't already loaded are sent, rather than sending every definition with each protocol.
+        :param labware_definitions: Definitions as dicts or a LabwareRegistry.
+        :return: The URIs of the added definitions.
+        """
+        missing = missing_definitions(labware_definitions, self.loaded_labware_definitions(run_id))
+        return tuple(self._api.post_runs_run_id_labware_definitions(run_id, definition)['data']['definitionUri']
+                     for definition in missing)
+
+    def iter_commands(self, run_id: str, follow: bool = False, cursor: int = 0, page_length: int = 100,
+                      poll_interval: float = 1.) -> Iterator[dict]:
+        """
+        Iterate over the command summaries of a run, fetching them a page at a time so that memory use is constant.
+        Summaries are as they were when fetched, use run_command to get the full and current details of a command.
+        :param run_id: ID of the run.
+        :param follow: If True, keep waiting for new commands until the run is done.
+        :param cursor: Index of the first command to yield, e.g. to resume from a previous iteration.
+        :param page_length: Maximum number of commands to fetch per request.
+        :param poll_interval: Seconds to wait between requests once all current commands have been yielded.
+        """
+        done = False
+
+        while True:
+            d = self._api.get_runs_run_id_commands(run_id, cursor=cursor, page_length=page_length)
+            commands = d['data']
+            yield from commands
+            cursor += len(commands)
+
+            # Prefer the total length when available to avoid an extra request
+            total = d.get('meta', {}).get('totalLength')
+            if cursor < total if total is not None else len(commands) == page_length:
+                continue
+
+            # Commands may have been added since the last request, so fetch once more after the run is done
+            if not follow or done:
+                return
+            done = Status(EngineStatus(self._api.get_runs_run_id(run_id)['data']['status'])).is_done
+            if not done:
+                sleep(poll_interval)
+
+    def run_command(self, run_id: str, command_id: str) -> dict:
+        """
+        Get a command of a run along with any associated payload, result, and execution information.
+        """
+        return self._api.get_runs_run_id_commands_command_id(run_id, command_id)['data']
+
+    def watch_run(self, run_id: str, **watcher_kwargs) -> RunWatcher:
+        """
+        Get a watcher that delivers the status transitions of a run, e.g.
+
+            for old, new in robot.watch_run(run_id):
+                print(old, '->', new)
+
+        All callers watching the same run share a single watcher and poller, as long as it is in use.
+        :param run_id: ID of the run to watch.
+        :param watcher_kwargs: Poll settings passed through to a newly created RunWatcher, e.g. interval.
+        """
+        from opentrons_http_api.run_watcher import RunWatcher as _RunWatcher
+        watcher_kwargs.setdefault('notifications', self._notifications)
+        with self._watchers_lock:
+            watcher = self._watchers.get(run_id)
+            if watcher is None or watcher.is_finished:
+                watcher = _RunWatcher(self._api, run_id, **watcher_kwargs)
+                self._watchers[run_id] = watcher
+            return watcher
 
     def action_run(self, run_id: str, action: Union[str, Action]) -> None:
         if isinstance(action, Action):
@@ -76,21 +217,213 @@ class RobotClient:
         }
         self._api.post_runs_run_id_actions(run_id, data)
 
+    def command(self, command_id: str) -> CommandInfo:
+        """
+        Get a stateless command along with any associated payload, result, and execution information.
+        """
+        return CommandInfo.from_dict(self._api.get_commands_command_id(command_id)['data'])
+
+    def send_command(self, command_type: str, params: Optional[dict] = None, wait: bool = True,
+                     timeout: float = 30.) -> CommandInfo:
+        """
+        Run a stateless command outside of a run, e.g. client.send_command('home').
+        :param command_type: The commandType of the command.
+        :param params: The params of the command, if any.
+        :param wait: If True, return once the command has succeeded or failed, otherwise as soon as it's queued.
+        :param timeout: Maximum seconds to wait, which should be less than the read timeout of requests.
+        :return: The command, which may have failed.
+        :raises TimeoutError: If waiting and the command isn't complete after timeout.
+        """
+        data = {'commandType': command_type, 'params': {} if params is None else params}
+        d = self._api.post_commands(data, wait_until_complete=wait, timeout=round(timeout * 1000) if wait else None)
+        command = CommandInfo.from_dict(d['data'])
+        if wait and not command.status_.is_done:
+            raise TimeoutError(f'command {command.id} not complete after {timeout} s')
+        return command
+
+    def send_commands(self, commands: Sequence[dict], timeout: float = 30.,
+                      max_workers: int = 4) -> Tuple[CommandInfo, ...]:
+        """
+        Run a sequence of stateless commands, e.g. maintenance between runs, without waiting for each command before
+        sending the next. The robot runs commands in the order they're sent, so all but the last are queued without
+        waiting, the last is waited for, and then the others are fetched concurrently.
+        :param commands: Commands as dicts with a commandType and optional params, e.g. {'commandType': 'home'}.
+        :param timeout: Maximum seconds to wait for the commands once they're queued.
+        :param max_workers: Maximum number of commands to fetch at once.
+        :return: The commands in order, which may have failed.
+        :raises TimeoutError: If the commands aren't complete after timeout.
+        """
+        if not commands:
+            return ()
+
+        queued = [self.send_command(command['commandType'], command.get('params'), wait=False)
+                  for command in commands[:-1]]
+        last = self.send_command(commands[-1]['commandType'], commands[-1].get('params'), timeout=timeout)
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers, thread_name_prefix='commands') as executor:
+            return (*executor.map(lambda command: self.command(command.id), queued), last)
+
+    def home(self) -> CommandInfo:
+        """
+        Home all axes of the robot.
+        """
+        return self.send_command('home')
+
+    def set_rail_lights(self, on: bool) -> CommandInfo:
+        """
+        Turn the rail lights on or off with a command, which unlike set_lights is queued after any other commands.
+        """
+        return self.send_command('setRailLights', {'on': on})
+
     def protocols(self) -> Tuple[ProtocolInfo, ...]:
         d = self._api.get_protocols()
-        return tuple(ProtocolInfo(**protocol_info)
+        return tuple(ProtocolInfo.from_dict(protocol_info)
                      for protocol_info in d['data'])
 
     def upload_protocol(self, protocol_file: BinaryIO,
-                        labware_definitions: Optional[Sequence[BinaryIO]] = None) -> ProtocolInfo:
+                        labware_definitions: Optional[Sequence[BinaryIO]] = None,
+                        progress: Optional[ProgressCallback] = None) -> ProtocolInfo:
         """
         Upload a protocol with optional labware definitions to the robot.
         :param protocol_file: A Python or JSON protocol binary file object.
         :param labware_definitions: An optional sequence of JSON labware definition binary file objects, only if the
         protocol_file is in Python format.
+        :param progress: Optional function called with the number of bytes sent so far and the total number of bytes.
         :return: ProtocolInfo object containing information about the protocol.
         """
         files = (protocol_file, ) if labware_definitions is None else (protocol_file, *labware_definitions)
 
-        d = self._api.post_protocols(files)
-        return ProtocolInfo(**d['data'])
+        if self._protocol_index is None:
+            d = self._api.post_protocols(files, progress)
+            return ProtocolInfo.from_dict(d['data'])
+
+        # Reuse an identical protocol if it's still on the robot
+        digest = self._protocol_index.hash_files(files)
+        protocol_id = self._protocol_index.get(self._host, digest)
+        if protocol_id is not None:
+            try:
+                return self.protocol(protocol_id)
+            except Exception as e:
+                # A requests.HTTPError, caught without importing requests when this module is imported
+                response = getattr(e, 'response', None)
+                if response is None or response.status_code != 404:
+                    raise
+                self._protocol_index.remove(self._host, digest)
+
+        d = self._api.post_protocols(files, progress)
+        protocol_info = ProtocolInfo.from_dict(d['data'])
+        self._protocol_index.put(self._host, digest, protocol_info.id)
+        return protocol_info
+
+    def protocol(self, protocol_id: str) -> ProtocolInfo:
+        d = self._api.get_protocols_protocol_id(protocol_id)
+        return ProtocolInfo.from_dict(d['data'])
+
+    def wait_for_analysis(self, protocol_id: str, timeout: Optional[float] = None,
+                          poll_interval: float = 0.5) -> ProtocolInfo:
+        """
+        Wait until the robot has analysed a protocol, which it does after each upload.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :param poll_interval: Seconds between requests.
+        :raises TimeoutError: If the protocol isn't analysed after timeout.
+        """
+        return self._wait_for_analysis(protocol_id, timeout, poll_interval, threading.Event())
+
+    def _wait_for_analysis(self, protocol_id: str, timeout: Optional[float], poll_interval: float,
+                           stopped: threading.Event) -> Optional[ProtocolInfo]:
+        """
+        Wait until the robot has analysed a protocol, or return None once stopped is set.
+        """
+        end = None if timeout is None else monotonic() + timeout
+        while not stopped.is_set():
+            protocol_info = self.protocol(protocol_id)
+            if protocol_info.is_analyzed:
+                return protocol_info
+            if end is not None and monotonic() >= end:
+                raise TimeoutError(f'protocol {protocol_id} not analysed after {timeout} s')
+            stopped.wait(poll_interval if end is None else min(poll_interval, max(end - monotonic(), 0.)))
+        return None
+
+    def run_protocols(self, protocols: Iterable[Sequence[BinaryIO]], prefetch: int = 2,
+                      labware_offsets: Optional[LabwareOffsets] = None,
+                      labware_definitions: Optional[LabwareDefinitions] = None,
+                      analysis_timeout: Optional[float] = None, **watcher_kwargs) -> Iterator[RunInfo]:
+        """
+        Run protocols one after another, yielding each run once it's done, e.g.
+
+            for run_info in client.run_protocols([(protocol_1, ), (protocol_2, labware_1)]):
+                print(run_info.id, run_info.status)
+
+        While a run is in progress, the next protocols are uploaded and analysed in the background, so that the next
+        run is created and played as soon as the current run is done, rather than only then uploading its protocol.
+        Closing the iterator early leaves the current run going on the robot.
+        :param protocols: The files of each protocol, the protocol file followed by any labware definition files. May
+        be a generator, which is only advanced as protocols are prefetched.
+        :param prefetch: Number of protocols to upload and analyse ahead of the current run. With 0, each protocol is
+        only uploaded once the previous run is done.
+        :param labware_offsets: Optional labware offsets to create each run with.
+        :param labware_definitions: Optional labware definitions to add to each run before playing it.
+        :param analysis_timeout: Maximum time to wait for each analysis in seconds, or None to wait forever.
+        :param watcher_kwargs: Poll settings passed through to watch_run, e.g. interval.
+        :raises TimeoutError: If a protocol isn't analysed after analysis_timeout.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Set when the iterator is closed, so that protocols being prepared stop waiting for their analyses
+        stopped = threading.Event()
+
+        def prepare(files: Sequence[BinaryIO]) -> str:
+            protocol_id = self.upload_protocol(files[0], files[1:] or None).id
+            self._wait_for_analysis(protocol_id, analysis_timeout, 0.5, stopped)
+            return protocol_id
+
+        protocols = iter(protocols)
+        prepared = deque()
+
+        # Not a context manager, which would wait for the protocols being prepared when the iterator is closed early
+        executor = ThreadPoolExecutor(max(prefetch, 1), thread_name_prefix='prefetch')
+
+        def top_up(n: int) -> None:
+            while len(prepared) < n:
+                files = next(protocols, None)
+                if files is None:
+                    return
+                prepared.append(executor.submit(prepare, files))
+
+        try:
+            run_id = None
+            while True:
+                # Prepare the next protocols while the current run is in progress
+                top_up(prefetch)
+                finished = None
+                if run_id is not None:
+                    watcher = self.watch_run(run_id, **watcher_kwargs)
+                    watcher.wait()
+                    finished = watcher.run_info
+
+                # Start the next run straight away, before handing over the finished run
+                top_up(1)
+                run_id = None
+                if prepared:
+                    run_info = self.create_run(prepared.popleft().result(), labware_offsets)
+                    if labware_definitions is not None:
+                        self.add_labware_definitions(run_info.id, labware_definitions)
+                    self.action_run(run_info.id, Action.PLAY)
+                    run_id = run_info.id
+
+                if finished is not None:
+                    yield finished
+                if run_id is None:
+                    return
+        finally:
+            # Don't upload protocols that won't be run, or wait for those being prepared
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def prune_protocol_index(self) -> None:
+        """
+        Remove protocols that are no longer on the robot from the protocol index.
+        """
+        if self._protocol_index is not None:
+            self._protocol_index.prune(self._host, [protocol_info.id for protocol_info in self.protocols()])
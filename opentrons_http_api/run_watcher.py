@@ -0,0 +1,395 @@
+from __future__ import annotations
+import asyncio
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from opentrons_http_api.api import API
+from opentrons_http_api.defs.dict_data import RunInfo, Status
+from opentrons_http_api.defs.enums import EngineStatus
+
+if TYPE_CHECKING:
+    from opentrons_http_api.async_api import AsyncAPI
+    from opentrons_http_api.notifications import NotificationClient
+
+
+# An (old, new) status transition, where old is None for the first status a subscriber receives
+StatusChange = Tuple[Optional[EngineStatus], EngineStatus]
+
+_END = object()
+
+
+class _Subscriber(NamedTuple):
+    on_change: Callable[[StatusChange], None]
+    on_finish: Optional[Callable[[], None]]
+
+
+class _RunWatcherBase(ABC):
+    """
+    Subscriber, notification and adaptive poll interval handling shared by RunWatcher and AsyncRunWatcher.
+    """
+    def __init__(self, run_id: str, interval: float = 1., min_interval: float = 0.25, max_interval: float = 10.,
+                 backoff: float = 1.5, max_errors: int = 5, notifications: Optional[NotificationClient] = None):
+        """
+        :param run_id: ID of the run to watch.
+        :param interval: Poll interval in seconds while the run is active.
+        :param min_interval: Poll interval in seconds while the run is ending.
+        :param max_interval: Maximum poll interval in seconds while the run is idle, or after a failed poll.
+        :param backoff: Factor the poll interval is multiplied by after each poll while the run is idle.
+        :param max_errors: Number of consecutive failed polls after which watching stops with the error.
+        :param notifications: Optional client of the robot's notification broker. While it's connected, the run is
+        polled when the robot notifies that it changed, and otherwise only every max_interval.
+        """
+        self._run_id = run_id
+        self._interval = interval
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._max_errors = max_errors
+        self._notifications = notifications
+        self._unsubscribe_notifications: Optional[Callable[[], None]] = None
+
+        # Re-entrant so that callbacks can unsubscribe
+        self._lock = threading.RLock()
+        self._subscribers: List[_Subscriber] = []
+        self._status: Optional[EngineStatus] = None
+        self._data: Optional[dict] = None
+        self._run_info: Optional[RunInfo] = None
+        self._error: Optional[Exception] = None
+        self._finished = False
+
+    async def __aiter__(self) -> AsyncIterator[StatusChange]:
+        loop = asyncio.get_running_loop()
+        q = asyncio.Queue()
+        unsubscribe = self.subscribe(lambda event: loop.call_soon_threadsafe(q.put_nowait, event),
+                                     lambda: loop.call_soon_threadsafe(q.put_nowait, _END))
+        try:
+            while (event := await q.get()) is not _END:
+                yield event
+            self._raise_error()
+        finally:
+            unsubscribe()
+
+    @property
+    def run_id(self) -> str:
+        return self._run_id
+
+    @property
+    def status(self) -> Optional[EngineStatus]:
+        """
+        The last polled status, or None if not yet polled.
+        """
+        return self._status
+
+    @property
+    def run_info(self) -> Optional[RunInfo]:
+        """
+        The last polled run, or None if not yet polled.
+        """
+        with self._lock:
+            # Only created when asked for, since most polls only need the status
+            if self._run_info is None and self._data is not None:
+                self._run_info = RunInfo.from_dict(self._data)
+            return self._run_info
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """
+        The error that stopped watching, if any.
+        """
+        return self._error
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        Returns True iff the run is done or watching stopped due to an error.
+        """
+        return self._finished
+
+    def subscribe(self, on_change: Callable[[StatusChange], None],
+                  on_finish: Optional[Callable[[], None]] = None) -> Callable[[], None]:
+        """
+        Subscribe to status transitions, starting polling if required. If the status is already known the subscriber
+        first receives (None, status). Callbacks are called from the poller, so should return quickly.
+        :param on_change: Called with each (old, new) status transition.
+        :param on_finish: Called once when the run is done or watching stops due to an error.
+        :return: A function that unsubscribes.
+        """
+        subscriber = _Subscriber(on_change, on_finish)
+
+        with self._lock:
+            if self._status is not None:
+                on_change((None, self._status))
+
+            if self._finished:
+                if on_finish is not None:
+                    on_finish()
+                return lambda: None
+
+            self._subscribers.append(subscriber)
+            self._start()
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+                if not self._subscribers:
+                    self._stop()
+
+        return unsubscribe
+
+    @abstractmethod
+    def _start(self) -> None:
+        """
+        Start the poller if not running, called with the lock held.
+        """
+
+    @abstractmethod
+    def _stop(self) -> None:
+        """
+        Stop the poller as there are no subscribers, called with the lock held.
+        """
+
+    def _listen(self, on_notification: Callable[[dict], None]) -> None:
+        """
+        Subscribe to the run's notifications, if not already subscribed, called with the lock held.
+        """
+        if self._notifications is not None and self._unsubscribe_notifications is None:
+            from opentrons_http_api.notifications import Topics
+            self._unsubscribe_notifications = self._notifications.subscribe(Topics.RUN.format(run_id=self._run_id),
+                                                                            on_notification)
+
+    def _unlisten(self) -> None:
+        with self._lock:
+            if self._unsubscribe_notifications is not None:
+                self._unsubscribe_notifications()
+                self._unsubscribe_notifications = None
+
+    def _notified(self) -> bool:
+        """
+        Whether changes to the run are being notified, so it only needs polling when notified.
+        """
+        return self._notifications is not None and self._notifications.connected
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _update(self, d: dict, interval: float) -> Optional[float]:
+        """
+        Notify subscribers of any status change.
+        :param d: The polled run as a dict.
+        :param interval: The last poll interval.
+        :return: The next poll interval, or None if the run is done.
+        """
+        # Only the status is needed, so skip creating a RunInfo
+        status = EngineStatus(d['data']['status'])
+
+        with self._lock:
+            self._data = d['data']
+            self._run_info = None
+            if status is not self._status:
+                change = (self._status, status)
+                self._status = status
+                for subscriber in tuple(self._subscribers):
+                    subscriber.on_change(change)
+
+        status_ = Status(status)
+        if status_.is_done:
+            self._finish(None)
+            return None
+        if self._notified():
+            return self._max_interval
+        if status_.is_idle:
+            return min(interval * self._backoff, self._max_interval)
+        if status_.is_ending:
+            return self._min_interval
+        return self._interval
+
+    def _finish(self, error: Optional[Exception]) -> None:
+        self._unlisten()
+        with self._lock:
+            self._error = error
+            self._finished = True
+            subscribers, self._subscribers = self._subscribers, []
+            for subscriber in subscribers:
+                if subscriber.on_finish is not None:
+                    subscriber.on_finish()
+
+
+class RunWatcher(_RunWatcherBase):
+    """
+    Watches the status of a run by polling it in a background thread, and delivers status transitions to subscribers as
+    callbacks, or by iterating over the watcher (with either "for" or "async for").
+
+    The poll interval adapts to the status: it backs off while the run is idle, and speeds up while the run is ending.
+    Polling starts with the first subscriber, and stops when the run is done or there are no subscribers left. Use
+    RobotClient.watch_run to share a single watcher between all subscribers of the same run.
+
+    With notifications, the run is polled as soon as the robot notifies that it changed, rather than on an interval.
+    """
+    def __init__(self, api: API, run_id: str, **kwargs):
+        """
+        :param api: API of the robot the run is on.
+        :param run_id: ID of the run to watch.
+        :param kwargs: Poll settings, see _RunWatcherBase.
+        """
+        super().__init__(run_id, **kwargs)
+        self._api = api
+        self._thread: Optional[threading.Thread] = None
+        # Set to stop waiting between polls, either to stop or to poll now
+        self._wake = threading.Event()
+        self._done = threading.Event()
+
+    def __iter__(self) -> Iterator[StatusChange]:
+        q = queue.Queue()
+        unsubscribe = self.subscribe(q.put, lambda: q.put(_END))
+        try:
+            while (event := q.get()) is not _END:
+                yield event
+            self._raise_error()
+        finally:
+            unsubscribe()
+
+    def wait(self, timeout: Optional[float] = None) -> EngineStatus:
+        """
+        Block until the run is done.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: The final status.
+        """
+        unsubscribe = self.subscribe(lambda _: None, self._done.set)
+        try:
+            if not self._done.wait(timeout):
+                raise TimeoutError(f'run {self._run_id} not done after {timeout} s')
+        finally:
+            unsubscribe()
+
+        self._raise_error()
+        return self._status
+
+    def _start(self) -> None:
+        self._wake.clear()
+        self._listen(lambda _: self._wake.set())
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name=f'run-watcher-{self._run_id}', daemon=True)
+            self._thread.start()
+
+    def _stop(self) -> None:
+        self._wake.set()
+
+    def _poll(self) -> None:
+        interval = self._interval
+        errors = 0
+
+        while True:
+            try:
+                d = self._api.get_runs_run_id(self._run_id)
+            except Exception as e:
+                errors += 1
+                if errors >= self._max_errors:
+                    self._finish(e)
+                    return
+                wait = self._max_interval
+
+            else:
+                errors = 0
+                wait = self._update(d, interval)
+                if wait is None:
+                    return
+                interval = wait
+
+            if self._wake.wait(wait):
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        self._unlisten()
+                        return
+                    self._wake.clear()
+
+    def _finish(self, error: Optional[Exception]) -> None:
+        with self._lock:
+            self._thread = None
+            super()._finish(error)
+
+
+class AsyncRunWatcher(_RunWatcherBase):
+    """
+    Asyncio version of RunWatcher, polling in a task on the running event loop instead of a thread. Subscribe and
+    iterate with "async for" from within the event loop.
+    """
+    def __init__(self, api: AsyncAPI, run_id: str, **kwargs):
+        """
+        :param api: AsyncAPI of the robot the run is on.
+        :param run_id: ID of the run to watch.
+        :param kwargs: Poll settings, see _RunWatcherBase.
+        """
+        super().__init__(run_id, **kwargs)
+        self._api = api
+        self._task: Optional[asyncio.Task] = None
+        # Set to stop waiting between polls, either to stop or to poll now
+        self._wake: Optional[asyncio.Event] = None
+
+    async def wait(self, timeout: Optional[float] = None) -> EngineStatus:
+        """
+        Wait until the run is done.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: The final status.
+        """
+        done = asyncio.Event()
+        unsubscribe = self.subscribe(lambda _: None, done.set)
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f'run {self._run_id} not done after {timeout} s') from None
+        finally:
+            unsubscribe()
+
+        self._raise_error()
+        return self._status
+
+    def _start(self) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._wake.clear()
+        # Notifications arrive in the notification client's thread
+        loop = asyncio.get_running_loop()
+        self._listen(lambda _: loop.call_soon_threadsafe(self._wake.set))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    def _stop(self) -> None:
+        self._wake.set()
+
+    async def _poll(self) -> None:
+        interval = self._interval
+        errors = 0
+
+        while True:
+            try:
+                d = await self._api.get_runs_run_id(self._run_id)
+            except Exception as e:
+                errors += 1
+                if errors >= self._max_errors:
+                    self._task = None
+                    self._finish(e)
+                    return
+                wait = self._max_interval
+
+            else:
+                errors = 0
+                wait = self._update(d, interval)
+                if wait is None:
+                    self._task = None
+                    return
+                interval = wait
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                continue
+            if not self._subscribers:
+                self._task = None
+                self._unlisten()
+                return
+            self._wake.clear()
@@ -0,0 +1,430 @@
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from io import BytesIO
+from time import monotonic
+from typing import TYPE_CHECKING, BinaryIO, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from opentrons_http_api.defs.dict_data import RunInfo
+from opentrons_http_api.defs.enums import Action, EngineStatus
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.labware_offset_store import LabwareOffsets
+from opentrons_http_api.utils.parameterize_protocol import Parameter, ProtocolTemplate
+
+if TYPE_CHECKING:
+    from opentrons_http_api.run_watcher import RunWatcher
+
+
+class JobState(str, Enum):
+    QUEUED = 'queued'
+    # Assigned to a robot, which has the protocol uploaded but hasn't started the run yet
+    STAGED = 'staged'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    # The run was stopped, e.g. from the Opentrons App
+    STOPPED = 'stopped'
+    CANCELLED = 'cancelled'
+
+
+@dataclass(frozen=True)
+class Job:
+    """
+    A protocol to run once on any robot, with optional parameters, labware offsets and labware definitions.
+    """
+    protocol: bytes
+    # The robot requires a .py or .json file name
+    filename: str = 'protocol.py'
+    parameters: Sequence[Parameter] = ()
+    # Labware offsets as dicts, LabwareOffset objects or a LabwareOffsetStore
+    labware_offsets: LabwareOffsets = ()
+    # (File name, contents) of each labware definition
+    labware_definitions: Sequence[Tuple[str, bytes]] = ()
+    # Jobs with a higher priority run first, and jobs with the same priority run in the order they were submitted
+    priority: int = 0
+    # Number of times to run the job again after it fails
+    max_retries: int = 0
+
+    def files(self) -> Tuple[BinaryIO, ...]:
+        """
+        Get the protocol, with the parameters injected, and labware definitions as named file objects to upload.
+        """
+        protocol = ProtocolTemplate(self.protocol).render(self.parameters)
+        files = []
+        for name, content in ((self.filename, protocol), *self.labware_definitions):
+            f = BytesIO(content)
+            f.name = name
+            files.append(f)
+        return tuple(files)
+
+
+class JobFailed(Exception):
+    """
+    Raised by JobHandle.result() if a job did not succeed.
+    """
+    def __init__(self, handle: JobHandle):
+        super().__init__(f'job {handle.state.value} after {handle.attempts} attempt(s)'
+                         + (f': {handle.error!r}' if handle.error is not None else ''))
+        self.handle = handle
+
+
+class JobHandle:
+    """
+    The progress of a job submitted to a Scheduler.
+    """
+    def __init__(self, job: Job, sequence: int):
+        self.job = job
+        self.state = JobState.QUEUED
+        # The robot of the latest attempt
+        self.host: Optional[str] = None
+        self.attempts = 0
+        # IDs of the runs of each attempt that started
+        self.run_ids: List[str] = []
+        # The latest status of the latest run
+        self.run_info: Optional[RunInfo] = None
+        # The exception raised by the latest attempt, if any
+        self.error: Optional[BaseException] = None
+
+        self._sequence = sequence
+        self._protocol_id: Optional[str] = None
+        # The watcher of the latest run while it's running, and the function that stops watching it
+        self._watcher: Optional[RunWatcher] = None
+        self._unwatch: Optional[Callable[[], None]] = None
+        # Number of watchers of the latest run that stopped with an error since one last reached the robot
+        self._watch_errors = 0
+        self._done = threading.Event()
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(state={self.state.value}, host={self.host}, attempts={self.attempts})'
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the job is done. Returns False if the timeout expired first.
+        """
+        return self._done.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None) -> RunInfo:
+        """
+        Wait until the job is done, and get its successful run.
+        :raises TimeoutError: If the timeout expired first.
+        :raises JobFailed: If the job did not succeed.
+        """
+        if not self.wait(timeout):
+            raise TimeoutError('job not done')
+        if self.state is not JobState.SUCCEEDED:
+            raise JobFailed(self)
+        return self.run_info
+
+    def _finish(self, state: JobState) -> None:
+        self.state = state
+        self._done.set()
+
+
+class Scheduler:
+    """
+    Runs queued jobs on a pool of robots, starting the next job on each robot as soon as it's idle, e.g.
+
+        with Scheduler(['10.0.0.1', '10.0.0.2']) as scheduler:
+            handles = scheduler.submit_many([Job(protocol, parameters=params) for params in param_sets])
+        print([handle.result().id for handle in handles])
+
+    A robot is idle once its current run, if any, is done. Each robot has a worker thread that takes the highest
+    priority job from the queue, uploads its protocol, creates and plays its run once the robot is idle and watches the
+    run until it's done. A job whose run fails, or whose requests raise an exception, is queued again while it has
+    retries left.
+
+    A robot can have more than one job at once, in which case the protocols of its next jobs are uploaded while its
+    current run is in progress, so that the next run starts without delay. A busy robot only takes another job while no
+    robot is idle, so that queued jobs go to idle robots first.
+    """
+    def __init__(self, hosts: Sequence[str], max_jobs: Union[int, Mapping[str, int]] = 1, poll_interval: float = 1.,
+                 max_watch_errors: int = 3, **client_kwargs):
+        """
+        :param hosts: Host names or IP addresses of the robots.
+        :param max_jobs: Maximum number of jobs each robot has at once, one running and the rest staged, either for all
+        robots or per host, defaulting to 1 for hosts not given. A robot with 0 is not used.
+        :param poll_interval: Seconds between polls of each robot's run, while its watcher isn't notified of changes.
+        :param max_watch_errors: Number of times in a row watching a job's run can stop with an error, e.g. while its
+        robot is unreachable, before the job fails.
+        :param client_kwargs: Settings passed through to each RobotClient, e.g. timeout or protocol_index.
+        """
+        if len(set(hosts)) != len(hosts):
+            raise ValueError('hosts must be unique')
+
+        self._clients = {host: RobotClient(host, **client_kwargs)
+                         for host in hosts}
+        self._max_jobs = {host: max_jobs.get(host, 1) if isinstance(max_jobs, Mapping) else max_jobs
+                          for host in hosts}
+        self._poll_interval = poll_interval
+        self._max_watch_errors = max_watch_errors
+
+        self._condition = threading.Condition()
+        # Heap of (-priority, sequence, handle)
+        self._queue: List[Tuple[int, int, JobHandle]] = []
+        self._handles: List[JobHandle] = []
+        self._sequence = itertools.count()
+        self._closed = False
+        self._stopped = threading.Event()
+        # Number of workers without any jobs that are waiting for one
+        self._idle = 0
+        # Set to wake each robot's worker, e.g. once its run is done
+        self._wakes: Dict[str, threading.Event] = {host: threading.Event() for host in hosts}
+
+        self._threads = [threading.Thread(target=self._work, args=(host, ), name=f'scheduler-{host}', daemon=True)
+                         for host in hosts]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> Scheduler:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        return tuple(self._clients)
+
+    @property
+    def handles(self) -> Tuple[JobHandle, ...]:
+        """
+        Handles of all submitted jobs, in the order they were submitted.
+        """
+        with self._condition:
+            return tuple(self._handles)
+
+    def submit(self, job: Job) -> JobHandle:
+        """
+        Queue a job to run on the next available robot.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('cannot submit jobs after close()')
+
+            handle = JobHandle(job, next(self._sequence))
+            self._handles.append(handle)
+            self._push(handle)
+            return handle
+
+    def submit_many(self, jobs: Sequence[Job]) -> List[JobHandle]:
+        return [self.submit(job) for job in jobs]
+
+    def cancel(self, handle: JobHandle) -> bool:
+        """
+        Cancel a job if it hasn't been assigned to a robot yet. Returns True if cancelled.
+        """
+        with self._condition:
+            for i, (_, _, queued) in enumerate(self._queue):
+                if queued is handle:
+                    self._queue.pop(i)
+                    heapq.heapify(self._queue)
+                    handle._finish(JobState.CANCELLED)
+                    return True
+            return False
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all submitted jobs are done. Returns False if the timeout expired first.
+        """
+        end = None if timeout is None else monotonic() + timeout
+        for handle in self.handles:
+            if not handle.wait(None if end is None else max(end - monotonic(), 0.)):
+                return False
+        return True
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs, and close all pooled connections once the workers have stopped.
+        :param wait: If True, wait until all submitted jobs are done. Otherwise cancel all jobs that haven't started,
+        and stop monitoring those that have, although their runs continue on the robots.
+        """
+        with self._condition:
+            self._closed = True
+            if not wait:
+                self._stopped.set()
+                for wake in self._wakes.values():
+                    wake.set()
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join()
+
+        # Cancel any jobs left if no robot can run them
+        with self._condition:
+            for _, _, handle in self._queue:
+                handle._finish(JobState.CANCELLED)
+            self._queue.clear()
+
+        for client in self._clients.values():
+            client.close()
+
+    def _push(self, handle: JobHandle) -> None:
+        # Call with the condition held
+        heapq.heappush(self._queue, (-handle.job.priority, handle._sequence, handle))
+        self._condition.notify()
+
+    def _take(self, block: bool) -> Optional[JobHandle]:
+        """
+        Take the highest priority job from the queue, optionally waiting for one. Returns None if there isn't one, or
+        when stopping. Without waiting, i.e. for a worker that already has jobs, also returns None while any worker
+        without jobs is waiting, so that it gets the job instead.
+        """
+        with self._condition:
+            if not block and self._idle:
+                return None
+            while not self._queue or self._stopped.is_set():
+                if not block or self._closed or self._stopped.is_set():
+                    return None
+                self._idle += 1
+                try:
+                    self._condition.wait()
+                finally:
+                    self._idle -= 1
+            return heapq.heappop(self._queue)[2]
+
+    def _work(self, host: str) -> None:
+        client = self._clients[host]
+        limit = self._max_jobs[host]
+        active: Optional[JobHandle] = None
+        staged: Deque[JobHandle] = deque()
+        wake = self._wakes[host]
+
+        while limit > 0:
+            wake.clear()
+
+            # Take jobs up to the limit, waiting for one if there is nothing else to do
+            while (active is not None) + len(staged) < limit:
+                handle = self._take(block=active is None and not staged)
+                if handle is None:
+                    break
+                if self._stage(client, host, handle):
+                    staged.append(handle)
+
+            if self._stopped.is_set():
+                break
+            if active is None and not staged:
+                # Closed and the queue is empty
+                return
+
+            if active is not None:
+                active = self._check(client, active)
+            if active is None and staged and self._is_idle(client):
+                handle = staged.popleft()
+                if self._start(client, handle):
+                    active = handle
+                    continue
+
+            # Woken as soon as the active run is done, and otherwise to take more jobs or check the robot is idle
+            wake.wait(self._poll_interval)
+
+        for handle in (active, *staged):
+            if handle is not None:
+                self._unwatch(handle)
+                handle._finish(JobState.CANCELLED)
+
+    def _stage(self, client: RobotClient, host: str, handle: JobHandle) -> bool:
+        """
+        Upload the protocol of a job. Returns True if successful.
+        """
+        handle.state = JobState.STAGED
+        handle.host = host
+        handle.attempts += 1
+        try:
+            handle._protocol_id = client.upload_protocol(*self._split(handle.job.files())).id
+        except Exception as e:
+            self._failed(handle, e)
+            return False
+        return True
+
+    @staticmethod
+    def _split(files: Tuple[BinaryIO, ...]) -> Tuple[BinaryIO, Optional[Sequence[BinaryIO]]]:
+        return files[0], files[1:] or None
+
+    def _start(self, client: RobotClient, handle: JobHandle) -> bool:
+        """
+        Create and play the run of a staged job. Returns True if successful.
+        """
+        try:
+            # Unique to the attempt, so that creating the run can be retried
+            run_info = client.create_run(handle._protocol_id, handle.job.labware_offsets or None,
+                                         dedup_key=f'job-{handle._sequence}-{handle.attempts}')
+            handle.run_ids.append(run_info.id)
+            handle.run_info = run_info
+            client.action_run(run_info.id, Action.PLAY)
+        except Exception as e:
+            self._failed(handle, e)
+            return False
+
+        handle.state = JobState.RUNNING
+        handle._watch_errors = 0
+        self._watch(client, handle)
+        return True
+
+    def _watch(self, client: RobotClient, handle: JobHandle) -> None:
+        """
+        Watch the run of a running job, waking its robot's worker once the run is done.
+        """
+        handle._watcher = client.watch_run(handle.run_ids[-1], interval=self._poll_interval)
+        handle._unwatch = handle._watcher.subscribe(lambda _: None, self._wakes[handle.host].set)
+
+    @staticmethod
+    def _unwatch(handle: JobHandle) -> None:
+        if handle._unwatch is not None:
+            handle._unwatch()
+        handle._watcher = handle._unwatch = None
+
+    def _check(self, client: RobotClient, handle: JobHandle) -> Optional[JobHandle]:
+        """
+        Update the run of a running job. Returns the job if it's still running, otherwise None.
+        """
+        watcher = handle._watcher
+        if not watcher.is_finished:
+            return handle
+
+        self._unwatch(handle)
+        if watcher.error is not None:
+            handle._watch_errors = 1 if watcher.run_info is not None else handle._watch_errors + 1
+            if handle._watch_errors >= self._max_watch_errors:
+                self._failed(handle, watcher.error)
+                return None
+            # Watch again, e.g. if the robot was briefly unreachable
+            self._watch(client, handle)
+            return handle
+
+        handle.run_info = watcher.run_info
+        status = handle.run_info.status_
+        if status.status is EngineStatus.SUCCEEDED:
+            handle.error = None
+            handle._finish(JobState.SUCCEEDED)
+        elif status.status is EngineStatus.FAILED:
+            self._failed(handle, None)
+        else:
+            handle._finish(JobState.STOPPED)
+        return None
+
+    def _is_idle(self, client: RobotClient) -> bool:
+        try:
+            run_info = client.current_run()
+        except Exception:
+            return False
+        return run_info is None or run_info.status_.is_done
+
+    def _failed(self, handle: JobHandle, error: Optional[BaseException]) -> None:
+        """
+        Queue a failed job again if it has retries left, otherwise finish it.
+        """
+        handle.error = error
+        with self._condition:
+            if handle.attempts <= handle.job.max_retries and not self._stopped.is_set():
+                handle.state = JobState.QUEUED
+                self._push(handle)
+                return
+        handle._finish(JobState.FAILED)
@@ -0,0 +1,103 @@
+"""
+Single-flight coalescing of identical concurrent requests, used by API and AsyncAPI for the GET endpoints passed as
+coalesce. While a request is in flight, identical requests from other threads or coroutines wait for it and share its
+result, or its exception, rather than sending their own, e.g. when many dashboards poll the same run at once.
+
+Requests that start after the request in flight finishes send a new request, so results are never older than the
+request in flight.
+"""
+from __future__ import annotations
+import asyncio
+import threading
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key from many threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self) -> int:
+        """
+        Number of calls in flight.
+        """
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        """
+        Call a function, unless a call with the same key is already in flight, in which case wait for it and return its
+        result or raise its exception.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent calls with the same key from many coroutines on one event loop.
+
+    Each call runs in its own task, so that cancelling one of the waiting coroutines, even the first, doesn't cancel it
+    for the others.
+    """
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        """
+        Number of calls in flight.
+        """
+        return len(self._tasks)
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a function, unless a call with the same key is already in flight, in which case wait for it and return its
+        result or raise its exception.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(function())
+            task.add_done_callback(partial(self._done, key))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        del self._tasks[key]
+        # Retrieve the exception, so it isn't logged as never retrieved if every waiting coroutine was cancelled
+        if not task.cancelled():
+            task.exception()
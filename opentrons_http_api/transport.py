@@ -0,0 +1,77 @@
+"""
+The default transport of API, a requests session with a pool of keep-alive connections.
+
+This module is imported when an API is created rather than with the api module, since importing requests takes longer
+than most calls to a robot.
+"""
+from __future__ import annotations
+import socket
+from time import perf_counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from opentrons_http_api.instrumentation import connection_timings
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """
+    An HTTPConnection that measures how long resolving the host name and connecting take.
+    """
+    def _new_conn(self) -> socket.socket:
+        start = perf_counter()
+        try:
+            addresses = list(dict.fromkeys(info[4][0] for info in
+                                           socket.getaddrinfo(self._dns_host, self.port, type=socket.SOCK_STREAM)))
+        except socket.gaierror:
+            # Raises the usual error
+            return super()._new_conn()
+        resolved = perf_counter()
+
+        # Connect to each address in turn as urllib3 does, but without resolving the host name again
+        dns_host = self._dns_host
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+
+        connection_timings.dns = resolved - start
+        connection_timings.connect = perf_counter() - resolved
+        return sock
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter for http:// URLs whose new connections record their DNS and connect times in connection_timings.
+    """
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {**self.poolmanager.pool_classes_by_scheme,
+                                                   'http': _TimedHTTPConnectionPool}
+
+
+def requests_session(pool_maxsize: int, timed: bool = False) -> requests.Session:
+    """
+    Create a session for the http:// URLs of a single robot. Requests aren't retried, since API retries them.
+    :param pool_maxsize: Maximum number of keep-alive connections to keep open.
+    :param timed: If True, new connections record their DNS and connect times in connection_timings.
+    """
+    adapter_cls = TimedHTTPAdapter if timed else HTTPAdapter
+    adapter = adapter_cls(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    return session
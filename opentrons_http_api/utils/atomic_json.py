@@ -0,0 +1,22 @@
+import json
+import os
+
+
+def dump_atomic(obj, path: str) -> None:
+    """
+    Write an object to a JSON file by writing a temporary file in the same directory and renaming it, so that the file
+    is never partially written. Each call has its own temporary file, so processes saving the same file at once don't
+    corrupt each other's writes, and the last rename wins.
+    """
+    # Imported when first used, so that importing this module is fast enough for short-lived processes
+    import tempfile
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or None, prefix=f'.{os.path.basename(path)}.',
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(obj, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,236 @@
+"""
+A local stand-in for the MQTT broker that robots run next to their HTTP API, for testing notifications without
+hardware. Implements just enough of MQTT 3.1.1 for NotificationClient: connecting, subscribing with wildcards,
+unsubscribing, keep alive pings and publishing at QoS 0.
+"""
+from __future__ import annotations
+import json
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+# MQTT control packet types
+_CONNECT = 1
+_CONNACK = 2
+_PUBLISH = 3
+_PUBACK = 4
+_SUBSCRIBE = 8
+_SUBACK = 9
+_UNSUBSCRIBE = 10
+_UNSUBACK = 11
+_PINGREQ = 12
+_PINGRESP = 13
+_DISCONNECT = 14
+
+
+def topic_matches(subscription: str, topic: str) -> bool:
+    """
+    Whether a topic matches a subscription, which may contain the + (one level) and # (any remaining levels) wildcards.
+    """
+    sub_levels = subscription.split('/')
+    levels = topic.split('/')
+    for i, sub_level in enumerate(sub_levels):
+        if sub_level == '#':
+            return True
+        if i >= len(levels) or sub_level not in ('+', levels[i]):
+            return False
+    return len(sub_levels) == len(levels)
+
+
+def _packet(type_: int, body: bytes, flags: int = 0) -> bytes:
+    header = bytearray([type_ << 4 | flags])
+    length = len(body)
+    # Remaining length as a variable length integer
+    while True:
+        byte, length = length % 128, length // 128
+        header.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(header) + body
+
+
+def _string(s: str) -> bytes:
+    encoded = s.encode()
+    return struct.pack('!H', len(encoded)) + encoded
+
+
+def _read_string(body: bytes, offset: int) -> Tuple[str, int]:
+    length, = struct.unpack_from('!H', body, offset)
+    return body[offset + 2:offset + 2 + length].decode(), offset + 2 + length
+
+
+class _Connection:
+    """
+    A connected client and its subscriptions.
+    """
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.subscriptions: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def send(self, packet: bytes) -> None:
+        with self._lock:
+            try:
+                self.sock.sendall(packet)
+            except OSError:
+                pass
+
+
+class FakeBroker:
+    """
+    A local MQTT broker, e.g.
+
+        with FakeBroker() as broker, FakeRobot(broker=broker) as robot:
+            notifications = NotificationClient(broker.host, port=broker.port)
+
+    Messages published with publish(), or by a FakeRobot, are delivered to the clients subscribed to matching topics.
+    """
+    def __init__(self, host: str = 'localhost', port: int = 0):
+        """
+        :param host: Host to serve on.
+        :param port: Port to serve on, or 0 to pick a free port.
+        """
+        # Messages published so far, as (topic, payload)
+        self.published: List[Tuple[str, Any]] = []
+
+        self._lock = threading.Lock()
+        self._connections: List[_Connection] = []
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> FakeBroker:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05, ), name='fake-broker',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving and disconnect all clients.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def subscriptions(self) -> Dict[str, int]:
+        """
+        The number of clients subscribed to each topic.
+        """
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for connection in self._connections:
+                for subscription in connection.subscriptions:
+                    counts[subscription] = counts.get(subscription, 0) + 1
+        return counts
+
+    def publish(self, topic: str, payload: Any) -> None:
+        """
+        Deliver a message to the clients subscribed to the topic.
+        :param topic: Topic of the message.
+        :param payload: A JSON serializable payload.
+        """
+        with self._lock:
+            self.published.append((topic, payload))
+            connections = [connection for connection in self._connections
+                           if any(topic_matches(subscription, topic) for subscription in connection.subscriptions)]
+
+        packet = _packet(_PUBLISH, _string(topic) + json.dumps(payload).encode())
+        for connection in connections:
+            connection.send(packet)
+
+    def _handler(self) -> type:
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                connection = _Connection(self.request)
+                with broker._lock:
+                    broker._connections.append(connection)
+                try:
+                    broker._serve(connection)
+                finally:
+                    with broker._lock:
+                        broker._connections.remove(connection)
+
+        return Handler
+
+    def _serve(self, connection: _Connection) -> None:
+        f = connection.sock.makefile('rb')
+        while True:
+            first = f.read(1)
+            if not first:
+                return
+
+            length = 0
+            multiplier = 1
+            while True:
+                byte = f.read(1)
+                if not byte:
+                    return
+                length += (byte[0] & 0x7f) * multiplier
+                multiplier *= 128
+                if not byte[0] & 0x80:
+                    break
+            body = f.read(length)
+
+            type_, flags = first[0] >> 4, first[0] & 0x0f
+            if type_ == _CONNECT:
+                connection.send(_packet(_CONNACK, b'\x00\x00'))
+
+            elif type_ == _SUBSCRIBE:
+                packet_id = body[:2]
+                offset = 2
+                granted = bytearray()
+                while offset < len(body):
+                    topic, offset = _read_string(body, offset)
+                    offset += 1
+                    with self._lock:
+                        connection.subscriptions.add(topic)
+                    # Only QoS 0 is supported
+                    granted.append(0)
+                connection.send(_packet(_SUBACK, packet_id + bytes(granted)))
+
+            elif type_ == _UNSUBSCRIBE:
+                packet_id = body[:2]
+                offset = 2
+                while offset < len(body):
+                    topic, offset = _read_string(body, offset)
+                    with self._lock:
+                        connection.subscriptions.discard(topic)
+                connection.send(_packet(_UNSUBACK, packet_id))
+
+            elif type_ == _PUBLISH:
+                topic, offset = _read_string(body, 0)
+                qos = flags >> 1 & 0x03
+                if qos:
+                    connection.send(_packet(_PUBACK, body[offset:offset + 2]))
+                    offset += 2
+                self.publish(topic, json.loads(body[offset:]))
+
+            elif type_ == _PINGREQ:
+                connection.send(_packet(_PINGRESP, b''))
+
+            elif type_ == _DISCONNECT:
+                return
@@ -0,0 +1,628 @@
+"""
+A local stand-in for a robot's HTTP API server, for testing and benchmarking clients without hardware. Implements the
+endpoints in Paths with realistically sized payloads, configurable latency, and runs and protocol analyses that progress
+over time.
+"""
+from __future__ import annotations
+import json
+import re
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from opentrons_http_api.defs.paths import Paths, path_template
+
+if TYPE_CHECKING:
+    from opentrons_http_api.utils.fake_broker import FakeBroker
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _id() -> str:
+    return str(uuid.uuid4())
+
+
+_DONE = ('stopped', 'failed', 'succeeded')
+
+
+def labware_offset_data(i: int) -> dict:
+    return {
+        'id': f'offset_{i}',
+        'createdAt': '2024-01-01T00:00:00+00:00',
+        'definitionUri': 'opentrons/corning_96_wellplate_360ul_flat/2',
+        'location': {'slotName': str(i % 11 + 1)},
+        'vector': {'x': 0.1, 'y': -0.2, 'z': 0.3},
+    }
+
+
+def command_data(i: int, status: str = 'succeeded') -> dict:
+    return {
+        'id': f'command_{i}',
+        'key': f'key_{i}',
+        'commandType': 'aspirate',
+        'createdAt': '2024-01-01T00:00:00+00:00',
+        'startedAt': '2024-01-01T00:00:00+00:00',
+        'completedAt': '2024-01-01T00:00:01+00:00',
+        'status': status,
+        'params': {'pipetteId': 'pipette_0', 'labwareId': 'labware_0', 'wellName': 'A1', 'volume': 100.0,
+                   'flowRate': 92.86, 'wellLocation': {'origin': 'bottom', 'offset': {'x': 0, 'y': 0, 'z': 1}}},
+        'intent': 'protocol',
+    }
+
+
+def command_details_data(i: int, status: str = 'succeeded') -> dict:
+    return {**command_data(i, status), 'result': {'volume': 100.0, 'position': {'x': 14.38, 'y': 74.24, 'z': 3.0}}}
+
+
+def run_data(i: int, status: str = 'succeeded', protocol_id: Optional[str] = None) -> dict:
+    """
+    A run with a typical number of pipettes, modules, labware and labware offsets.
+    """
+    return {
+        'id': f'run_{i}',
+        'createdAt': '2024-01-01T00:00:00.000000+00:00',
+        'status': status,
+        'current': False,
+        'actions': [{'id': f'action_{j}', 'createdAt': '2024-01-01T00:00:00+00:00', 'actionType': 'play'}
+                    for j in range(3)],
+        'errors': [],
+        'pipettes': [{'id': f'pipette_{j}', 'pipetteName': 'p300_single_gen2', 'mount': ('left', 'right')[j]}
+                     for j in range(2)],
+        'modules': [{'id': f'module_{j}', 'model': 'temperatureModuleV2', 'location': {'slotName': str(j + 1)}}
+                    for j in range(2)],
+        'labware': [{'id': f'labware_{j}', 'loadName': 'corning_96_wellplate_360ul_flat',
+                     'definitionUri': 'opentrons/corning_96_wellplate_360ul_flat/2',
+                     'location': {'slotName': str(j + 1)}} for j in range(11)],
+        'liquids': [],
+        'labwareOffsets': [labware_offset_data(j) for j in range(11)],
+        'protocolId': protocol_id or f'protocol_{i}',
+        'completedAt': '2024-01-01T01:00:00.000000+00:00' if status in _DONE else None,
+        'startedAt': '2024-01-01T00:00:01.000000+00:00' if status != 'idle' else None,
+    }
+
+
+def analysis_data(num_commands: int) -> dict:
+    return {'id': 'analysis_0', 'status': 'completed', 'result': 'ok',
+            'commands': [command_details_data(i) for i in range(num_commands)]}
+
+
+def protocol_data(i: int, num_commands: int = 100, analysis_status: str = 'completed',
+                  files: Optional[List[dict]] = None) -> dict:
+    """
+    A protocol with an analysis of a number of commands, if completed.
+    """
+    analyses = [analysis_data(num_commands)] if analysis_status == 'completed' else []
+
+    return {
+        'id': f'protocol_{i}',
+        'createdAt': '2024-01-01T00:00:00.000000+00:00',
+        'files': files or [{'name': 'protocol.py', 'role': 'main'}],
+        'protocolType': 'python',
+        'robotType': 'OT-2 Standard',
+        'metadata': {'protocolName': f'Protocol {i}'},
+        'analyses': analyses,
+        'analysisSummaries': [{'id': 'analysis_0', 'status': analysis_status}],
+    }
+
+
+class _Run:
+    """
+    A run that progresses through its statuses over time once played.
+    """
+    def __init__(self, data: dict, num_commands: int, duration: float):
+        self.data = data
+        self.num_commands = num_commands
+        self.duration = duration
+        self.started: Optional[float] = None
+        self.stopped = False
+        self.fails = False
+        # Definitions added to the run by URI
+        self.labware_definitions: Dict[str, dict] = {}
+
+    def play(self) -> None:
+        if self.started is None:
+            self.started = monotonic()
+            self.data['startedAt'] = _now()
+
+    def stop(self) -> None:
+        if self.status() not in _DONE:
+            self.stopped = True
+            self.data['completedAt'] = _now()
+
+    def progress(self) -> float:
+        if self.started is None:
+            return 0.
+        if self.duration <= 0:
+            return 1.
+        return min((monotonic() - self.started) / self.duration, 1.)
+
+    def status(self) -> str:
+        if self.stopped:
+            return 'stopped'
+        if self.started is None:
+            return 'idle'
+
+        progress = self.progress()
+        if progress >= 1:
+            return 'failed' if self.fails else 'succeeded'
+        if progress >= 0.9:
+            return 'finishing'
+        return 'running'
+
+    def commands_length(self) -> int:
+        return int(self.num_commands * self.progress())
+
+    def dict(self) -> dict:
+        status = self.status()
+        if status in _DONE and self.data['completedAt'] is None:
+            self.data['completedAt'] = _now()
+            if status == 'failed':
+                self.data['errors'] = [{'id': _id(), 'createdAt': _now(), 'errorCode': '4000',
+                                        'errorType': 'ExceptionInProtocolError', 'detail': 'protocol failed',
+                                        'errorInfo': {}, 'wrappedErrors': []}]
+        return {**self.data, 'status': status}
+
+
+class _Command:
+    """
+    A stateless command that runs once the commands queued before it have run.
+    """
+    def __init__(self, data: dict, start: float, end: float, fails: bool):
+        self.data = data
+        self.start = start
+        self.end = end
+        self.fails = fails
+
+    def status(self) -> str:
+        now = monotonic()
+        if now < self.start:
+            return 'queued'
+        if now < self.end:
+            return 'running'
+        return 'failed' if self.fails else 'succeeded'
+
+    def dict(self) -> dict:
+        status = self.status()
+        if status != 'queued' and self.data['startedAt'] is None:
+            self.data['startedAt'] = _now()
+        if status in _DONE and self.data['completedAt'] is None:
+            self.data['completedAt'] = _now()
+            if status == 'failed':
+                self.data['error'] = {'id': _id(), 'createdAt': _now(), 'errorCode': '4000',
+                                      'errorType': 'CommandFailedError', 'detail': 'command failed', 'errorInfo': {},
+                                      'wrappedErrors': []}
+            else:
+                self.data['result'] = {}
+        return {**self.data, 'status': status}
+
+
+class FakeRobot:
+    """
+    A local HTTP server that behaves like a robot's HTTP API, e.g.
+
+        with FakeRobot(latency=0.01) as robot:
+            client = RobotClient(robot.host, port=robot.port)
+
+    Runs progress from running to finishing to succeeded over run_duration seconds once played, adding commands as they
+    go. Uploaded protocols are analysed after analysis_duration seconds. Stateless commands run one at a time, in the
+    order they were sent, each taking command_duration seconds.
+
+    Given a FakeBroker, the robot publishes notifications when runs change, like a robot's notification broker.
+    """
+    def __init__(self, host: str = 'localhost', port: int = 0, latency: float = 0., num_runs: int = 0,
+                 num_protocols: int = 0, num_commands: int = 100, run_duration: float = 1.,
+                 analysis_duration: float = 0., command_duration: float = 0., broker: Optional[FakeBroker] = None):
+        """
+        :param host: Host to serve on.
+        :param port: Port to serve on, or 0 to pick a free port.
+        :param latency: Seconds to wait before responding to each request.
+        :param num_runs: Number of completed runs that already exist.
+        :param num_protocols: Number of protocols that already exist.
+        :param num_commands: Number of commands in each run and protocol analysis.
+        :param run_duration: Seconds a run takes to complete once played.
+        :param analysis_duration: Seconds an uploaded protocol takes to be analysed.
+        :param command_duration: Seconds a stateless command takes to run.
+        :param broker: An optional broker to publish notifications to.
+        """
+        self.latency = latency
+        self.num_commands = num_commands
+        self.run_duration = run_duration
+        self.analysis_duration = analysis_duration
+        self.command_duration = command_duration
+
+        # Number of the next runs to be played that fail when they complete
+        self.fail_runs = 0
+        # Number of the next stateless commands that fail
+        self.fail_commands = 0
+
+        # Counts of requests handled, by (method, Paths constant)
+        self.requests: Counter[Tuple[str, str]] = Counter()
+        # Number of connections accepted
+        self.connections = 0
+        self.lights = False
+        self.settings = {'shortFixedTrash': False, 'disableHomeOnBoot': False}
+
+        self._lock = threading.Lock()
+        self._protocols: Dict[str, dict] = {}
+        self._analysed: Dict[str, float] = {}
+        self._runs: Dict[str, _Run] = {}
+        self._commands: Dict[str, _Command] = {}
+        # When the last queued stateless command ends
+        self._commands_end = 0.
+        self._broker = broker
+        # Timers that notify when played runs change status over time
+        self._timers: List[threading.Timer] = []
+        for i in range(num_protocols):
+            protocol = protocol_data(i, num_commands)
+            self._protocols[protocol['id']] = protocol
+        for i in range(num_runs):
+            run = _Run(run_data(i), num_commands, 0.)
+            run.started = monotonic()
+            self._runs[run.data['id']] = run
+
+        self._routes: Dict[Tuple[str, str], Callable[..., Tuple[int, Any]]] = {
+            ('GET', Paths.HEALTH): self._get_health,
+            ('POST', Paths.IDENTIFY): lambda **_: (200, {'message': 'identifying'}),
+            ('GET', Paths.ROBOT_LIGHTS): lambda **_: (200, {'on': self.lights}),
+            ('POST', Paths.ROBOT_LIGHTS): self._post_robot_lights,
+            ('GET', Paths.SETTINGS): self._get_settings,
+            ('POST', Paths.SETTINGS): self._post_settings,
+            ('GET', Paths.SETTINGS_ROBOT): self._get_settings_robot,
+            ('GET', Paths.CALIBRATION_STATUS): lambda **_: (200, {'deckCalibration': {'status': 'OK'}}),
+            ('GET', Paths.MOTORS_ENGAGED): lambda **_: (200, {axis: {'enabled': True} for axis in 'xyzabc'}),
+            ('POST', Paths.MOTORS_DISENGAGE): lambda **_: (200, {'message': 'disengaged'}),
+            ('GET', Paths.RUNS): self._get_runs,
+            ('POST', Paths.RUNS): self._post_runs,
+            ('GET', Paths.RUNS_RUN_ID): self._get_runs_run_id,
+            ('GET', Paths.RUNS_RUN_ID_COMMANDS): self._get_runs_run_id_commands,
+            ('GET', Paths.RUNS_RUN_ID_COMMANDS_COMMAND_ID): self._get_runs_run_id_commands_command_id,
+            ('POST', Paths.RUNS_RUN_ID_ACTIONS): self._post_runs_run_id_actions,
+            ('POST', Paths.RUNS_RUN_ID_LABWARE_OFFSETS): self._post_runs_run_id_labware_offsets,
+            ('POST', Paths.RUNS_RUN_ID_LABWARE_DEFINITIONS): self._post_runs_run_id_labware_definitions,
+            ('GET', Paths.RUNS_RUN_ID_LOADED_LABWARE_DEFINITIONS): self._get_runs_run_id_loaded_labware_definitions,
+            ('GET', Paths.PROTOCOLS): self._get_protocols,
+            ('POST', Paths.PROTOCOLS): self._post_protocols,
+            ('GET', Paths.PROTOCOLS_PROTOCOL_ID): self._get_protocols_protocol_id,
+            ('GET', Paths.COMMANDS): self._get_commands,
+            ('POST', Paths.COMMANDS): self._post_commands,
+            ('GET', Paths.COMMANDS_COMMAND_ID): self._get_commands_command_id,
+        }
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> FakeRobot:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05, ), name='fake-robot',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        for timer in self._timers:
+            timer.cancel()
+
+    def route(self, method: str, template: str, handler: Callable[..., Tuple[int, Any]]) -> None:
+        """
+        Add or replace the handler of an endpoint.
+        :param method: "GET" or "POST".
+        :param template: The Paths constant of the endpoint.
+        :param handler: Called with keyword arguments path_args (the path split on "/"), query (a dict of lists) and
+        body (bytes), and returns a status code and either a JSON serializable response, or a function returning one
+        that is called without the lock held, e.g. to wait before responding.
+        """
+        self._routes[(method, template)] = handler
+
+    def _handler(self) -> type:
+        robot = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive between requests
+            protocol_version = 'HTTP/1.1'
+            # Otherwise the body waits for the client to acknowledge the headers on a kept alive connection
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with robot._lock:
+                    robot.connections += 1
+
+            def do_GET(self):
+                robot._handle(self, 'GET')
+
+            def do_POST(self):
+                robot._handle(self, 'POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _notify(self, *topics: str) -> None:
+        """
+        Publish notifications that the resources of topics changed, if there's a broker.
+        """
+        if self._broker is not None:
+            for topic in topics:
+                self._broker.publish(topic, {'refetch': True})
+
+    def _notify_later(self, delay: float, *topics: str) -> None:
+        if self._broker is not None:
+            timer = threading.Timer(delay, self._notify, topics)
+            timer.daemon = True
+            timer.start()
+            self._timers.append(timer)
+
+    def _handle(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        url = urlsplit(request.path)
+        length = int(request.headers.get('Content-Length', 0))
+        body = request.rfile.read(length) if length else b''
+
+        template = path_template(url.path)
+        handler = self._routes.get((method, template))
+        if self.latency:
+            sleep(self.latency)
+
+        if handler is None:
+            status, response = 404, {'errors': [{'detail': f'{method} {url.path} not found'}]}
+        else:
+            with self._lock:
+                self.requests[(method, template)] += 1
+                status, response = handler(path_args=url.path.split('/'), query=parse_qs(url.query), body=body)
+        if callable(response):
+            response = response()
+
+        content = json.dumps(response).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(content)))
+        request.end_headers()
+        request.wfile.write(content)
+
+    # Handlers, called with the lock held
+
+    def _get_health(self, **_) -> Tuple[int, Any]:
+        return 200, {
+            'name': 'fake-robot',
+            'robot_model': 'OT-2 Standard',
+            'api_version': '7.0.0',
+            'fw_version': 'v1.0.0',
+            'board_revision': '2.1',
+            'logs': ['/logs/serial.log', '/logs/api.log', '/logs/server.log'],
+            'system_version': '7.0.0',
+            'maximum_protocol_api_version': [2, 15],
+            'minimum_protocol_api_version': [2, 0],
+            'robot_serial': 'OT2CEP20240101A01',
+            'links': {'apiLog': '/logs/api.log', 'serialLog': '/logs/serial.log', 'serverLog': '/logs/server.log'},
+        }
+
+    def _post_robot_lights(self, body: bytes, **_) -> Tuple[int, Any]:
+        self.lights = json.loads(body)['on']
+        return 200, {'on': self.lights}
+
+    def _get_settings(self, **_) -> Tuple[int, Any]:
+        return 200, {'settings': [{'id': id_, 'old_id': id_, 'title': id_, 'description': id_,
+                                   'restart_required': False, 'value': value}
+                                  for id_, value in self.settings.items()],
+                     'links': {}}
+
+    def _post_settings(self, body: bytes, **_) -> Tuple[int, Any]:
+        d = json.loads(body)
+        if d['id'] not in self.settings:
+            return 400, {'errors': [{'detail': f'unknown setting {d["id"]}'}]}
+        self.settings[d['id']] = d['value']
+        return self._get_settings()
+
+    def _get_settings_robot(self, **_) -> Tuple[int, Any]:
+        axes = {axis: 1 for axis in 'XYZABC'}
+        return 200, {
+            'model': 'OT-2 Standard', 'name': 'fake-robot', 'version': 4, 'gantry_steps_per_mm': axes,
+            'acceleration': axes, 'serial_speed': 115200, 'default_pipette_configs': {}, 'default_current': axes,
+            'low_current': axes, 'high_current': axes, 'default_max_speed': axes, 'log_level': 'INFO',
+            'z_retract_distance': 2, 'left_mount_offset': [-34, 0, 0],
+        }
+
+    def _run(self, path_args: List[str]) -> Optional[_Run]:
+        return self._runs.get(path_args[2])
+
+    def _get_runs(self, query: Dict[str, List[str]], **_) -> Tuple[int, Any]:
+        runs = list(self._runs.values())
+        if 'pageLength' in query:
+            runs = runs[max(len(runs) - int(query['pageLength'][0]), 0):]
+
+        links = {}
+        current = next((run for run in self._runs.values() if run.data['current']), None)
+        if current is not None:
+            links['current'] = {'href': f'/runs/{current.data["id"]}'}
+        return 200, {'data': [run.dict() for run in runs], 'links': links,
+                     'meta': {'cursor': len(self._runs) - len(runs), 'totalLength': len(self._runs)}}
+
+    def _post_runs(self, body: bytes, **_) -> Tuple[int, Any]:
+        d = json.loads(body)['data']
+        if d.get('protocolId') not in self._protocols:
+            return 404, {'errors': [{'detail': f'protocol {d.get("protocolId")} not found'}]}
+
+        data = run_data(len(self._runs), 'idle', d['protocolId'])
+        data.update(id=_id(), createdAt=_now(), current=True, actions=[], startedAt=None, completedAt=None,
+                    labwareOffsets=[{**offset, 'id': _id(), 'createdAt': _now()}
+                                    for offset in d.get('labwareOffsets', [])])
+        for run in self._runs.values():
+            run.data['current'] = False
+        run = self._runs[data['id']] = _Run(data, self.num_commands, self.run_duration)
+        self._notify('robot-server/runs')
+        return 201, {'data': run.dict()}
+
+    def _get_runs_run_id(self, path_args: List[str], **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        if run is None:
+            return 404, {'errors': [{'detail': 'run not found'}]}
+        return 200, {'data': run.dict()}
+
+    def _get_runs_run_id_commands(self, path_args: List[str], query: Dict[str, List[str]], **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        if run is None:
+            return 404, {'errors': [{'detail': 'run not found'}]}
+
+        length = run.commands_length()
+        page_length = int(query.get('pageLength', ['20'])[0])
+        cursor = int(query['cursor'][0]) if 'cursor' in query else max(length - page_length, 0)
+        data = [command_data(i) for i in range(cursor, min(cursor + page_length, length))]
+        return 200, {'data': data, 'meta': {'cursor': cursor, 'totalLength': length}, 'links': {}}
+
+    def _get_runs_run_id_commands_command_id(self, path_args: List[str], **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        match = re.fullmatch(r'command_(\d+)', path_args[4])
+        if run is None or match is None or int(match.group(1)) >= run.commands_length():
+            return 404, {'errors': [{'detail': 'command not found'}]}
+        return 200, {'data': command_details_data(int(match.group(1)))}
+
+    def _post_runs_run_id_actions(self, path_args: List[str], body: bytes, **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        if run is None:
+            return 404, {'errors': [{'detail': 'run not found'}]}
+
+        action_type = json.loads(body)['data']['actionType']
+        run_topic = f'robot-server/runs/{run.data["id"]}'
+        if action_type == 'play':
+            if run.started is None and self.fail_runs > 0:
+                run.fails = True
+                self.fail_runs -= 1
+            if run.started is None and run.duration > 0:
+                # When the run starts finishing, and when it's done
+                self._notify_later(run.duration * 0.9, run_topic)
+                self._notify_later(run.duration, run_topic, 'robot-server/runs')
+            run.play()
+        elif action_type == 'stop':
+            run.stop()
+        self._notify(run_topic, 'robot-server/runs')
+
+        action = {'id': _id(), 'createdAt': _now(), 'actionType': action_type}
+        run.data['actions'].append(action)
+        return 201, {'data': action}
+
+    def _post_runs_run_id_labware_offsets(self, path_args: List[str], body: bytes, **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        if run is None:
+            return 404, {'errors': [{'detail': 'run not found'}]}
+        if run.started is not None:
+            return 409, {'errors': [{'detail': 'run already started'}]}
+
+        d = json.loads(body)['data']
+        offsets = [{**offset, 'id': _id(), 'createdAt': _now()}
+                   for offset in (d if isinstance(d, list) else [d])]
+        run.data['labwareOffsets'].extend(offsets)
+        return 201, {'data': offsets if isinstance(d, list) else offsets[0]}
+
+    def _post_runs_run_id_labware_definitions(self, path_args: List[str], body: bytes, **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        if run is None:
+            return 404, {'errors': [{'detail': 'run not found'}]}
+        if run.started is not None:
+            return 409, {'errors': [{'detail': 'run already started'}]}
+
+        definition = json.loads(body)['data']
+        uri = f'{definition["namespace"]}/{definition["parameters"]["loadName"]}/{definition["version"]}'
+        # Simplified, in that added definitions count as loaded straight away
+        run.labware_definitions[uri] = definition
+        return 201, {'data': {'definitionUri': uri}}
+
+    def _get_runs_run_id_loaded_labware_definitions(self, path_args: List[str], **_) -> Tuple[int, Any]:
+        run = self._run(path_args)
+        if run is None:
+            return 404, {'errors': [{'detail': 'run not found'}]}
+        return 200, {'data': list(run.labware_definitions.values())}
+
+    def _protocol(self, protocol_id: str) -> dict:
+        protocol = self._protocols[protocol_id]
+        analysed = self._analysed.get(protocol_id)
+        if analysed is not None and monotonic() >= analysed:
+            protocol['analyses'] = [analysis_data(self.num_commands)]
+            protocol['analysisSummaries'] = [{'id': 'analysis_0', 'status': 'completed'}]
+            del self._analysed[protocol_id]
+        return protocol
+
+    def _get_protocols(self, **_) -> Tuple[int, Any]:
+        return 200, {'data': [self._protocol(protocol_id) for protocol_id in tuple(self._protocols)],
+                     'meta': {'cursor': 0, 'totalLength': len(self._protocols)}}
+
+    def _post_protocols(self, body: bytes, **_) -> Tuple[int, Any]:
+        names = re.findall(rb'filename="([^"]*)"', body)
+        if not names:
+            return 422, {'errors': [{'detail': 'no files'}]}
+
+        files = [{'name': name.decode(), 'role': 'main' if i == 0 else 'labware'}
+                 for i, name in enumerate(names)]
+        protocol = protocol_data(0, self.num_commands, 'pending', files)
+        protocol.update(id=_id(), createdAt=_now())
+        self._protocols[protocol['id']] = protocol
+        self._analysed[protocol['id']] = monotonic() + self.analysis_duration
+        return 201, {'data': self._protocol(protocol['id'])}
+
+    def _get_protocols_protocol_id(self, path_args: List[str], **_) -> Tuple[int, Any]:
+        if path_args[2] not in self._protocols:
+            return 404, {'errors': [{'detail': 'protocol not found'}]}
+        return 200, {'data': self._protocol(path_args[2])}
+
+    def _get_commands(self, query: Dict[str, List[str]], **_) -> Tuple[int, Any]:
+        commands = list(self._commands.values())
+        page_length = int(query.get('pageLength', ['20'])[0])
+        cursor = int(query['cursor'][0]) if 'cursor' in query else max(len(commands) - page_length, 0)
+        data = [command.dict() for command in commands[cursor:cursor + page_length]]
+        return 200, {'data': data, 'meta': {'cursor': cursor, 'totalLength': len(commands)}, 'links': {}}
+
+    def _post_commands(self, query: Dict[str, List[str]], body: bytes, **_) -> Tuple[int, Any]:
+        d = json.loads(body)['data']
+        start = max(monotonic(), self._commands_end)
+        self._commands_end = start + self.command_duration
+        fails = self.fail_commands > 0
+        if fails:
+            self.fail_commands -= 1
+        if d['commandType'] == 'setRailLights' and not fails:
+            self.lights = d['params']['on']
+
+        data = {'id': _id(), 'key': _id(), 'createdAt': _now(), 'commandType': d['commandType'],
+                'params': d.get('params', {}), 'intent': 'setup', 'result': None, 'error': None, 'startedAt': None,
+                'completedAt': None}
+        command = self._commands[data['id']] = _Command(data, start, self._commands_end, fails)
+        if query.get('waitUntilComplete', ['false'])[0].lower() != 'true':
+            return 201, {'data': command.dict()}
+
+        wait = command.end - monotonic()
+        if 'timeout' in query:
+            wait = min(wait, int(query['timeout'][0]) / 1000)
+
+        def respond() -> dict:
+            sleep(max(wait, 0.))
+            with self._lock:
+                return {'data': command.dict()}
+
+        return 201, respond
+
+    def _get_commands_command_id(self, path_args: List[str], **_) -> Tuple[int, Any]:
+        command = self._commands.get(path_args[2])
+        if command is None:
+            return 404, {'errors': [{'detail': 'command not found'}]}
+        return 200, {'data': command.dict()}
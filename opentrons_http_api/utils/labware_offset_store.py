@@ -0,0 +1,137 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple, Union
+
+from opentrons_http_api.defs.dict_data import LabwareOffset, RunInfo
+from opentrons_http_api.utils.atomic_json import dump_atomic
+
+
+# (definitionUri, slotName)
+OffsetKey = Tuple[str, str]
+
+LabwareOffsets = Union[Sequence[dict], Sequence[LabwareOffset], 'LabwareOffsetStore']
+
+
+def offset_dicts(labware_offsets: LabwareOffsets) -> Sequence[dict]:
+    """
+    Get labware offsets as the dicts sent to the robot, where each offset may be a dict or a LabwareOffset.
+    """
+    if isinstance(labware_offsets, LabwareOffsetStore):
+        return labware_offsets.dicts()
+    return [offset.dict() if isinstance(offset, LabwareOffset) else offset
+            for offset in labware_offsets]
+
+
+class LabwareOffsetStore:
+    """
+    The labware offsets of a robot by (definitionUri, slotName), for creating runs with, or adding to runs, e.g.
+
+        store = LabwareOffsetStore('offsets.json')
+        store.harvest(client.runs())
+        client.create_run(protocol_id, labware_offsets=store)
+
+    The list of offsets sent to the robot is only rebuilt after the store changes, so it can be reused for any number of
+    runs. Offsets harvested from past runs are remembered by run ID, so each run is only harvested once.
+
+    Optionally saved to a JSON file so that it persists between sessions.
+    """
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: Optional JSON file to load the store from, if it exists, and save it to on every change.
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._offsets: Dict[OffsetKey, dict] = {}
+        self._harvested: Set[str] = set()
+        self._dicts: Optional[Tuple[dict, ...]] = None
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                d = json.load(f)
+            self._offsets = {self.key(offset): offset for offset in d['offsets']}
+            self._harvested = set(d['harvested'])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._offsets)
+
+    def __iter__(self) -> Iterator[LabwareOffset]:
+        return iter(self.offsets())
+
+    def __contains__(self, key: OffsetKey) -> bool:
+        with self._lock:
+            return key in self._offsets
+
+    @staticmethod
+    def key(offset: Union[dict, LabwareOffset]) -> OffsetKey:
+        if isinstance(offset, LabwareOffset):
+            return offset.definitionUri, offset.slotName
+        return offset['definitionUri'], offset['location']['slotName']
+
+    def get(self, definition_uri: str, slot_name: str) -> Optional[LabwareOffset]:
+        with self._lock:
+            offset = self._offsets.get((definition_uri, slot_name))
+        return None if offset is None else LabwareOffset.create(**offset)
+
+    def offsets(self) -> Tuple[LabwareOffset, ...]:
+        return tuple(LabwareOffset.create(**offset)
+                     for offset in self.dicts())
+
+    def dicts(self) -> Tuple[dict, ...]:
+        """
+        The offsets as the dicts sent to the robot, which are shared so should not be modified.
+        """
+        with self._lock:
+            if self._dicts is None:
+                self._dicts = tuple(self._offsets.values())
+            return self._dicts
+
+    def add(self, labware_offsets: Iterable[Union[dict, LabwareOffset]]) -> None:
+        """
+        Add offsets, replacing any with the same definitionUri and slotName.
+        """
+        with self._lock:
+            self._add(labware_offsets)
+            self._save()
+
+    def remove(self, definition_uri: str, slot_name: str) -> None:
+        with self._lock:
+            if self._offsets.pop((definition_uri, slot_name), None) is not None:
+                self._dicts = None
+                self._save()
+
+    def harvest(self, runs: Iterable[RunInfo]) -> int:
+        """
+        Add the offsets of runs not harvested before, where offsets of later runs replace those of earlier runs.
+        :return: The number of runs harvested.
+        """
+        with self._lock:
+            new = sorted((run_info for run_info in runs if run_info.id not in self._harvested),
+                         key=lambda run_info: run_info.createdAt)
+            for run_info in new:
+                self._add(run_info.labwareOffsets)
+                self._harvested.add(run_info.id)
+            if new:
+                self._save()
+            return len(new)
+
+    def _add(self, labware_offsets: Iterable[Union[dict, LabwareOffset]]) -> None:
+        for offset in labware_offsets:
+            if isinstance(offset, LabwareOffset):
+                offset = offset.dict()
+            # Only the fields used to create an offset, without the robot's ID and creation time
+            offset = {'definitionUri': offset['definitionUri'], 'location': offset['location'],
+                      'vector': offset['vector']}
+            key = self.key(offset)
+            # Re-inserted so that the latest offsets are last
+            self._offsets.pop(key, None)
+            self._offsets[key] = offset
+        self._dicts = None
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+
+        dump_atomic({'offsets': list(self._offsets.values()), 'harvested': sorted(self._harvested)}, self._path)
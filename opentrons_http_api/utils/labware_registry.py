@@ -0,0 +1,172 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+
+# (namespace, loadName, version)
+DefinitionKey = Tuple[str, str, int]
+
+# A path to a JSON file, the file's contents, a binary file object, or a parsed definition
+DefinitionSource = Union[str, bytes, BinaryIO, dict]
+
+LabwareDefinitions = Union[Iterable[dict], 'LabwareRegistry']
+
+
+def definition_key(definition: dict) -> DefinitionKey:
+    return definition['namespace'], definition['parameters']['loadName'], definition['version']
+
+
+def definition_uri(definition: dict) -> str:
+    """
+    Get the URI the robot identifies a labware definition by, e.g. "custom_beta/my_plate_96_wellplate/1".
+    """
+    return '/'.join(map(str, definition_key(definition)))
+
+
+def missing_definitions(definitions: LabwareDefinitions, loaded: Iterable[dict]) -> Tuple[dict, ...]:
+    """
+    Get the definitions, as dicts or from a LabwareRegistry, whose URI isn't among the loaded definitions of a run.
+    """
+    loaded_uris = {definition_uri(definition) for definition in loaded}
+    if isinstance(definitions, LabwareRegistry):
+        definitions = definitions.definitions()
+    return tuple(definition for definition in definitions
+                 if definition_uri(definition) not in loaded_uris)
+
+
+class LabwareRegistry:
+    """
+    Custom labware definitions by (namespace, loadName, version), for adding to runs with only the definitions each
+    run is missing, e.g.
+
+        registry = LabwareRegistry()
+        registry.add('labware/my_plate_96_wellplate.json')
+        client.add_labware_definitions(run_id, registry)
+
+    Each definition is only parsed once: sources are hashed, and a source with the same contents as one added before,
+    or a file that hasn't changed since, reuses its parsed definition. A definition can't be replaced by different
+    contents with the same version, since a robot treats definitions with the same URI as the same labware.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._definitions: Dict[DefinitionKey, dict] = {}
+        # Content hash of each definition
+        self._digests: Dict[DefinitionKey, str] = {}
+        # Keys of the sources parsed so far by the hash of their contents
+        self._parsed: Dict[str, DefinitionKey] = {}
+        # Hashes of the files read so far by (path, modification time, size)
+        self._files: Dict[Tuple[str, int, int], str] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._definitions)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.definitions())
+
+    def __contains__(self, uri: str) -> bool:
+        return self.get(uri) is not None
+
+    def get(self, uri: str) -> Optional[dict]:
+        """
+        Get a definition by its URI, which is shared so should not be modified.
+        """
+        namespace, load_name, version = uri.split('/')
+        with self._lock:
+            return self._definitions.get((namespace, load_name, int(version)))
+
+    def digest(self, uri: str) -> Optional[str]:
+        """
+        Get the content hash of a definition by its URI.
+        """
+        namespace, load_name, version = uri.split('/')
+        with self._lock:
+            return self._digests.get((namespace, load_name, int(version)))
+
+    def definitions(self) -> Tuple[dict, ...]:
+        """
+        The definitions, which are shared so should not be modified.
+        """
+        with self._lock:
+            return tuple(self._definitions.values())
+
+    def add(self, source: DefinitionSource) -> str:
+        """
+        Add a definition, unless it's already registered.
+        :param source: A path to a JSON file, the file's contents, a binary file object, read from its current position
+        which is restored afterwards, or a parsed definition.
+        :return: The URI of the definition.
+        :raises ValueError: If a definition with the same URI but different contents is already registered.
+        """
+        if isinstance(source, dict):
+            return self._add_definition(source, self._hash(self._canonical(source)))
+
+        if isinstance(source, str):
+            stat = os.stat(source)
+            file_key = os.path.realpath(source), stat.st_mtime_ns, stat.st_size
+            with self._lock:
+                digest = self._files.get(file_key)
+                key = self._parsed.get(digest)
+            if key is not None:
+                return '/'.join(map(str, key))
+            with open(source, 'rb') as f:
+                content = f.read()
+            digest = self._hash(content)
+            with self._lock:
+                self._files[file_key] = digest
+        else:
+            if not isinstance(source, bytes):
+                position = source.tell()
+                content = source.read()
+                source.seek(position)
+            else:
+                content = source
+            digest = self._hash(content)
+
+        with self._lock:
+            key = self._parsed.get(digest)
+        if key is not None:
+            return '/'.join(map(str, key))
+
+        definition = json.loads(content)
+        uri = self._add_definition(definition, self._hash(self._canonical(definition)))
+        with self._lock:
+            self._parsed[digest] = definition_key(definition)
+        return uri
+
+    def remove(self, uri: str) -> None:
+        namespace, load_name, version = uri.split('/')
+        key = namespace, load_name, int(version)
+        with self._lock:
+            self._definitions.pop(key, None)
+            self._digests.pop(key, None)
+            self._parsed = {digest: key_ for digest, key_ in self._parsed.items() if key_ != key}
+
+    def missing(self, loaded: Iterable[dict]) -> Tuple[dict, ...]:
+        """
+        Get the definitions whose URI isn't among the loaded definitions of a run.
+        """
+        return missing_definitions(self, loaded)
+
+    def _add_definition(self, definition: dict, digest: str) -> str:
+        key = definition_key(definition)
+        uri = '/'.join(map(str, key))
+        with self._lock:
+            existing = self._digests.get(key)
+            if existing is not None and existing != digest:
+                raise ValueError(f'a different definition of {uri} is already registered, change its version')
+            self._definitions[key] = definition
+            self._digests[key] = digest
+        return uri
+
+    @staticmethod
+    def _canonical(definition: dict) -> bytes:
+        # So that the same definition hashes the same however it was formatted
+        return json.dumps(definition, sort_keys=True, separators=(',', ':')).encode()
+
+    @staticmethod
+    def _hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
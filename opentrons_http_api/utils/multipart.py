@@ -0,0 +1,112 @@
+from __future__ import annotations
+import os
+import uuid
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Called with the number of bytes sent so far and the total number of bytes
+ProgressCallback = Callable[[int, int], None]
+
+
+class MultipartEncoder:
+    """
+    A multipart/form-data request body of files, which is read from the file objects in chunks as it is sent rather
+    than loaded into memory. Any seekable binary file object can be used, including memory-mapped files.
+
+    Can be passed as the data of a requests call, which sends it with a Content-Length header by calling read().
+    """
+    def __init__(self, fields: Sequence[Union[Tuple[str, BinaryIO], Tuple[str, BinaryIO, str]]],
+                 chunk_size: int = 64 * 1024, progress: Optional[ProgressCallback] = None,
+                 boundary: Optional[str] = None):
+        """
+        :param fields: A sequence of (field name, file object) or (field name, file object, file name) tuples. By
+        default the file name is the base name of the file object's name. Each file is sent from its current position.
+        :param chunk_size: Maximum number of bytes to read from a file at once.
+        :param progress: Optional function called with the number of bytes sent so far and the total number of bytes,
+        after each chunk is read.
+        :param boundary: Optional boundary between parts, generated by default.
+        """
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._boundary = boundary or uuid.uuid4().hex
+
+        # Each part is either bytes of headers, or a file and the number of bytes to send from it
+        self._parts: List[Union[bytes, Tuple[BinaryIO, int]]] = []
+        for field in fields:
+            name, f = field[:2]
+            filename = field[2] if len(field) > 2 else os.path.basename(getattr(f, 'name', '') or '') or name
+            self._parts.append(self._part_headers(name, filename))
+            self._parts.append((f, self._remaining(f)))
+            self._parts.append(b'\r\n')
+        self._parts.append(f'--{self._boundary}--\r\n'.encode())
+
+        self._length = sum(len(part) if isinstance(part, bytes) else part[1]
+                           for part in self._parts)
+        self._chunks = self._iter_chunks()
+        self._buffer = b''
+        self._sent = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.read(self._chunk_size):
+            yield chunk
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self._boundary}'
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to size bytes of the body, or the rest of the body if size is negative.
+        """
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        self._sent += len(data)
+        if self._progress is not None and data:
+            self._progress(self._sent, self._length)
+        return data
+
+    def _part_headers(self, name: str, filename: str) -> bytes:
+        return (f'--{self._boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode()
+
+    @staticmethod
+    def _remaining(f: BinaryIO) -> int:
+        """
+        Get the number of bytes from the current position of a file to its end.
+        """
+        position = f.tell()
+        try:
+            return os.fstat(f.fileno()).st_size - position
+        except (AttributeError, OSError):
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            f.seek(position)
+            return end - position
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+
+            f, remaining = part
+            while remaining > 0:
+                chunk = f.read(min(self._chunk_size, remaining))
+                if not chunk:
+                    raise ValueError('file was shorter than when the upload started')
+                remaining -= len(chunk)
+                yield chunk
+
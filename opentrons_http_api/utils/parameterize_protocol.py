@@ -1,4 +1,6 @@
-from typing import Sequence, Union, Type
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union, Type
 from dataclasses import dataclass
 
 
@@ -49,24 +51,104 @@ class Parameter:
         return f'{self.value}'.encode()
 
 
+class ProtocolTemplate:
+    """
+    A protocol containing parameter tokens, parsed once so that variants with different parameter values can be
+    rendered quickly, e.g.
+
+        template = ProtocolTemplate(protocol)
+        variants = template.render_many([[Parameter('num_flashes', int, i)] for i in range(1000)])
+
+    Each parameter token must appear exactly once.
+    """
+    _PREFIX_B = Parameter.PREFIX.encode()
+    _SUFFIX_B = Parameter.SUFFIX.encode()
+
+    def __init__(self, protocol: bytes):
+        """
+        :param protocol: The protocol code as bytes, containing parameter tokens.
+        """
+        # The protocol split into the literal chunks around each token, so there is one more chunk than tokens
+        self._chunks: List[bytes] = []
+        self._names: List[str] = []
+        self._name_set = set()
+
+        start = 0
+        while (prefix := protocol.find(self._PREFIX_B, start)) != -1:
+            name_start = prefix + len(self._PREFIX_B)
+            suffix = protocol.find(self._SUFFIX_B, name_start)
+            if suffix == -1:
+                raise ValueError(f'parameter token at position {prefix} is not closed')
+
+            name = protocol[name_start:suffix].decode()
+            if name in self._name_set:
+                raise ValueError(f'expected 1 occurrence of parameter "{name}", but got more')
+
+            self._chunks.append(protocol[start:prefix])
+            self._names.append(name)
+            self._name_set.add(name)
+            start = suffix + len(self._SUFFIX_B)
+        self._chunks.append(protocol[start:])
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """
+        The names of the parameters, in the order they appear.
+        """
+        return tuple(self._names)
+
+    def render(self, params: Sequence[Parameter]) -> bytes:
+        """
+        Render the protocol with the parameter tokens replaced by the values of the parameters.
+        :param params: A parameter for each token.
+        """
+        values: Dict[str, bytes] = {param.name: param.value_b for param in params}
+        if len(values) != len(params) or values.keys() != self._name_set:
+            names = [param.name for param in params]
+            raise ValueError(f'expected parameters {sorted(self._names)}, but got {sorted(names)}')
+
+        # join() sizes the result from its parts first, so each chunk and value is copied once into a single buffer
+        parts = [b''] * (2 * len(self._names) + 1)
+        parts[::2] = self._chunks
+        parts[1::2] = [values[name] for name in self._names]
+        return b''.join(parts)
+
+    def render_many(self, param_sets: Sequence[Sequence[Parameter]], max_workers: Optional[int] = None,
+                    pool_threshold: int = 2000) -> List[bytes]:
+        """
+        Render the protocol with each set of parameters, in order.
+        :param param_sets: Sets of parameters to render with.
+        :param max_workers: Maximum number of processes to render with, defaults to the number of CPUs.
+        :param pool_threshold: Minimum number of parameter sets to render with a pool of processes rather than in this
+        process, since starting processes and sending them the protocols takes time.
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        if len(param_sets) < pool_threshold or max_workers == 1:
+            return [self.render(params) for params in param_sets]
+
+        chunk_size = max(len(param_sets) // (4 * max_workers), 1)
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(self, )) as executor:
+            return list(executor.map(_render, param_sets, chunksize=chunk_size))
+
+
+# The template rendered by a worker process of ProtocolTemplate.render_many
+_worker_template: Optional[ProtocolTemplate] = None
+
+
+def _init_worker(template: ProtocolTemplate) -> None:
+    global _worker_template
+    _worker_template = template
+
+
+def _render(params: Sequence[Parameter]) -> bytes:
+    return _worker_template.render(params)
+
+
 def inject_parameters(protocol: bytes, params: Sequence[Parameter]) -> bytes:
     """
     Replaces parameter tokens with their values in a protocol, as bytes, as a means of dynamically enabling parameters
-    to be injected into an otherwise fixed parameter file.
+    to be injected into an otherwise fixed parameter file. Use ProtocolTemplate to render many variants of a protocol.
     :param protocol: The protocol code as bytes to insert parameters into.
     :param params: The parameters to insert.
     """
-    for param in params:
-        # Check exactly one of each token exists
-        count = protocol.count(param.token_b)
-        if count != 1:
-            raise ValueError(f'expected 1 occurrence of "{param.token_b}", but got {count} occurrences')
-
-        # Replace parameter tokens
-        protocol = protocol.replace(param.token_b, param.value_b)
-
-    # Check no parameters were missed
-    if Parameter.PREFIX.encode() in protocol:
-        raise ValueError('it appears not all parameters were replaced')
-
-    return protocol
+    return ProtocolTemplate(protocol).render(params)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from typing import BinaryIO, Dict, Optional, Sequence
+
+from opentrons_http_api.utils.atomic_json import dump_atomic
+
+
+class ProtocolIndex:
+    """
+    Index from the hash of a protocol's files to the ID of the protocol uploaded with those files, per robot. Used by
+    RobotClient to skip uploading (and the robot analysing) a protocol that is identical to one already on the robot.
+
+    The index can be shared by many clients, and optionally saved to a JSON file so that it persists between sessions.
+    """
+    _CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: Optional JSON file to load the index from, if it exists, and save it to on every change.
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, str]] = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._index = json.load(f)
+
+    @classmethod
+    def hash_files(cls, files: Sequence[BinaryIO]) -> str:
+        """
+        Get a hash of the names and contents of files, in order. Each file is read from its current position, which is
+        restored afterwards.
+        """
+        h = hashlib.sha256()
+        for f in files:
+            name = os.path.basename(getattr(f, 'name', '') or '')
+            h.update(name.encode() + b'\0')
+
+            position = f.tell()
+            size = 0
+            while chunk := f.read(cls._CHUNK_SIZE):
+                h.update(chunk)
+                size += len(chunk)
+            f.seek(position)
+
+            # Separate files so that moving bytes between them changes the hash
+            h.update(f'\0{size}\0'.encode())
+        return h.hexdigest()
+
+    def get(self, host: str, digest: str) -> Optional[str]:
+        """
+        Get the ID of the protocol uploaded to a robot with files of the given hash, if any.
+        """
+        with self._lock:
+            return self._index.get(host, {}).get(digest)
+
+    def put(self, host: str, digest: str, protocol_id: str) -> None:
+        with self._lock:
+            self._index.setdefault(host, {})[digest] = protocol_id
+            self._save()
+
+    def remove(self, host: str, digest: str) -> None:
+        with self._lock:
+            if self._index.get(host, {}).pop(digest, None) is not None:
+                self._save()
+
+    def prune(self, host: str, protocol_ids: Sequence[str]) -> None:
+        """
+        Remove entries for a robot whose protocol is no longer on it, e.g. after the robot automatically deleted old
+        protocols.
+        :param host: The robot.
+        :param protocol_ids: IDs of all protocols currently on the robot.
+        """
+        protocol_ids = set(protocol_ids)
+        with self._lock:
+            index = self._index.get(host, {})
+            stale = [digest for digest, protocol_id in index.items() if protocol_id not in protocol_ids]
+            for digest in stale:
+                del index[digest]
+            if stale:
+                self._save()
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+
+        dump_atomic(self._index, self._path)
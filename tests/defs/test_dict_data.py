@@ -1,10 +1,11 @@
+import pickle
 from datetime import datetime
 
 import pytest
 
-from opentrons_http_api.defs.enums import EngineStatus
+from opentrons_http_api.defs.enums import CommandStatus, EngineStatus
 from opentrons_http_api.defs.dict_data import Status, Error, Vector, LabwareOffset, Setting, RobotSettings, HealthInfo, RunInfo, \
-    ProtocolInfo
+    ProtocolInfo, CommandInfo
 
 
 @pytest.fixture
@@ -192,7 +193,82 @@ def test_run_info(run_info_data, labware_offset_data):
     assert run_info.labwareOffsets_[0].dict() == labware_offset_data
 
 
+def test_command_info(error_data):
+    command_info = CommandInfo.from_dict({'id': 'command_1', 'createdAt': '2024-01-01', 'commandType': 'home',
+                                          'key': 'key_1', 'status': 'failed', 'params': {}, 'error': error_data})
+    assert command_info.status_ is CommandStatus.FAILED
+    assert command_info.status_.is_done
+    assert command_info.error_.errorCode == '1000'
+    assert command_info.result is None
+
+
 def test_protocol_info(protocol_info_data):
     protocol_info = ProtocolInfo(**protocol_info_data)
     assert protocol_info.id == 'protocol123'
     assert protocol_info.protocolType == 'test_protocol'
+
+    summaries = [{'id': 'analysis_1', 'status': 'completed'}, {'id': 'analysis_2', 'status': 'pending'}]
+    assert not ProtocolInfo(**{**protocol_info_data, 'analysisSummaries': summaries}).is_analyzed
+    assert ProtocolInfo(**{**protocol_info_data, 'analysisSummaries': summaries[:1]}).is_analyzed
+    # Not yet queued for analysis
+    assert not ProtocolInfo(**{**protocol_info_data, 'analysisSummaries': []}).is_analyzed
+
+
+def test_from_dict(run_info_data):
+    run_info = RunInfo.from_dict({**run_info_data, 'extra': 1})
+    assert run_info.dict() == run_info_data
+    assert run_info == RunInfo(**run_info_data)
+    assert hash(Status.from_dict({'status': EngineStatus.IDLE})) == hash(Status(EngineStatus.IDLE))
+
+    # Nested objects are created once, without copying
+    assert run_info.labwareOffsets_ is run_info.labwareOffsets_
+    assert run_info.labwareOffsets_[0]._d is run_info_data['labwareOffsets'][0]
+    assert run_info.status_.is_active
+
+
+def test_missing_keys(vector_data):
+    # Comparing and hashing don't raise, and the dict leaves out missing keys
+    partial = Vector.from_dict({'x': vector_data['x']})
+    assert partial != Vector(**vector_data)
+    assert partial == Vector.from_dict({'x': vector_data['x']})
+    assert hash(partial) == hash(Vector.from_dict({'x': vector_data['x']}))
+    assert partial.dict() == {'x': vector_data['x']}
+
+
+def test_defaults(run_info_data):
+    del run_info_data['completedAt']
+    assert RunInfo(**run_info_data).dict()['completedAt'] is None
+    assert RunInfo.from_dict(run_info_data).completedAt is None
+
+
+def test_immutable(vector_data):
+    vector = Vector(**vector_data)
+    assert not hasattr(vector, '__dict__')
+    with pytest.raises(AttributeError):
+        vector.x = 1
+    with pytest.raises(AttributeError):
+        vector.w = 1
+
+
+def test_init_args(vector_data):
+    assert Vector(1, 2, 3) == Vector(x=1, y=2, z=3)
+    assert Vector(1, 2, 3) != Vector(1, 2, 4)
+    assert repr(Vector(1, 2, 3)) == 'Vector(x=1, y=2, z=3)'
+
+    with pytest.raises(TypeError):
+        Vector(1, 2)
+    with pytest.raises(TypeError):
+        Vector(1, 2, 3, 4)
+    with pytest.raises(TypeError):
+        Vector(1, 2, 3, x=1)
+    with pytest.raises(TypeError):
+        Vector(1, 2, 3, w=1)
+
+    # Missing keys are only checked when accessed
+    with pytest.raises(AttributeError):
+        Vector.from_dict({'x': 1}).y
+
+
+def test_pickle(run_info_data):
+    run_info = RunInfo.from_dict(run_info_data)
+    assert pickle.loads(pickle.dumps(run_info)) == run_info
@@ -1,4 +1,4 @@
-from opentrons_http_api.defs.enums import SettingId, Axis, Action
+from opentrons_http_api.defs.enums import SettingId, Axis, Action, CommandStatus
 
 
 def test_setting_id():
@@ -14,3 +14,8 @@ def test_axis():
 def test_action_type():
     Action('play')
     Action.PLAY
+
+
+def test_command_status():
+    assert CommandStatus('succeeded').is_done
+    assert not CommandStatus.QUEUED.is_done
@@ -1,7 +1,16 @@
-from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.defs.paths import Paths, path_template
 
 
 def test_paths():
     Paths.IDENTIFY
     Paths.RUNS_RUN_ID
     Paths.RUNS_RUN_ID.format(run_id='123')
+
+
+def test_path_template():
+    assert path_template('/runs') == Paths.RUNS
+    assert path_template('/runs/123') == Paths.RUNS_RUN_ID
+    assert path_template('/runs/123/commands/456') == Paths.RUNS_RUN_ID_COMMANDS_COMMAND_ID
+    assert path_template('/settings/robot') == Paths.SETTINGS_ROBOT
+    assert path_template(Paths.RUNS_RUN_ID) == Paths.RUNS_RUN_ID
+    assert path_template('/not/a/path') == '/not/a/path'
@@ -1,11 +1,15 @@
-from typing import Dict, Callable
+import json
+from io import BytesIO
+from typing import Dict, Callable, Optional
 from unittest.mock import Mock, patch
 
 import pytest
 from requests import Response
 
 from opentrons_http_api.api import API
+from opentrons_http_api.cache import ResponseCache
 from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.utils.multipart import MultipartEncoder
 
 
 RESPONSE = {'response': 'response'}
@@ -42,13 +46,37 @@ def test_url(api):
     assert api._url('/path') == 'http://some_host:31950/path'
 
 
+def test_session():
+    api = API('some_host', pool_maxsize=4, retries=3, timeout=(1, 5))
+    adapter = api._session.get_adapter(api._url('/path'))
+    assert adapter._pool_maxsize == 4
+    # Retried by the API rather than the adapter
+    assert adapter.max_retries.total == 0
+    assert api._retry_policy.retries == 3
+    assert api._timeout == (1, 5)
+
+
+def test_decoder():
+    assert API('some_host', decoder='json')._decoder is json.loads
+
+
+def test_context_manager():
+    api = API('some_host')
+    with patch.object(api._session, 'close') as mock_close:
+        with api:
+            pass
+        mock_close.assert_called_once_with()
+
+
 def test_get(api):
     """
-    Tests API._get by mocking requests.get.
+    Tests API._get by mocking the session's get method.
     """
-    with patch('opentrons_http_api.api.requests.get') as mock_requests_get:
+    with patch.object(api._session, 'get') as mock_requests_get:
         with patch.object(api, '_check_response'):
             mock_response = Mock(spec=Response)
+            mock_response.status_code = 200
+            mock_response.content = b'{"data": [1, 2.5, "a", null]}'
             mock_requests_get.return_value = mock_response
 
             path = '/path'
@@ -56,19 +84,22 @@ def test_get(api):
             # Call
             response = api._get(path)
 
-            mock_requests_get.assert_called_once_with(api._url(path), headers=API._HEADERS)
+            mock_requests_get.assert_called_once_with(api._url(path), headers=API._HEADERS, params=None,
+                                                      timeout=API._TIMEOUT)
             api._check_response.assert_called_once_with(mock_response)
 
-            assert response == mock_response.json()
+            assert response == {'data': [1, 2.5, 'a', None]}
 
 
 def test_post(api):
     """
-    Tests API._post by mocking requests.post.
+    Tests API._post by mocking the session's post method.
     """
-    with patch('opentrons_http_api.api.requests.post') as mock_requests_post:
+    with patch.object(api._session, 'post') as mock_requests_post:
         with patch.object(api, '_check_response'):
             mock_response = Mock(spec=Response)
+            mock_response.status_code = 200
+            mock_response.content = b'{"data": [1, 2.5, "a", null]}'
             mock_requests_post.return_value = mock_response
 
             path = '/path'
@@ -80,10 +111,55 @@ def test_post(api):
             response = api._post(path, query=params, body=body, other=other)
 
             mock_requests_post.assert_called_once_with(api._url(path), headers=API._HEADERS, params=params,
-                                                       json=body, other=other)
+                                                       json=body, timeout=API._TIMEOUT, other=other)
             api._check_response.assert_called_once_with(mock_response)
 
-            assert response == mock_response.json()
+            assert response == {'data': [1, 2.5, 'a', None]}
+
+
+def _response(status_code: int, content: bytes = b'', headers: Optional[dict] = None) -> Response:
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+def test_get_cached():
+    api = API('some_host', cache=ResponseCache({Paths.HEALTH: 0}))
+
+    with patch.object(api._session, 'get') as mock_get:
+        mock_get.return_value = _response(200, b'{"name": "robot"}', {'ETag': '"abc"'})
+        assert api._get(Paths.HEALTH) == {'name': 'robot'}
+
+        # Expired, so revalidated
+        mock_get.return_value = _response(304)
+        assert api._get(Paths.HEALTH) == {'name': 'robot'}
+        assert mock_get.call_args.kwargs['headers'] == {**API._HEADERS, 'If-None-Match': '"abc"'}
+
+        # Changed
+        mock_get.return_value = _response(200, b'{"name": "new"}')
+        assert api._get(Paths.HEALTH) == {'name': 'new'}
+
+        # Not cached
+        api._get(Paths.RUNS)
+        assert mock_get.call_args.kwargs['headers'] == API._HEADERS
+
+
+def test_post_invalidates_cache():
+    api = API('some_host', cache=ResponseCache({Paths.SETTINGS: 60}))
+
+    with patch.object(api._session, 'get') as mock_get, patch.object(api._session, 'post') as mock_post:
+        mock_get.return_value = _response(200, b'{"settings": []}')
+        mock_post.return_value = _response(200, b'{}')
+
+        api.get_settings()
+        api.get_settings()
+        assert mock_get.call_count == 1
+
+        api.post_settings('id_123', True)
+        api.get_settings()
+        assert mock_get.call_count == 2
 
 
 @pytest.mark.parametrize('method, path, path_kwargs', [
@@ -93,13 +169,14 @@ def test_post(api):
     (API.get_calibration_status, Paths.CALIBRATION_STATUS, {}),
     (API.get_motors_engaged, Paths.MOTORS_ENGAGED, {}),
     (API.get_health, Paths.HEALTH, {}),
-    (API.get_runs, Paths.RUNS, {}),
     (API.get_runs_run_id, Paths.RUNS_RUN_ID, {'run_id': 'run_123'}),
-    (API.get_runs_run_id_commands, Paths.RUNS_RUN_ID_COMMANDS, {'run_id': 'run_123'}),
+    (API.get_runs_run_id_loaded_labware_definitions, Paths.RUNS_RUN_ID_LOADED_LABWARE_DEFINITIONS,
+     {'run_id': 'run_123'}),
     (API.get_runs_run_id_commands_command_id, Paths.RUNS_RUN_ID_COMMANDS_COMMAND_ID, {'run_id': 'run_123',
                                                                                       'command_id': 'command_123'}),
     (API.get_protocols, Paths.PROTOCOLS, {}),
     (API.get_protocols_protocol_id, Paths.PROTOCOLS_PROTOCOL_ID, {'protocol_id': 'protocol_123'}),
+    (API.get_commands_command_id, Paths.COMMANDS_COMMAND_ID, {'command_id': 'command_123'}),
 ])
 def test_get_methods(api_with_mock_get: API, method: Callable, path: str, path_kwargs: Dict):
     """
@@ -114,6 +191,36 @@ def test_get_methods(api_with_mock_get: API, method: Callable, path: str, path_k
     api_with_mock_get._get.assert_called_once_with(path)
 
 
+@pytest.mark.parametrize('kwargs_in, query', [
+    ({}, None),
+    ({'page_length': 1}, {'pageLength': 1}),
+])
+def test_get_runs(api_with_mock_get: API, kwargs_in: Dict, query: Optional[Dict]):
+    assert api_with_mock_get.get_runs(**kwargs_in) == RESPONSE
+    api_with_mock_get._get.assert_called_once_with(Paths.RUNS, query=query)
+
+
+@pytest.mark.parametrize('kwargs_in, query', [
+    ({}, {}),
+    ({'cursor': 0}, {'cursor': 0}),
+    ({'cursor': 10, 'page_length': 5}, {'cursor': 10, 'pageLength': 5}),
+])
+def test_get_runs_run_id_commands(api_with_mock_get: API, kwargs_in: Dict, query: Dict):
+    assert api_with_mock_get.get_runs_run_id_commands('run_123', **kwargs_in) == RESPONSE
+
+    path = Paths.RUNS_RUN_ID_COMMANDS.format(run_id='run_123')
+    api_with_mock_get._get.assert_called_once_with(path, query=query)
+
+
+@pytest.mark.parametrize('kwargs_in, query', [
+    ({}, {}),
+    ({'cursor': 10, 'page_length': 5}, {'cursor': 10, 'pageLength': 5}),
+])
+def test_get_commands(api_with_mock_get: API, kwargs_in: Dict, query: Dict):
+    assert api_with_mock_get.get_commands(**kwargs_in) == RESPONSE
+    api_with_mock_get._get.assert_called_once_with(Paths.COMMANDS, query=query)
+
+
 @pytest.mark.parametrize('method, path, path_kwargs, kwargs_in, kwargs_out', [
     (
             API.post_identify, Paths.IDENTIFY, {},
@@ -137,8 +244,9 @@ def test_get_methods(api_with_mock_get: API, method: Callable, path: str, path_k
     ),
     (
             API.post_runs, Paths.RUNS, {},
-            {'data': {'protocolId': 'protocol_123', 'labwareOffsets': [{'labware': 'offsets'}]}},
-            {'body': {'data': {'protocolId': 'protocol_123', 'labwareOffsets': [{'labware': 'offsets'}]}}},
+            {'data': {'protocolId': 'protocol_123', 'labwareOffsets': [{'labware': 'offsets'}]}, 'dedup_key': 'key'},
+            {'body': {'data': {'protocolId': 'protocol_123', 'labwareOffsets': [{'labware': 'offsets'}]}},
+             'dedup_key': 'key'},
     ),
     (
             API.post_runs_run_id_actions, Paths.RUNS_RUN_ID_ACTIONS, {'run_id': 'run_123'},
@@ -146,10 +254,26 @@ def test_get_methods(api_with_mock_get: API, method: Callable, path: str, path_k
             {'body': {'data': {'actionType': 'play'}}},
     ),
     (
-            API.post_protocols, Paths.PROTOCOLS, {},
-            # Strictly these shouldn't be bytes
-            {'files': (b'file_1', b'file_2')},
-            {'files': (('files', b'file_1'), ('files', b'file_2'))},
+            API.post_runs_run_id_labware_offsets, Paths.RUNS_RUN_ID_LABWARE_OFFSETS, {'run_id': 'run_123'},
+            {'data': {'definitionUri': 'uri', 'location': {'slotName': '1'}, 'vector': {'x': 0, 'y': 0, 'z': 0}}},
+            {'body': {'data': {'definitionUri': 'uri', 'location': {'slotName': '1'},
+                               'vector': {'x': 0, 'y': 0, 'z': 0}}}},
+    ),
+    (
+            API.post_runs_run_id_labware_definitions, Paths.RUNS_RUN_ID_LABWARE_DEFINITIONS, {'run_id': 'run_123'},
+            {'data': {'namespace': 'custom_beta', 'version': 1}},
+            {'body': {'data': {'namespace': 'custom_beta', 'version': 1}}},
+    ),
+    (
+            API.post_commands, Paths.COMMANDS, {},
+            {'data': {'commandType': 'home', 'params': {}}},
+            {'query': {'waitUntilComplete': 'false'}, 'body': {'data': {'commandType': 'home', 'params': {}}}},
+    ),
+    (
+            API.post_commands, Paths.COMMANDS, {},
+            {'data': {'commandType': 'home', 'params': {}}, 'wait_until_complete': True, 'timeout': 5000},
+            {'query': {'waitUntilComplete': 'true', 'timeout': 5000},
+             'body': {'data': {'commandType': 'home', 'params': {}}}},
     ),
 ])
 def test_post_methods(api_with_mock_post: API, method: Callable, path: str, path_kwargs: Dict, kwargs_in: Dict,
@@ -164,3 +288,20 @@ def test_post_methods(api_with_mock_post: API, method: Callable, path: str, path
 
     path = path.format(**path_kwargs)
     api_with_mock_post._post.assert_called_once_with(path, **kwargs_out)
+
+
+def test_post_protocols(api_with_mock_post: API):
+    files = (BytesIO(b'file_1'), BytesIO(b'file_2'))
+    progress = Mock()
+
+    assert api_with_mock_post.post_protocols(files, progress) == RESPONSE
+
+    kwargs = api_with_mock_post._post.call_args.kwargs
+    encoder = kwargs['data']
+    assert isinstance(encoder, MultipartEncoder)
+    assert kwargs['headers'] == {'Content-Type': encoder.content_type}
+
+    body = encoder.read()
+    assert body.count(b'form-data; name="files"') == 2
+    assert b'file_1' in body and b'file_2' in body
+    progress.assert_called_once_with(len(body), len(body))
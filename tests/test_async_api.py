@@ -0,0 +1,94 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiohttp import web, ClientResponseError
+
+from opentrons_http_api.api import API
+from opentrons_http_api.async_api import AsyncAPI
+from opentrons_http_api.defs.paths import Paths
+
+
+RESPONSE = {'response': 'response'}
+
+
+async def _serve(routes: web.RouteTableDef) -> web.AppRunner:
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, 'localhost', 0).start()
+    return runner
+
+
+def _port(runner: web.AppRunner) -> int:
+    return runner.addresses[0][1]
+
+
+def test_init():
+    api = AsyncAPI('some_host')
+    assert api._base == 'http://some_host:31950'
+    assert api._url('/path') == 'http://some_host:31950/path'
+
+    with pytest.raises(TypeError):
+        with api:
+            pass
+
+
+def test_get_and_post():
+    """
+    Tests AsyncAPI._get and AsyncAPI._post against a local server.
+    """
+    routes = web.RouteTableDef()
+
+    @routes.get('/path')
+    async def get(request: web.Request):
+        assert request.headers['Opentrons-Version'] == '3'
+        return web.json_response(RESPONSE)
+
+    @routes.post('/path')
+    async def post(request: web.Request):
+        return web.json_response({'query': dict(request.query), 'body': await request.json()})
+
+    @routes.get('/missing')
+    async def missing(_: web.Request):
+        return web.json_response({}, status=404)
+
+    async def main():
+        runner = await _serve(routes)
+        try:
+            async with AsyncAPI('localhost') as api:
+                api._base = f'http://localhost:{_port(runner)}'
+                assert await api._get('/path') == RESPONSE
+                assert await api._post('/path', query={'a': '1'}, body={'b': 2}) == {'query': {'a': '1'},
+                                                                                     'body': {'b': 2}}
+                with pytest.raises(ClientResponseError):
+                    await api._get('/missing')
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_endpoint_methods():
+    """
+    Tests that the endpoint methods inherited from API are awaitable.
+    """
+    async def main():
+        api = AsyncAPI('some_host')
+        with patch.object(api, '_get', AsyncMock(return_value=RESPONSE)), \
+                patch.object(api, '_post', AsyncMock(return_value=RESPONSE)):
+            assert await api.get_health() == RESPONSE
+            api._get.assert_awaited_once_with(Paths.HEALTH)
+
+            assert await api.get_runs_run_id('run_123') == RESPONSE
+            api._get.assert_awaited_with(Paths.RUNS_RUN_ID.format(run_id='run_123'))
+
+            assert await api.post_robot_lights(True) == RESPONSE
+            api._post.assert_awaited_once_with(Paths.ROBOT_LIGHTS, body={'on': True})
+
+    asyncio.run(main())
+
+    # Every endpoint is mirrored
+    endpoints = [name for name in dir(API) if name.startswith(('get_', 'post_'))]
+    assert all(hasattr(AsyncAPI, name) for name in endpoints)
@@ -0,0 +1,112 @@
+from io import BytesIO
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from opentrons_http_api.async_robot_client import AsyncRobotClient
+from opentrons_http_api.defs.dict_data import RunInfo
+from opentrons_http_api.defs.enums import CommandStatus
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+RUN = {
+    'id': 'run_123',
+    'createdAt': '2024-01-01',
+    'status': 'succeeded',
+    'current': True,
+    'actions': [],
+    'errors': [],
+    'pipettes': [],
+    'modules': [],
+    'labware': [],
+    'liquids': [],
+    'labwareOffsets': [],
+    'protocolId': 'protocol_123',
+}
+
+
+def test_mirrors_robot_client():
+    public = [name for name in dir(RobotClient) if not name.startswith('_')]
+    assert all(hasattr(AsyncRobotClient, name) for name in public)
+
+
+def test_run():
+    async def main():
+        async with AsyncRobotClient('some_host') as client:
+            with patch.object(client._api, 'get_runs_run_id', AsyncMock(return_value={'data': RUN})), \
+                    patch.object(client._api, 'get_runs', AsyncMock(return_value={'data': [RUN, RUN]})):
+                run_info = await client.run('run_123')
+                assert run_info == RunInfo(**RUN)
+                assert run_info.status_.is_done
+                assert await client.runs() == (run_info, run_info)
+
+    asyncio.run(main())
+
+
+def test_iter_commands():
+    pages = [
+        {'data': [{'id': 'command_0'}, {'id': 'command_1'}], 'meta': {'totalLength': 3}},
+        {'data': [{'id': 'command_2'}], 'meta': {'totalLength': 3}},
+        {'data': [], 'meta': {'totalLength': 3}},
+    ]
+
+    async def main():
+        client = AsyncRobotClient('some_host')
+        with patch.object(client._api, 'get_runs_run_id_commands', AsyncMock(side_effect=pages)), \
+                patch.object(client._api, 'get_runs_run_id', AsyncMock(return_value={'data': RUN})):
+            commands = [command async for command in client.iter_commands('run_123', follow=True, page_length=2)]
+            assert [command['id'] for command in commands] == ['command_0', 'command_1', 'command_2']
+
+    asyncio.run(main())
+
+
+def test_add_labware_offsets():
+    posted = []
+
+    async def post(run_id: str, offset: dict) -> dict:
+        # Later offsets would finish first if they were sent at the same time
+        await asyncio.sleep(0.01 * (3 - offset['vector']['x']))
+        posted.append(offset['vector']['x'])
+        return {'data': dict(offset, id=f'offset_{len(posted)}')}
+
+    offsets = [{'definitionUri': 'opentrons/plate/1', 'location': {'slotName': '1'}, 'vector': {'x': x, 'y': 0, 'z': 0}}
+               for x in range(3)]
+
+    async def main():
+        client = AsyncRobotClient('some_host')
+        with patch.object(client._api, 'post_runs_run_id_labware_offsets', AsyncMock(side_effect=post)):
+            added = await client.add_labware_offsets('run_123', offsets)
+            assert [offset.vector['x'] for offset in added] == [0, 1, 2]
+        assert posted == [0, 1, 2]
+
+    asyncio.run(main())
+
+def test_send_commands():
+    async def main():
+        async with AsyncRobotClient(robot.host, port=robot.port) as client:
+            assert (await client.home()).status_ is CommandStatus.SUCCEEDED
+            commands = await client.send_commands([{'commandType': 'home'}] * 3)
+            assert all(command.status_ is CommandStatus.SUCCEEDED for command in commands)
+            assert (await client.command(commands[0].id)).id == commands[0].id
+
+    with FakeRobot(command_duration=0.05) as robot:
+        asyncio.run(main())
+        assert robot.requests[('POST', Paths.COMMANDS)] == 4
+
+
+def test_run_protocols():
+    protocols = []
+    for i in range(3):
+        f = BytesIO(f'# protocol {i}'.encode())
+        f.name = f'protocol_{i}.py'
+        protocols.append((f, ))
+
+    async def main():
+        async with AsyncRobotClient(robot.host, port=robot.port) as client:
+            runs = [run_info async for run_info in client.run_protocols(protocols, interval=0.05, min_interval=0.05)]
+            assert [run_info.status for run_info in runs] == ['succeeded'] * 3
+
+    with FakeRobot(run_duration=0.2, analysis_duration=0.1) as robot:
+        asyncio.run(main())
+        assert robot.requests[('POST', Paths.PROTOCOLS)] == 3
@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+import pytest
+
+from opentrons_http_api.cache import ResponseCache, CacheEntry
+from opentrons_http_api.defs.paths import Paths
+
+
+@pytest.fixture
+def cache():
+    yield ResponseCache({Paths.HEALTH: 10, Paths.RUNS_RUN_ID: 10, Paths.SETTINGS: 0}, max_bytes=100)
+
+
+def test_put_and_get(cache: ResponseCache):
+    assert cache.is_cached(Paths.HEALTH)
+    assert cache.is_cached('/runs/123')
+    assert not cache.is_cached(Paths.RUNS)
+
+    cache.put(Paths.HEALTH, {'name': 'robot'}, 10, {'ETag': '"abc"'})
+    entry = cache.get(Paths.HEALTH)
+    assert entry.data == {'name': 'robot'}
+    assert entry.is_fresh
+    assert entry.validators() == {'If-None-Match': '"abc"'}
+
+    # Uncached endpoints are ignored
+    cache.put(Paths.RUNS, {}, 10, {})
+    assert cache.get(Paths.RUNS) is None
+    assert len(cache) == 1
+
+
+def test_expiry(cache: ResponseCache):
+    cache.put(Paths.SETTINGS, {}, 10, {'Last-Modified': 'yesterday'})
+    entry = cache.get(Paths.SETTINGS)
+    assert not entry.is_fresh
+    assert entry.validators() == {'If-Modified-Since': 'yesterday'}
+
+    with patch.object(cache, '_ttls', {Paths.SETTINGS: 10}):
+        cache.renew(Paths.SETTINGS)
+    assert entry.is_fresh
+
+
+def test_lru_eviction(cache: ResponseCache):
+    cache.put('/runs/1', {}, 40, {})
+    cache.put('/runs/2', {}, 40, {})
+    cache.get('/runs/1')
+    cache.put('/runs/3', {}, 40, {})
+    assert cache.get('/runs/1') is not None
+    assert cache.get('/runs/2') is None
+    assert cache.size == 80
+
+    # Too large to cache
+    cache.put('/runs/4', {}, 101, {})
+    assert cache.get('/runs/4') is None
+
+
+def test_invalidate(cache: ResponseCache):
+    cache.put(Paths.HEALTH, {}, 1, {})
+    cache.put('/runs/1', {}, 1, {})
+    cache.put('/runs/2', {}, 1, {})
+
+    cache.invalidate_post('/runs/1/actions')
+    assert len(cache) == 1
+    assert cache.size == 1
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_entry():
+    assert CacheEntry({}, 0, 0).validators() == {}
+
+
+def test_cache_if():
+    cache = ResponseCache()
+    pending = {'data': {'id': 'protocol_1', 'analysisSummaries': [{'id': 'analysis_1', 'status': 'pending'}]}}
+    completed = {'data': {'id': 'protocol_1', 'analysisSummaries': [{'id': 'analysis_1', 'status': 'completed'}]}}
+
+    # Protocols are only cached once analysed
+    cache.put('/protocols/protocol_1', pending, 10, {})
+    assert cache.get('/protocols/protocol_1') is None
+    cache.put('/protocols/protocol_1', completed, 10, {})
+    assert cache.get('/protocols/protocol_1').data is completed
+
+    cache.invalidate_post(Paths.PROTOCOLS)
+    assert len(cache) == 0
@@ -0,0 +1,107 @@
+import json
+from io import StringIO
+from typing import Iterator, List
+from unittest.mock import patch
+
+import pytest
+
+from opentrons_http_api.cli import _hosts, _parser, main
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture
+def robots() -> Iterator[List[FakeRobot]]:
+    # Robots on separate loopback addresses with the same port, since the tool uses one port for all hosts
+    robots = [FakeRobot('127.0.0.1', num_runs=2, num_protocols=1, num_commands=3, run_duration=0.1)]
+    robots[0].start()
+    robots.append(FakeRobot('127.0.0.2', port=robots[0].port, num_runs=3, num_protocols=1, num_commands=3,
+                            run_duration=0.1))
+    robots[1].start()
+    yield robots
+    for robot in robots:
+        robot.stop()
+
+
+def _main(robots: List[FakeRobot], *args: str) -> tuple:
+    stream = StringIO()
+    code = main(['--hosts', ','.join(robot.host for robot in robots), '--port', str(robots[0].port), *args], stream)
+    return code, stream.getvalue()
+
+
+def test_json(robots: List[FakeRobot]):
+    code, out = _main(robots, 'runs')
+    assert code == 0
+    assert [(record['host'], len(record['data'])) for record in json.loads(out)] == [('127.0.0.1', 2),
+                                                                                     ('127.0.0.2', 3)]
+
+    code, out = _main(robots, 'lights', 'on')
+    assert code == 0
+    assert json.loads(out) == [{'host': '127.0.0.1', 'data': {'on': True}}, {'host': '127.0.0.2', 'data': {'on': True}}]
+
+    code, out = _main(robots, 'settings', 'shortFixedTrash', 'true')
+    assert code == 0
+    for record in json.loads(out):
+        assert {'id': 'shortFixedTrash', 'value': True}.items() <= record['data'][0].items()
+
+
+def test_hosts():
+    # As documented, with the hosts before the command
+    parser = _parser()
+    args = parser.parse_args(['--hosts', '10.0.0.1,10.0.0.2', 'health'])
+    assert args.command == 'health'
+    assert _hosts(parser, args) == ['10.0.0.1', '10.0.0.2']
+
+    args = parser.parse_args(['--hosts', '10.0.0.1', '--hosts', '10.0.0.2,10.0.0.1', 'runs', '--current'])
+    assert args.command == 'runs' and args.current
+    assert _hosts(parser, args) == ['10.0.0.1', '10.0.0.2']
+
+
+def test_errors(robots: List[FakeRobot], tmp_path):
+    hosts_file = tmp_path / 'robots.txt'
+    hosts_file.write_text(f'# Robots\n{robots[0].host}\n\n127.0.0.3  # Not running\n')
+
+    stream = StringIO()
+    code = main(['--hosts-file', str(hosts_file), '--port', str(robots[0].port), '--timeout', '1', '--format',
+                 'ndjson', 'health'], stream)
+    assert code == 1
+    records = {record['host']: record for record in map(json.loads, stream.getvalue().splitlines())}
+    assert records['127.0.0.1']['data']['name'] == 'fake-robot'
+    assert records['127.0.0.3']['error'].startswith('ConnectionError')
+
+    with pytest.raises(SystemExit):
+        main(['health'])
+    with pytest.raises(SystemExit):
+        main(['--hosts', 'robot', '--watch', '1', 'lights', 'on'])
+
+
+def test_run(robots: List[FakeRobot], tmp_path):
+    protocol = tmp_path / 'protocol.py'
+    protocol.write_bytes(b'metadata = {}\n')
+    robots[1].fail_runs = 1
+
+    code, out = _main(robots, '--format', 'ndjson', 'run', str(protocol), '--follow', '--poll-interval', '0.02')
+    assert code == 1
+    records = [json.loads(line) for line in out.splitlines()]
+    for robot in robots:
+        commands = [record['command']['id'] for record in records
+                    if record['host'] == robot.host and 'command' in record]
+        assert commands == ['command_0', 'command_1', 'command_2']
+    run_statuses = {record['host']: record['data']['status'] for record in records if 'data' in record}
+    assert run_statuses == {'127.0.0.1': 'succeeded', '127.0.0.2': 'failed'}
+
+
+def test_watch(robots: List[FakeRobot]):
+    refreshes = []
+
+    def sleep(seconds: float):
+        refreshes.append(seconds)
+        if len(refreshes) == 3:
+            raise KeyboardInterrupt
+
+    with patch('opentrons_http_api.cli.sleep', side_effect=sleep):
+        code, out = _main(robots[:1], '--watch', '0.5', '--format', 'ndjson', 'health')
+    assert code == 130
+    assert refreshes == [0.5] * 3
+    assert len(out.splitlines()) == 3
+    # The connection is kept alive between refreshes
+    assert robots[0].connections == 1
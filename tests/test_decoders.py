@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from opentrons_http_api.decoders import available_decoders, get_decoder
+
+
+BODY = b'{"data": [{"id": "run_123", "current": true, "completedAt": null, "vector": {"x": 1.5, "y": -2, "z": 0}}]}'
+
+
+@pytest.mark.parametrize('name', ['orjson', 'msgspec', 'json'])
+def test_get_decoder(name: str):
+    pytest.importorskip(name)
+    assert get_decoder(name)(BODY) == json.loads(BODY)
+
+
+def test_default_decoder():
+    assert get_decoder() is next(iter(available_decoders().values()))
+    assert 'json' in available_decoders()
+
+
+def test_custom_decoder():
+    assert get_decoder(json.loads) is json.loads
+
+    with pytest.raises(ValueError):
+        get_decoder('not_a_decoder')
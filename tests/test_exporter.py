@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from opentrons_http_api.defs.enums import Action
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.exporter import ExportCheckpoint, NdjsonWriter, ParquetWriter, RecordWriter, RunExporter
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture
+def robot():
+    with FakeRobot(num_runs=5, num_protocols=1, num_commands=25, run_duration=0.) as robot:
+        yield robot
+
+
+@pytest.fixture
+def client(robot: FakeRobot):
+    with RobotClient(robot.host, port=robot.port, timeout=5) as client:
+        yield client
+
+
+def _read(path: Path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def _failed_run(robot: FakeRobot, client: RobotClient) -> str:
+    robot.fail_runs = 1
+    run_id = client.create_run('protocol_0').id
+    client.action_run(run_id, Action.PLAY)
+    return run_id
+
+
+def test_export_ndjson(tmp_path: Path, robot: FakeRobot, client: RobotClient):
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    with NdjsonWriter(str(tmp_path)) as writer:
+        summary = RunExporter(client, writer, ExportCheckpoint(checkpoint_path), page_length=10,
+                              checkpoint_interval=2).export()
+    assert (summary.runs, summary.skipped, summary.commands, summary.errors) == (5, 0, 125, 0)
+
+    runs = _read(tmp_path / 'runs.ndjson')
+    commands = _read(tmp_path / 'commands.ndjson')
+    assert sorted(run['id'] for run in runs) == [f'run_{i}' for i in range(5)]
+    assert all(run['host'] == robot.host for run in runs)
+    assert [command['index'] for command in commands if command['runId'] == 'run_3'] == list(range(25))
+    assert robot.requests[('GET', Paths.RUNS_RUN_ID_COMMANDS)] == 5 * 3
+
+    # Resumes from the checkpoint, exporting only the new run
+    run_id = _failed_run(robot, client)
+    with NdjsonWriter(str(tmp_path)) as writer:
+        summary = RunExporter(client, writer, ExportCheckpoint(checkpoint_path)).export()
+    assert (summary.runs, summary.skipped, summary.commands, summary.errors) == (1, 5, 25, 1)
+
+    assert [run['id'] for run in _read(tmp_path / 'runs.ndjson')][-1] == run_id
+    error, = _read(tmp_path / 'errors.ndjson')
+    assert error['runId'] == run_id and error['detail'] == 'protocol failed'
+    assert len(_read(tmp_path / 'commands.ndjson')) == 150
+
+
+def test_export_incomplete_and_details(tmp_path: Path, robot: FakeRobot, client: RobotClient):
+    client.create_run('protocol_0')
+    with NdjsonWriter(str(tmp_path)) as writer:
+        summary = RunExporter(client, writer, command_details=True).export()
+
+    # The new run hasn't completed
+    assert (summary.runs, summary.skipped) == (5, 1)
+    assert all('result' in command for command in _read(tmp_path / 'commands.ndjson'))
+    assert robot.requests[('GET', Paths.RUNS_RUN_ID_COMMANDS_COMMAND_ID)] == 125
+
+
+def test_export_parquet(tmp_path: Path, robot: FakeRobot, client: RobotClient):
+    parquet = pytest.importorskip('pyarrow.parquet')
+
+    _failed_run(robot, client)
+    with ParquetWriter(str(tmp_path)) as writer:
+        summary = RunExporter(client, writer, checkpoint_interval=4).export()
+    assert (summary.runs, summary.commands, summary.errors) == (6, 150, 1)
+
+    commands = parquet.read_table(sorted(tmp_path.glob('commands-*.parquet')))
+    assert commands.num_rows == 150
+    assert json.loads(commands.column('params')[0].as_py())['volume'] == 100.0
+    assert commands.column('extra').null_count == 150
+
+    runs = parquet.read_table(sorted(tmp_path.glob('runs-*.parquet')))
+    assert runs.num_rows == 6 and {f'run_{i}' for i in range(5)} < set(runs.column('id').to_pylist())
+    assert len(list(tmp_path.glob('runs-*.parquet'))) == 2
+    assert parquet.read_table(list(tmp_path.glob('errors-*.parquet'))).num_rows == 1
+
+
+def test_incomplete_writer():
+    class Writer(RecordWriter):
+        def write(self, table: str, records) -> None:
+            pass
+
+    # Fails when created rather than when first flushed
+    with pytest.raises(TypeError):
+        Writer()
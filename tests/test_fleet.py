@@ -0,0 +1,93 @@
+import threading
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+from opentrons_http_api.fleet import Fleet, HostResult
+from opentrons_http_api.robot_client import RobotClient
+
+
+HOSTS = ('robot_1', 'robot_2', 'robot_3')
+
+
+@pytest.fixture
+def fleet():
+    with Fleet(HOSTS) as fleet:
+        yield fleet
+
+
+def test_init():
+    with pytest.raises(ValueError):
+        Fleet(('robot_1', 'robot_1'))
+
+
+def test_host_result():
+    assert HostResult('host', value=1).ok
+    assert HostResult('host', value=1).result() == 1
+
+    result = HostResult('host', exception=KeyError('foo'))
+    assert not result.ok
+    with pytest.raises(KeyError):
+        result.result()
+
+
+def test_call(fleet: Fleet):
+    # Calls run concurrently, so all robots must be waiting at once to pass the barrier
+    barrier = threading.Barrier(len(HOSTS), timeout=5)
+
+    def lights(client: RobotClient) -> bool:
+        barrier.wait()
+        if client is fleet.client('robot_2'):
+            raise ConnectionError('unreachable')
+        return True
+
+    with patch.object(RobotClient, 'lights', autospec=True, side_effect=lights):
+        results = fleet.lights()
+
+    assert tuple(results) == HOSTS
+    assert results['robot_1'].value is True
+    assert isinstance(results['robot_2'].exception, ConnectionError)
+    assert results['robot_3'].ok
+
+
+def test_as_completed(fleet: Fleet):
+    robot_1_done = threading.Event()
+
+    def host(client: RobotClient) -> str:
+        # robot_1 finishes last
+        if client is fleet.client('robot_1'):
+            assert robot_1_done.wait(5)
+        elif client is fleet.client('robot_3'):
+            robot_1_done.set()
+            raise ConnectionError('unreachable')
+        return client.host
+
+    results = list(fleet.as_completed(host))
+
+    assert results[-1] == HostResult('robot_1', value='robot_1')
+    assert {result.host for result in results} == set(HOSTS)
+    assert sum(not result.ok for result in results) == 1
+
+
+def test_getattr(fleet: Fleet):
+    with pytest.raises(AttributeError):
+        fleet.not_a_method()
+    with pytest.raises(AttributeError):
+        fleet._api
+
+
+def test_upload_protocol(fleet: Fleet):
+    uploaded = []
+
+    def upload_protocol(_, protocol_file, labware_definitions=None):
+        uploaded.append((protocol_file.name, protocol_file.read(), [f.read() for f in labware_definitions]))
+
+    protocol_file = BytesIO(b'protocol')
+    protocol_file.name = 'protocol.py'
+
+    with patch.object(RobotClient, 'upload_protocol', autospec=True, side_effect=upload_protocol):
+        results = fleet.upload_protocol(protocol_file, [BytesIO(b'labware')])
+
+    assert all(result.ok for result in results.values())
+    assert uploaded == [('protocol.py', b'protocol', [b'labware'])] * len(HOSTS)
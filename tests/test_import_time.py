@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+import pytest
+
+
+# Cumulative seconds to import a module, as measured by -X importtime. Well above the time on a laptop, so that only
+# importing something heavy, e.g. requests or aiohttp, exceeds it
+IMPORT_BUDGET = 0.05
+
+# Modules that are only imported once needed
+LAZY_MODULES = ('requests', 'urllib3', 'aiohttp', 'asyncio', 'dataclasses', 'http.client')
+
+
+def _import_time(module: str) -> float:
+    """
+    Import a module in a new interpreter, and get the seconds it took.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    # The last line is the module itself, e.g. "import time:  3173 |  17610 | opentrons_http_api.robot_client"
+    line = result.stderr.strip().splitlines()[-1]
+    _, cumulative, name = line.split('|')
+    assert name.strip() == module
+    return int(cumulative) / 1e6
+
+
+@pytest.mark.parametrize('module', ['opentrons_http_api.api', 'opentrons_http_api.robot_client'])
+def test_import_time(module):
+    # The best of a few, to ignore a slow first import while the disk cache is cold
+    assert min(_import_time(module) for _ in range(3)) < IMPORT_BUDGET
+
+
+def test_lazy_imports():
+    code = ('import sys, opentrons_http_api.robot_client; '
+            f'print(" ".join(m for m in {LAZY_MODULES!r} if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == []
@@ -0,0 +1,120 @@
+import asyncio
+from typing import List
+
+import pytest
+from requests import HTTPError
+
+from opentrons_http_api.api import API
+from opentrons_http_api.async_api import AsyncAPI
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.instrumentation import Histogram, HistogramAggregator, Instrumentation, RequestMetrics
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture(scope='module')
+def robot():
+    with FakeRobot(num_runs=3) as robot:
+        yield robot
+
+
+def test_api(robot: FakeRobot):
+    recorded: List[RequestMetrics] = []
+    calls = []
+
+    def outer(metrics: RequestMetrics, send):
+        calls.append(('outer', metrics.path))
+        return send()
+
+    def inner(metrics: RequestMetrics, send):
+        calls.append(('inner', metrics.path))
+        return send()
+
+    instrumentation = Instrumentation([recorded.append], [outer, inner])
+    with API(robot.host, port=robot.port, instrumentation=instrumentation) as api:
+        run_id = api.get_runs()['data'][0]['id']
+        api.get_runs_run_id(run_id)
+        api.post_robot_lights(True)
+        with pytest.raises(HTTPError):
+            api.get_runs_run_id('missing')
+
+    assert calls[:2] == [('outer', Paths.RUNS), ('inner', Paths.RUNS)]
+    assert [(m.method, m.path, m.status) for m in recorded] == [
+        ('GET', Paths.RUNS, 200),
+        ('GET', Paths.RUNS_RUN_ID, 200),
+        ('POST', Paths.ROBOT_LIGHTS, 200),
+        ('GET', Paths.RUNS_RUN_ID, 404),
+    ]
+
+    first, second, post, missing = recorded
+    assert first.host == robot.host
+    assert first.dns is not None and first.connect is not None
+    assert second.dns is None and second.connect is None
+    assert first.bytes_sent == 0 and first.bytes_received > 0
+    assert post.bytes_sent == len(b'{"on": true}')
+    assert 0 < first.ttfb <= first.total
+    assert first.decode is not None
+    assert missing.decode is None and isinstance(missing.error, HTTPError)
+
+
+def test_async_api(robot: FakeRobot):
+    recorded: List[RequestMetrics] = []
+
+    async def middleware(metrics: RequestMetrics, send):
+        return await send()
+
+    async def main():
+        instrumentation = Instrumentation([recorded.append], [middleware])
+        async with AsyncAPI(robot.host, port=robot.port, instrumentation=instrumentation) as api:
+            await api.get_health()
+            await api.post_robot_lights(False)
+
+    asyncio.run(main())
+
+    health, post = recorded
+    assert (health.method, health.path, health.status) == ('GET', Paths.HEALTH, 200)
+    assert health.connect is not None and 0 < health.ttfb <= health.total
+    assert health.bytes_received > 0 and health.decode is not None
+    assert (post.method, post.path, post.status) == ('POST', Paths.ROBOT_LIGHTS, 200)
+    assert post.bytes_sent > 0 and post.connect is None
+
+
+def test_histogram():
+    histogram = Histogram((1., 2., 4.))
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.5, 1.5, 1.5, 3., 10.):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.sum == 16.5 and histogram.count == 5
+    assert histogram.quantile(0.5) == pytest.approx(1.75)
+    assert histogram.quantile(1.) == 4.
+
+
+def test_aggregator():
+    aggregator = HistogramAggregator(buckets=(0.1, 1.))
+    aggregator(RequestMetrics('host_a', 'GET', Paths.RUNS_RUN_ID, 200, bytes_received=100, ttfb=0.05, total=0.5))
+    aggregator(RequestMetrics('host_a', 'GET', Paths.RUNS_RUN_ID, 200, bytes_received=50, ttfb=0.05, total=2.))
+    aggregator(RequestMetrics('host_"b"', 'POST', Paths.RUNS, error=ConnectionError(), total=0.05))
+
+    assert aggregator.histogram('total').count == 3
+    assert aggregator.histogram('total', host='host_a').count == 2
+    assert aggregator.histogram('total', status='ConnectionError').count == 1
+    assert aggregator.histogram('dns').count == 0
+    assert aggregator.quantile('ttfb', 0.5, path=Paths.RUNS_RUN_ID) == pytest.approx(0.05)
+    with pytest.raises(ValueError):
+        aggregator.histogram('missing')
+
+    text = aggregator.to_prometheus()
+    labels = 'host="host_a",method="GET",path="/runs/{run_id}",status="200"'
+    assert '# TYPE opentrons_http_request_total_seconds histogram' in text
+    assert f'opentrons_http_request_total_seconds_bucket{{{labels},le="0.1"}} 0' in text
+    assert f'opentrons_http_request_total_seconds_bucket{{{labels},le="1.0"}} 1' in text
+    assert f'opentrons_http_request_total_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f'opentrons_http_request_total_seconds_sum{{{labels}}} 2.5' in text
+    assert f'opentrons_http_request_total_seconds_count{{{labels}}} 2' in text
+    assert f'opentrons_http_request_received_bytes_total{{{labels}}} 150' in text
+    assert 'host="host_\\"b\\""' in text
+    assert 'dns_seconds' not in text
+
+    aggregator.reset()
+    assert aggregator.to_prometheus() == ''
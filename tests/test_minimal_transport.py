@@ -0,0 +1,96 @@
+import socket
+from io import BytesIO
+from typing import List
+
+import pytest
+import requests
+
+from opentrons_http_api.api import API
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.instrumentation import Instrumentation, RequestMetrics
+from opentrons_http_api.minimal_transport import MinimalSession
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture(scope='module')
+def robot():
+    with FakeRobot(num_runs=3) as robot:
+        yield robot
+
+
+def test_api(robot: FakeRobot):
+    recorded: List[RequestMetrics] = []
+    with API(robot.host, port=robot.port, timeout=(1., 5.), transport='minimal',
+             instrumentation=Instrumentation([recorded.append])) as api:
+        assert isinstance(api._session, MinimalSession)
+        assert api.get_health()['name'] == 'fake-robot'
+        assert len(api.get_runs(page_length=2)['data']) == 2
+        assert api.post_robot_lights(True)['on'] is True
+        assert api.get_robot_lights()['on'] is True
+
+        protocol = BytesIO(b'metadata = {}\n')
+        protocol.name = 'protocol.py'
+        assert api.post_protocols([protocol])['data']['files'][0]['name'] == 'protocol.py'
+
+        with pytest.raises(requests.HTTPError) as exc_info:
+            api.get_runs_run_id('missing')
+        assert exc_info.value.response.status_code == 404
+
+        # Reconnects once the robot closes the kept alive connection
+        sock, peer = socket.socketpair()
+        peer.close()
+        api._session._connection.sock.close()
+        api._session._connection.sock = sock
+        assert api.get_health()['name'] == 'fake-robot'
+
+    post = recorded[2]
+    assert (post.method, post.path, post.status) == ('POST', Paths.ROBOT_LIGHTS, 200)
+    assert post.bytes_sent == len(b'{"on": true}') and post.bytes_received > 0
+    assert 0 < post.ttfb <= post.total
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        API(transport='curl')
+
+    # Nothing is listening on the port
+    with FakeRobot() as robot:
+        host, port = robot.host, robot.port
+    with API(host, port=port, timeout=1., transport='minimal') as api:
+        with pytest.raises(requests.ConnectionError):
+            api.get_health()
+
+    # Timeouts are mapped on Python versions where socket.timeout isn't TimeoutError
+    with pytest.raises(requests.ReadTimeout):
+        MinimalSession._raise(socket.timeout('timed out'), connect=False)
+
+
+def _drop_connection(session: MinimalSession) -> None:
+    # As if the robot closed the kept alive connection
+    sock, peer = socket.socketpair()
+    peer.close()
+    session._connection.sock.close()
+    session._connection.sock = sock
+
+
+def test_resend(robot: FakeRobot):
+    with API(robot.host, port=robot.port, timeout=(1., 5.), transport='minimal') as api:
+        api.get_health()
+        posts = robot.requests[('POST', Paths.ROBOT_LIGHTS)]
+
+        # A POST without a dedup key may have been handled, so isn't sent again
+        _drop_connection(api._session)
+        with pytest.raises(requests.ConnectionError):
+            api.post_robot_lights(True)
+        assert robot.requests[('POST', Paths.ROBOT_LIGHTS)] == posts
+
+        api.get_health()
+        _drop_connection(api._session)
+        url = f'http://{robot.host}:{robot.port}{Paths.ROBOT_LIGHTS}'
+        assert api._session.post(url, json={'on': True}, idempotent=True).status_code == 200
+        assert robot.requests[('POST', Paths.ROBOT_LIGHTS)] == posts + 1
+
+        # A POST with a dedup key is idempotent, so it's sent again
+        _drop_connection(api._session)
+        assert api._post(Paths.ROBOT_LIGHTS, body={'on': False}, dedup_key='lights-off')['on'] is False
+        assert robot.requests[('POST', Paths.ROBOT_LIGHTS)] == posts + 2
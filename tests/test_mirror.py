@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from time import sleep
+
+import pytest
+
+from opentrons_http_api.defs.enums import Action, EngineStatus
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.mirror import MirrorSyncer, RobotMirror
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture
+def robot():
+    with FakeRobot(num_runs=25, num_protocols=2, num_commands=5, run_duration=0.05) as robot:
+        yield robot
+
+
+def test_sync(tmp_path, robot: FakeRobot):
+    client = RobotClient(robot.host, port=robot.port)
+    path = str(tmp_path / 'robots.db')
+
+    with RobotMirror(path) as mirror:
+        syncer = MirrorSyncer(mirror, [robot.host], port=robot.port, page_length=2)
+        syncer.sync()
+        assert not syncer.errors
+        assert mirror.hosts == (robot.host, )
+        assert len(mirror.runs()) == 25
+        assert mirror.health(robot.host).name == 'fake-robot'
+        assert mirror.synced_at(robot.host) is not None
+        assert {setting.id for setting in mirror.settings(robot.host)} == set(robot.settings)
+        assert [protocol.id for _, protocol in mirror.protocols(protocol_type='python')] == ['protocol_0',
+                                                                                             'protocol_1']
+        assert mirror.protocols(protocol_type='json') == []
+
+        # A new run that isn't done yet
+        run_id = client.create_run('protocol_0').id
+        robot.requests.clear()
+        syncer.sync()
+        assert robot.requests[('GET', Paths.RUNS)] == 1
+        assert mirror.unfinished_run_ids(robot.host) == {run_id}
+
+        # Pages of recent runs double in length until reaching a run that was done
+        for _ in range(6):
+            client.action_run(client.create_run('protocol_1').id, Action.PLAY)
+            sleep(0.1)
+        robot.requests.clear()
+        syncer.sync()
+        assert robot.requests[('GET', Paths.RUNS)] == 3
+        assert robot.requests[('GET', Paths.RUNS_RUN_ID)] == 0
+        assert len(mirror.runs()) == 32
+
+        # The unfinished run is older than the recent runs, so is fetched by itself
+        robot.fail_runs = 1
+        client.action_run(run_id, Action.PLAY)
+        sleep(0.1)
+        robot.requests.clear()
+        syncer.sync()
+        assert robot.requests[('GET', Paths.RUNS)] == 1
+        assert robot.requests[('GET', Paths.RUNS_RUN_ID)] == 1
+        assert not mirror.unfinished_run_ids(robot.host)
+
+        (host, failed), = mirror.runs(status=EngineStatus.FAILED)
+        assert (host, failed.id) == (robot.host, run_id)
+        assert failed.errors_[0].detail == 'protocol failed'
+
+        # Deleted from the robot before it was seen to finish
+        run_id = client.create_run('protocol_0').id
+        syncer.sync()
+        del robot._runs[run_id]
+        client.action_run(client.create_run('protocol_1').id, Action.PLAY)
+        sleep(0.1)
+        syncer.sync()
+        assert not mirror.unfinished_run_ids(robot.host)
+        assert run_id in mirror.run_ids(robot.host)
+        syncer.close()
+
+    # Persists, and queries by creation time
+    with RobotMirror(path) as mirror:
+        recent = mirror.runs(since=datetime(2025, 1, 1, tzinfo=timezone.utc))
+        assert len(recent) == 9
+        assert recent[0][1].createdAt >= recent[-1][1].createdAt
+        assert len(mirror.runs(until='2025-01-01T00:00:00Z', host=robot.host)) == 25
+        assert mirror.runs(protocol_id='protocol_1', since='2025-01-01T00:00:00+00:00')[0][1].protocolId == \
+            'protocol_1'
+
+
+def test_background(robot: FakeRobot):
+    with RobotMirror() as mirror:
+        with MirrorSyncer(mirror, [robot.host, 'localhost'], interval=0.01, port=robot.port, timeout=1):
+            for _ in range(100):
+                if mirror.hosts:
+                    break
+                sleep(0.01)
+        assert robot.host in mirror.hosts
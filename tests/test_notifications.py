@@ -0,0 +1,136 @@
+import asyncio
+import socket
+import threading
+from time import perf_counter
+
+import pytest
+
+from opentrons_http_api.async_robot_client import AsyncRobotClient
+from opentrons_http_api.defs.enums import Action, EngineStatus
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.notifications import NotificationClient, Topics
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_broker import FakeBroker, topic_matches
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+RUN_DURATION = 0.5
+# Slow enough that polling alone couldn't see the run finish in time
+INTERVALS = {'interval': 5., 'min_interval': 5., 'max_interval': 5.}
+
+
+@pytest.fixture
+def broker():
+    with FakeBroker() as broker:
+        yield broker
+
+
+@pytest.fixture
+def robot(broker: FakeBroker):
+    with FakeRobot(num_protocols=1, run_duration=RUN_DURATION, broker=broker) as robot:
+        yield robot
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(condition, timeout: float = 5.) -> None:
+    start = perf_counter()
+    while not condition():
+        assert perf_counter() - start < timeout
+        threading.Event().wait(0.01)
+
+
+def test_topic_matches():
+    assert topic_matches('robot-server/runs', 'robot-server/runs')
+    assert topic_matches('robot-server/runs/+', 'robot-server/runs/run_1')
+    assert topic_matches('robot-server/#', 'robot-server/runs/run_1')
+    assert not topic_matches('robot-server/runs', 'robot-server/runs/run_1')
+    assert not topic_matches('robot-server/runs/+', 'robot-server/runs')
+
+
+def test_notification_client(broker: FakeBroker):
+    received = []
+    with NotificationClient(broker.host, port=broker.port) as notifications:
+        assert notifications.connected
+        unsubscribe = notifications.subscribe('robot-server/runs/+', received.append)
+        _wait_for(lambda: broker.subscriptions() == {'robot-server/runs/+': 1})
+
+        broker.publish(Topics.RUN.format(run_id='run_1'), {'refetch': True})
+        broker.publish(Topics.RUNS, {'refetch': True})
+        _wait_for(lambda: received == [{'refetch': True}])
+
+        unsubscribe()
+        _wait_for(lambda: not broker.subscriptions())
+
+
+def test_reconnect():
+    port = _free_port()
+    received = []
+    with NotificationClient('localhost', port=port, connect_timeout=0.1, max_reconnect_delay=0.1) as notifications:
+        notifications.subscribe(Topics.RUNS, received.append)
+        assert not notifications.connected
+
+        # Subscribes once the broker is up, and tells subscribers to refetch what they may have missed
+        with FakeBroker(port=port) as broker:
+            _wait_for(lambda: notifications.connected, timeout=10.)
+            _wait_for(lambda: received == [{'refetch': True}])
+            _wait_for(lambda: broker.subscriptions() == {Topics.RUNS: 1})
+
+
+def test_watch_run(broker: FakeBroker, robot: FakeRobot):
+    with NotificationClient(broker.host, port=broker.port) as notifications, \
+            RobotClient(robot.host, port=robot.port, notifications=notifications) as client:
+        run_id = client.create_run('protocol_0').id
+        watcher = client.watch_run(run_id, **INTERVALS)
+        changes = []
+        watcher.subscribe(changes.append)
+        _wait_for(lambda: watcher.run_info is not None and broker.subscriptions())
+        assert watcher.run_info.status_.status is EngineStatus.IDLE
+
+        start = perf_counter()
+        client.action_run(run_id, Action.PLAY)
+        assert watcher.wait(timeout=RUN_DURATION + 2.) is EngineStatus.SUCCEEDED
+        # Seen as soon as the robot notifies
+        assert perf_counter() - start < RUN_DURATION + 1.
+        assert changes == [(None, EngineStatus.IDLE), (EngineStatus.IDLE, EngineStatus.RUNNING),
+                           (EngineStatus.RUNNING, EngineStatus.FINISHING),
+                           (EngineStatus.FINISHING, EngineStatus.SUCCEEDED)]
+
+        # The view of the run is updated in place
+        assert watcher.run_info.status_.status is EngineStatus.SUCCEEDED
+        assert watcher.run_info.completedAt is not None
+        # Only polled when notified, once on connecting and for each change
+        assert robot.requests[('GET', Paths.RUNS_RUN_ID)] <= 5
+        _wait_for(lambda: not broker.subscriptions().get(Topics.RUN.format(run_id=run_id)))
+
+
+def test_watch_run_without_broker(robot: FakeRobot):
+    with NotificationClient('localhost', port=_free_port(), connect_timeout=0.1,
+                                    max_reconnect_delay=0.1) as notifications, \
+            RobotClient(robot.host, port=robot.port, notifications=notifications) as client:
+        run_id = client.create_run('protocol_0').id
+        client.action_run(run_id, Action.PLAY)
+        # Falls back to polling
+        watcher = client.watch_run(run_id, interval=0.05, min_interval=0.05)
+        assert watcher.wait(timeout=RUN_DURATION + 2.) is EngineStatus.SUCCEEDED
+        assert robot.requests[('GET', Paths.RUNS_RUN_ID)] > 5
+
+
+def test_watch_run_async(broker: FakeBroker, robot: FakeRobot):
+    async def main():
+        async with AsyncRobotClient(robot.host, port=robot.port, notifications=notifications) as client:
+            run_id = (await client.create_run('protocol_0')).id
+            watcher = client.watch_run(run_id, **INTERVALS)
+            watcher.subscribe(lambda _: None)
+            while not broker.subscriptions():
+                await asyncio.sleep(0.01)
+            await client.action_run(run_id, Action.PLAY)
+            assert await watcher.wait(timeout=RUN_DURATION + 2.) is EngineStatus.SUCCEEDED
+            assert watcher.run_info.status_.status is EngineStatus.SUCCEEDED
+
+    with NotificationClient(broker.host, port=broker.port) as notifications:
+        asyncio.run(main())
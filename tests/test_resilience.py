@@ -0,0 +1,162 @@
+import asyncio
+from time import sleep
+from typing import List
+
+import pytest
+import requests
+
+from opentrons_http_api.api import API
+from opentrons_http_api.async_api import AsyncAPI
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.instrumentation import Instrumentation, RequestMetrics
+from opentrons_http_api.resilience import BreakerState, CircuitBreaker, CircuitOpenError, RetryPolicy
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture
+def robot():
+    with FakeRobot(num_protocols=1) as robot:
+        yield robot
+
+
+def _unavailable(robot: FakeRobot, method: str, template: str, times: int) -> None:
+    """
+    Make an endpoint respond 503 a number of times before responding as usual.
+    """
+    handler = robot._routes[(method, template)]
+    remaining = [times]
+
+    def unavailable(**kwargs):
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            return 503, {'message': 'unavailable'}
+        return handler(**kwargs)
+
+    robot.route(method, template, unavailable)
+
+
+def test_retry_policy():
+    policy = RetryPolicy(retries=3, backoff_factor=1., max_backoff=3., jitter=False)
+    assert policy.should_retry(0) and policy.should_retry(2, status=503)
+    assert not policy.should_retry(3)
+    assert not policy.should_retry(0, status=500)
+    assert [policy.backoff(retries) for retries in range(4)] == [1., 2., 3., 3.]
+
+    policy = RetryPolicy(retries=3, backoff_factor=1.)
+    assert all(0. <= policy.backoff(2) <= 4. for _ in range(100))
+
+
+def test_circuit_breaker():
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05,
+                             on_change=lambda *change: changes.append(change))
+    breaker.check('robot')
+
+    breaker.record_failure('robot')
+    assert breaker.state('robot') is BreakerState.CLOSED and breaker.failures('robot') == 1
+    breaker.record_failure('robot')
+    assert breaker.states() == {'robot': BreakerState.OPEN}
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.check('robot')
+    assert exc_info.value.host == 'robot' and 0 < exc_info.value.retry_in <= 0.05
+    # Other robots are unaffected
+    breaker.check('other_robot')
+
+    sleep(0.05)
+    assert breaker.state('robot') is BreakerState.HALF_OPEN
+    breaker.check('robot')
+    # Opens again after a failure while half open
+    breaker.record_failure('robot')
+    assert breaker.state('robot') is BreakerState.OPEN
+
+    sleep(0.05)
+    breaker.record_success('robot')
+    assert breaker.state('robot') is BreakerState.CLOSED and breaker.failures('robot') == 0
+    assert changes == [('robot', BreakerState.CLOSED, BreakerState.OPEN),
+                       ('robot', BreakerState.HALF_OPEN, BreakerState.OPEN),
+                       ('robot', BreakerState.HALF_OPEN, BreakerState.CLOSED)]
+
+
+def test_retries(robot: FakeRobot):
+    recorded: List[RequestMetrics] = []
+    with API(robot.host, port=robot.port, retries=2, backoff_factor=0.,
+             instrumentation=Instrumentation([recorded.append])) as api:
+        _unavailable(robot, 'GET', Paths.HEALTH, 2)
+        assert api.get_health()['name'] == 'fake-robot'
+        assert robot.requests[('GET', Paths.HEALTH)] == 3
+        assert (recorded[-1].status, recorded[-1].retries) == (200, 2)
+
+        # Returns the last response once out of retries
+        _unavailable(robot, 'GET', Paths.HEALTH, 3)
+        with pytest.raises(requests.HTTPError):
+            api.get_health()
+
+        # POSTs aren't retried
+        _unavailable(robot, 'POST', Paths.ROBOT_LIGHTS, 1)
+        with pytest.raises(requests.HTTPError):
+            api.post_robot_lights(True)
+
+        # Unless they have a dedup key
+        _unavailable(robot, 'POST', Paths.RUNS, 1)
+        robot.requests.clear()
+        run = api.post_runs({'protocolId': 'protocol_0', 'labwareOffsets': []}, dedup_key='run_1')['data']
+        assert robot.requests[('POST', Paths.RUNS)] == 2
+        # Calling again with the same key doesn't create another run
+        assert api.post_runs({'protocolId': 'protocol_0', 'labwareOffsets': []}, dedup_key='run_1')['data'] == run
+        assert robot.requests[('POST', Paths.RUNS)] == 2
+        assert len(api.get_runs()['data']) == 1
+
+
+@pytest.mark.parametrize('transport', API.TRANSPORTS)
+def test_circuit_open(robot: FakeRobot, transport: str):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.)
+    _unavailable(robot, 'GET', Paths.HEALTH, 2)
+    with API(robot.host, port=robot.port, circuit_breaker=breaker, transport=transport) as api:
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                api.get_health()
+        assert breaker.state(robot.host) is BreakerState.OPEN
+
+        robot.requests.clear()
+        with pytest.raises(CircuitOpenError):
+            api.get_health()
+        assert not robot.requests
+
+        # 4xx responses show the robot is reachable
+        breaker.reset(robot.host)
+        with pytest.raises(requests.HTTPError):
+            api.get_runs_run_id('missing')
+        assert breaker.failures(robot.host) == 0
+
+    # Unreachable
+    robot.stop()
+    with API(robot.host, port=robot.port, circuit_breaker=breaker, timeout=1., transport=transport) as api:
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                api.get_health()
+        with pytest.raises(CircuitOpenError):
+            api.get_health()
+
+
+def test_async(robot: FakeRobot):
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    async def main():
+        async with AsyncAPI(robot.host, port=robot.port, retries=1, backoff_factor=0.,
+                            circuit_breaker=breaker) as api:
+            _unavailable(robot, 'GET', Paths.HEALTH, 1)
+            assert (await api.get_health())['name'] == 'fake-robot'
+
+            data = {'protocolId': 'protocol_0', 'labwareOffsets': []}
+            run = (await api.post_runs(data, dedup_key='run_1'))['data']
+            assert (await api.post_runs(data, dedup_key='run_1'))['data'] == run
+            assert robot.requests[('POST', Paths.RUNS)] == 1
+
+            _unavailable(robot, 'GET', Paths.HEALTH, 2)
+            with pytest.raises(Exception):
+                await api.get_health()
+            with pytest.raises(CircuitOpenError):
+                await api.get_health()
+
+    asyncio.run(main())
+    assert robot.requests[('GET', Paths.HEALTH)] == 4
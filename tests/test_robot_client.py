@@ -0,0 +1,202 @@
+from io import BytesIO
+from time import monotonic
+from typing import Iterator, List, Optional
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from opentrons_http_api.cache import ResponseCache
+from opentrons_http_api.defs.enums import CommandStatus
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+from opentrons_http_api.utils.protocol_index import ProtocolIndex
+
+
+class _CommandsAPI:
+    """
+    Stand-in for the commands endpoints of a run that adds a command on every status request until the run is done.
+    """
+    def __init__(self, num_commands: int, final_length: int, meta: bool = True):
+        self.commands: List[dict] = [{'id': f'command_{i}'} for i in range(num_commands)]
+        self.final_length = final_length
+        self.meta = meta
+        self.pages: List[tuple] = []
+
+    def get_runs_run_id_commands(self, run_id: str, cursor: Optional[int] = None,
+                                 page_length: Optional[int] = None) -> dict:
+        self.pages.append((cursor, page_length))
+        d = {'data': self.commands[cursor:cursor + page_length]}
+        if self.meta:
+            d['meta'] = {'cursor': cursor, 'totalLength': len(self.commands)}
+        return d
+
+    def get_runs_run_id(self, run_id: str) -> dict:
+        if len(self.commands) < self.final_length:
+            self.commands.append({'id': f'command_{len(self.commands)}'})
+            return {'data': {'status': 'running'}}
+        return {'data': {'status': 'succeeded'}}
+
+    def get_runs_run_id_commands_command_id(self, run_id: str, command_id: str) -> dict:
+        return {'data': {'id': command_id, 'result': {}}}
+
+
+@pytest.fixture
+def client():
+    yield RobotClient('some_host')
+
+
+@pytest.mark.parametrize('meta', [True, False])
+def test_iter_commands(client: RobotClient, meta: bool):
+    client._api = _CommandsAPI(5, 5, meta)
+    commands = list(client.iter_commands('run_123', page_length=2))
+    assert [command['id'] for command in commands] == [f'command_{i}' for i in range(5)]
+    assert client._api.pages[:3] == [(0, 2), (2, 2), (4, 2)]
+
+
+def test_iter_commands_resume(client: RobotClient):
+    client._api = _CommandsAPI(5, 5)
+    assert [command['id'] for command in client.iter_commands('run_123', cursor=3)] == ['command_3', 'command_4']
+
+
+def test_iter_commands_follow(client: RobotClient):
+    client._api = _CommandsAPI(2, 6)
+    commands = list(client.iter_commands('run_123', follow=True, page_length=3, poll_interval=0))
+    assert [command['id'] for command in commands] == [f'command_{i}' for i in range(6)]
+
+
+def test_run_command(client: RobotClient):
+    client._api = Mock(wraps=_CommandsAPI(1, 1))
+    assert client.run_command('run_123', 'command_0') == {'id': 'command_0', 'result': {}}
+    client._api.get_runs_run_id_commands_command_id.assert_called_once_with('run_123', 'command_0')
+
+
+def _http_error(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+@pytest.mark.parametrize('runs, expected', [
+    ({'data': [], 'links': {}}, None),
+    ({'data': [{'id': 'run_1', 'current': False}], 'links': {}}, None),
+    ({'data': [{'id': 'run_1', 'current': True}], 'links': {'current': {'href': '/runs/run_1'}}}, 'run_1'),
+    ({'data': [{'id': 'run_2', 'current': False}], 'links': {'current': {'href': '/runs/run_1'}}}, 'run_1'),
+])
+def test_current_run(client: RobotClient, runs: dict, expected: Optional[str]):
+    client._api = Mock()
+    client._api.get_runs.return_value = runs
+    client._api.get_runs_run_id.side_effect = lambda run_id: {'data': {'id': run_id}}
+
+    run_info = client.current_run()
+    assert (run_info and run_info.id) == expected
+    client._api.get_runs.assert_called_once_with(page_length=1)
+
+
+def test_upload_protocol_dedup():
+    client = RobotClient('some_host', protocol_index=ProtocolIndex())
+    client._api = Mock()
+    client._api.post_protocols.side_effect = [{'data': {'id': 'protocol_1'}}, {'data': {'id': 'protocol_2'}}]
+    client._api.get_protocols_protocol_id.return_value = {'data': {'id': 'protocol_1'}}
+
+    assert client.upload_protocol(BytesIO(b'protocol')).id == 'protocol_1'
+    assert client.upload_protocol(BytesIO(b'protocol')).id == 'protocol_1'
+    assert client._api.post_protocols.call_count == 1
+
+    # Deleted from the robot
+    client._api.get_protocols_protocol_id.side_effect = _http_error(404)
+    assert client.upload_protocol(BytesIO(b'protocol')).id == 'protocol_2'
+    assert client._api.post_protocols.call_count == 2
+
+    client._api.get_protocols_protocol_id.side_effect = _http_error(500)
+    with pytest.raises(requests.HTTPError):
+        client.upload_protocol(BytesIO(b'protocol'))
+
+
+@pytest.mark.parametrize('cache', [None, ResponseCache()])
+def test_send_command(cache: Optional[ResponseCache]):
+    with FakeRobot(command_duration=0.05) as robot, RobotClient(robot.host, port=robot.port, cache=cache) as client:
+        assert not client.lights()
+        command = client.set_rail_lights(True)
+        assert command.commandType == 'setRailLights' and command.status_ is CommandStatus.SUCCEEDED
+        assert client.lights()
+
+        command = client.send_command('home', wait=False)
+        assert command.status_ is CommandStatus.QUEUED or command.status_ is CommandStatus.RUNNING
+        assert client.command(command.id).id == command.id
+
+        robot.fail_commands = 1
+        command = client.home()
+        assert command.status_ is CommandStatus.FAILED and command.error_.errorType == 'CommandFailedError'
+
+        robot.command_duration = 1.
+        with pytest.raises(TimeoutError):
+            client.send_command('home', timeout=0.05)
+
+
+def test_send_commands():
+    with FakeRobot(command_duration=0.05) as robot, RobotClient(robot.host, port=robot.port) as client:
+        assert client.send_commands([]) == ()
+
+        robot.fail_commands = 1
+        commands = client.send_commands([{'commandType': 'home'},
+                                         {'commandType': 'setRailLights', 'params': {'on': True}},
+                                         {'commandType': 'home'}])
+        assert [command.commandType for command in commands] == ['home', 'setRailLights', 'home']
+        assert [command.status_ for command in commands] == [CommandStatus.FAILED, CommandStatus.SUCCEEDED,
+                                                             CommandStatus.SUCCEEDED]
+        # Only the last command was waited for
+        assert robot.requests[('POST', Paths.COMMANDS)] == 3
+        assert robot.requests[('GET', Paths.COMMANDS_COMMAND_ID)] == 2
+
+
+def _protocols(n: int) -> List[tuple]:
+    files = []
+    for i in range(n):
+        f = BytesIO(f'# protocol {i}'.encode())
+        f.name = f'protocol_{i}.py'
+        files.append((f, ))
+    return files
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_run_protocols(prefetch: int):
+    with FakeRobot(run_duration=0.3, analysis_duration=0.1) as robot, \
+            RobotClient(robot.host, port=robot.port) as client:
+        runs = list(client.run_protocols(_protocols(3), prefetch=prefetch, interval=0.05, min_interval=0.05))
+        assert [run_info.status for run_info in runs] == ['succeeded'] * 3
+        assert robot.requests[('POST', Paths.PROTOCOLS)] == 3
+
+        # With prefetching, the next protocols are uploaded and analysed before the current run is done
+        protocols = [client.protocol(run_info.protocolId) for run_info in runs]
+        assert all(protocol_info.is_analyzed for protocol_info in protocols)
+        uploaded_early = [protocols[i + 1].createdAt < runs[i].completedAt for i in range(2)]
+        assert uploaded_early == [bool(prefetch)] * 2
+
+
+def test_run_protocols_close():
+    def protocols(robot: FakeRobot) -> Iterator[tuple]:
+        files = _protocols(3)
+        yield from files[:2]
+        # The last protocol is still being analysed when the iterator is closed
+        robot.analysis_duration = 60.
+        yield files[2]
+
+    with FakeRobot(run_duration=0.2, analysis_duration=0.05) as robot, \
+            RobotClient(robot.host, port=robot.port) as client:
+        runs = client.run_protocols(protocols(robot), interval=0.05, min_interval=0.05)
+        assert next(runs).status == 'succeeded'
+        start = monotonic()
+        runs.close()
+        assert monotonic() - start < 2.
+
+
+@pytest.mark.parametrize('cache', [None, ResponseCache()])
+def test_wait_for_analysis(cache: Optional[ResponseCache]):
+    with FakeRobot(analysis_duration=0.3) as robot, RobotClient(robot.host, port=robot.port, cache=cache) as client:
+        protocol_id = client.upload_protocol(*_protocols(1)[0]).id
+        with pytest.raises(TimeoutError):
+            client.wait_for_analysis(protocol_id, timeout=0.05, poll_interval=0.01)
+        # A cached response from before the analysis completed isn't served again
+        assert client.wait_for_analysis(protocol_id, timeout=5., poll_interval=0.05).is_analyzed
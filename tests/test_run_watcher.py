@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from typing import Sequence
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from opentrons_http_api.defs.enums import EngineStatus
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.run_watcher import RunWatcher, AsyncRunWatcher, _RunWatcherBase
+
+
+INTERVALS = {'interval': 0.01, 'min_interval': 0.001, 'max_interval': 0.02}
+
+
+def _responses(statuses: Sequence[str]) -> list:
+    return [{'data': {'id': 'run_123', 'status': status}}
+            for status in statuses]
+
+
+def _api(statuses: Sequence[str]) -> Mock:
+    api = Mock()
+    api.get_runs_run_id.side_effect = _responses(statuses)
+    return api
+
+
+STATUSES = ('idle', 'idle', 'running', 'running', 'finishing', 'succeeded')
+CHANGES = [
+    (None, EngineStatus.IDLE),
+    (EngineStatus.IDLE, EngineStatus.RUNNING),
+    (EngineStatus.RUNNING, EngineStatus.FINISHING),
+    (EngineStatus.FINISHING, EngineStatus.SUCCEEDED),
+]
+
+
+def test_iter():
+    watcher = RunWatcher(_api(STATUSES), 'run_123', **INTERVALS)
+    assert list(watcher) == CHANGES
+    assert watcher.is_finished
+    assert watcher.status is EngineStatus.SUCCEEDED
+
+    # Late subscribers get the final status
+    assert list(watcher) == [(None, EngineStatus.SUCCEEDED)]
+
+
+def test_subscribe_and_wait():
+    changes = []
+    finished = threading.Event()
+
+    watcher = RunWatcher(_api(STATUSES), 'run_123', **INTERVALS)
+    watcher.subscribe(changes.append, finished.set)
+    assert watcher.wait(timeout=5) is EngineStatus.SUCCEEDED
+    assert finished.is_set()
+    assert changes == CHANGES
+
+
+def test_wait_timeout():
+    watcher = RunWatcher(_api(['running'] * 1000), 'run_123', **INTERVALS)
+    with pytest.raises(TimeoutError):
+        watcher.wait(timeout=0.05)
+
+
+def test_errors():
+    api = Mock()
+    api.get_runs_run_id.side_effect = ConnectionError('unreachable')
+    watcher = RunWatcher(api, 'run_123', max_errors=2, **INTERVALS)
+    with pytest.raises(ConnectionError):
+        list(watcher)
+    assert isinstance(watcher.error, ConnectionError)
+    assert api.get_runs_run_id.call_count == 2
+
+
+def test_next_interval():
+    watcher = RunWatcher(Mock(), 'run_123', interval=1, min_interval=0.1, max_interval=3, backoff=2)
+    assert watcher._update(_responses(['idle'])[0], 1) == 2
+    assert watcher._update(_responses(['idle'])[0], 2) == 3
+    assert watcher._update(_responses(['running'])[0], 3) == 1
+    assert watcher._update(_responses(['stop-requested'])[0], 1) == 0.1
+    assert watcher._update(_responses(['stopped'])[0], 1) is None
+
+
+def test_async_iter():
+    async def main():
+        # Thread based watcher
+        assert [change async for change in RunWatcher(_api(STATUSES), 'run_123', **INTERVALS)] == CHANGES
+
+        # Event loop based watcher
+        api = Mock()
+        api.get_runs_run_id = AsyncMock(side_effect=_responses(STATUSES))
+        watcher = AsyncRunWatcher(api, 'run_123', **INTERVALS)
+        assert [change async for change in watcher] == CHANGES
+        assert await watcher.wait(timeout=1) is EngineStatus.SUCCEEDED
+
+    asyncio.run(main())
+
+
+def test_shared_watcher():
+    client = RobotClient('some_host')
+    client._api = _api(STATUSES)
+
+    watcher = client.watch_run('run_123', **INTERVALS)
+    assert client.watch_run('run_123') is watcher
+    assert client.watch_run('run_456') is not watcher
+
+    # Two subscribers share one poller
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(list(watcher)))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(results) == 2
+    assert client._api.get_runs_run_id.call_count == len(STATUSES)
+
+    # A finished watcher is replaced
+    assert client.watch_run('run_123') is not watcher
+
+
+def test_incomplete_watcher():
+    class Watcher(_RunWatcherBase):
+        def _start(self) -> None:
+            pass
+
+    # Fails when created rather than when the last subscriber unsubscribes
+    with pytest.raises(TypeError):
+        Watcher('run_123')
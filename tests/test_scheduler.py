@@ -0,0 +1,147 @@
+from typing import Iterator, List
+from unittest.mock import patch
+
+import pytest
+
+from opentrons_http_api.defs.enums import Action
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.scheduler import Job, JobFailed, JobState, Scheduler
+from opentrons_http_api.utils.fake_robot import FakeRobot
+from opentrons_http_api.utils.parameterize_protocol import Parameter
+
+
+PROTOCOL = b"NUM_FLASHES = '''parameter: num_flashes'''\n"
+
+
+def _job(priority: int = 0, max_retries: int = 0) -> Job:
+    return Job(PROTOCOL, parameters=[Parameter('num_flashes', int, 3)], priority=priority, max_retries=max_retries)
+
+
+@pytest.fixture
+def robots() -> Iterator[List[FakeRobot]]:
+    # Robots on separate loopback addresses with the same port, since the scheduler uses one port for all hosts
+    robots = [FakeRobot('127.0.0.1', run_duration=0.1)]
+    robots[0].start()
+    robots.append(FakeRobot('127.0.0.2', port=robots[0].port, run_duration=0.1))
+    robots[1].start()
+    yield robots
+    for robot in robots:
+        robot.stop()
+
+
+def _scheduler(robots: List[FakeRobot], **kwargs) -> Scheduler:
+    return Scheduler([robot.host for robot in robots], port=robots[0].port, timeout=5, poll_interval=0.01, **kwargs)
+
+
+def test_job_files():
+    protocol, labware = Job(PROTOCOL, 'flash.py', [Parameter('num_flashes', int, 3)],
+                            labware_definitions=[('labware.json', b'{}')]).files()
+    assert (protocol.name, protocol.read()) == ('flash.py', b'NUM_FLASHES = 3\n')
+    assert (labware.name, labware.read()) == ('labware.json', b'{}')
+
+
+def test_run_jobs(robots: List[FakeRobot]):
+    with _scheduler(robots) as scheduler:
+        handles = scheduler.submit_many([_job() for _ in range(4)])
+        assert scheduler.wait(timeout=10)
+
+    assert all(handle.state is JobState.SUCCEEDED for handle in handles)
+    assert {handle.host for handle in handles} == {robot.host for robot in robots}
+    assert all(handle.result().status_.is_done and handle.attempts == 1 for handle in handles)
+    assert sum(robot.requests[('POST', '/runs')] for robot in robots) == 4
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit(_job())
+
+
+def test_priority(robots: List[FakeRobot]):
+    with _scheduler(robots[:1]) as scheduler:
+        low = scheduler.submit_many([_job(), _job()])
+        high = scheduler.submit(_job(priority=1))
+
+    assert [handle.state for handle in (*low, high)] == [JobState.SUCCEEDED] * 3
+    # The first job may have started before the others were submitted
+    run_ids = [run.id for run in RobotClient(robots[0].host, port=robots[0].port).runs()]
+    assert run_ids.index(high.run_ids[0]) < run_ids.index(low[1].run_ids[0])
+
+
+def test_retries(robots: List[FakeRobot]):
+    robots[0].fail_runs = 1
+    with _scheduler(robots[:1]) as scheduler:
+        retried = scheduler.submit(_job(max_retries=1))
+        retried.wait(timeout=10)
+        robots[0].fail_runs = 2
+        failed = scheduler.submit(_job(max_retries=1))
+
+    assert retried.state is JobState.SUCCEEDED and retried.attempts == 2 and len(retried.run_ids) == 2
+    assert failed.state is JobState.FAILED and failed.attempts == 2
+    with pytest.raises(JobFailed):
+        failed.result()
+
+
+def test_unreachable(robots: List[FakeRobot]):
+    with _scheduler(robots[:1], max_watch_errors=2) as scheduler:
+        client = scheduler._clients[robots[0].host]
+        watch_run = client.watch_run
+        # Each watcher stops after its first failed poll
+        with patch.object(client, 'watch_run', lambda run_id, **kwargs: watch_run(run_id, max_errors=1, **kwargs)), \
+                patch.object(client._api, 'get_runs_run_id', side_effect=ConnectionError('unreachable')):
+            handle = scheduler.submit(_job(max_retries=1))
+            assert handle.wait(timeout=10)
+
+    assert handle.state is JobState.FAILED and handle.attempts == 2
+    assert isinstance(handle.error, ConnectionError)
+
+def test_waits_for_idle(robots: List[FakeRobot]):
+    client = RobotClient(robots[0].host, port=robots[0].port)
+    protocol_id = client.upload_protocol(_job().files()[0]).id
+    run_id = client.create_run(protocol_id).id
+
+    with _scheduler(robots[:1]) as scheduler:
+        handle = scheduler.submit(_job())
+        assert not handle.wait(timeout=0.2)
+        assert handle.state is JobState.STAGED
+
+        client.action_run(run_id, Action.STOP)
+        assert handle.result(timeout=10).status_.is_done
+
+
+def test_max_jobs(robots: List[FakeRobot]):
+    with _scheduler(robots, max_jobs={robots[0].host: 2, robots[1].host: 0}) as scheduler:
+        handles = scheduler.submit_many([_job() for _ in range(3)])
+        assert scheduler.wait(timeout=10)
+
+    assert {handle.host for handle in handles} == {robots[0].host}
+
+
+def test_idle_robots_first(robots: List[FakeRobot]):
+    robots[0].run_duration = robots[1].run_duration = 1.
+    with _scheduler(robots, max_jobs=2) as scheduler:
+        first = scheduler.submit(_job())
+        while first.state is not JobState.RUNNING:
+            first.wait(timeout=0.01)
+        # Goes to the idle robot rather than being staged on the busy one
+        second = scheduler.submit(_job())
+        assert scheduler.wait(timeout=10)
+
+    assert first.host != second.host
+
+    # A worker that already has jobs doesn't take another while a worker without jobs is waiting for one
+    scheduler = Scheduler([])
+    handle = scheduler.submit(_job())
+    scheduler._idle = 1
+    assert scheduler._take(block=False) is None
+    scheduler._idle = 0
+    assert scheduler._take(block=False) is handle
+    scheduler.close()
+
+
+def test_cancel(robots: List[FakeRobot]):
+    scheduler = _scheduler(robots[:1])
+    handles = scheduler.submit_many([_job() for _ in range(3)])
+    assert scheduler.cancel(handles[2])
+    assert not scheduler.cancel(handles[2])
+    scheduler.close(wait=False)
+
+    assert handles[2].state is JobState.CANCELLED
+    assert all(handle.done for handle in handles)
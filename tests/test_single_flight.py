@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from opentrons_http_api.api import API
+from opentrons_http_api.async_api import AsyncAPI
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.single_flight import SingleFlight
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+NUM_CALLERS = 8
+
+
+@pytest.fixture
+def robot():
+    with FakeRobot(latency=0.2, num_runs=2) as robot:
+        yield robot
+
+
+def _concurrently(function, *args):
+    """
+    Call a function from many threads at once, returning the results or exceptions.
+    """
+    barrier = threading.Barrier(NUM_CALLERS)
+
+    def call(_):
+        barrier.wait()
+        try:
+            return function(*args)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(NUM_CALLERS) as executor:
+        return list(executor.map(call, range(NUM_CALLERS)))
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'value': len(calls)}
+
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(flight.do, 'key', function)
+        started.wait()
+        second = executor.submit(flight.do, 'key', function)
+        assert flight.in_flight() == 1
+        release.set()
+        assert first.result() is second.result()
+    assert len(calls) == 1 and flight.in_flight() == 0
+
+    # Calls after the call in flight finished call again
+    assert flight.do('key', function) == {'value': 2}
+
+
+def test_coalesce(robot: FakeRobot):
+    with API(robot.host, port=robot.port, coalesce=(Paths.HEALTH, Paths.RUNS_RUN_ID), pool_maxsize=NUM_CALLERS) as api:
+        results = _concurrently(api.get_health)
+        assert all(result == results[0] for result in results)
+        assert robot.requests[('GET', Paths.HEALTH)] == 1
+
+        # Errors are shared too
+        results = _concurrently(api.get_runs_run_id, 'missing')
+        assert all(isinstance(result, requests.HTTPError) for result in results)
+        assert robot.requests[('GET', Paths.RUNS_RUN_ID)] == 1
+
+        # Only identical requests are coalesced
+        run_ids = [run['id'] for run in api.get_runs()['data']]
+        with ThreadPoolExecutor(NUM_CALLERS) as executor:
+            runs = list(executor.map(api.get_runs_run_id, run_ids * (NUM_CALLERS // 2)))
+        assert [run['data']['id'] for run in runs] == run_ids * (NUM_CALLERS // 2)
+        assert robot.requests[('GET', Paths.RUNS_RUN_ID)] == 1 + len(run_ids)
+
+        # Paths that weren't opted in aren't coalesced
+        _concurrently(api.get_robot_lights)
+        assert robot.requests[('GET', Paths.ROBOT_LIGHTS)] == NUM_CALLERS
+
+
+def test_coalesce_async(robot: FakeRobot):
+    async def main():
+        async with AsyncAPI(robot.host, port=robot.port, coalesce=API.COALESCED_PATHS) as api:
+            results = await asyncio.gather(*(api.get_health() for _ in range(NUM_CALLERS)))
+            assert all(result is results[0] for result in results)
+            assert robot.requests[('GET', Paths.HEALTH)] == 1
+
+            # Cancelling the first caller doesn't cancel the request for the others
+            first = asyncio.ensure_future(api.get_runs())
+            others = asyncio.gather(*(api.get_runs() for _ in range(NUM_CALLERS - 1)))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            results = await others
+            assert all(len(result['data']) == 2 for result in results)
+            assert robot.requests[('GET', Paths.RUNS)] == 1
+            assert api._single_flight.in_flight() == 0
+
+    asyncio.run(main())
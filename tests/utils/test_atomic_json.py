@@ -0,0 +1,32 @@
+import json
+import threading
+
+import pytest
+
+from opentrons_http_api.utils.atomic_json import dump_atomic
+
+
+def test_dump_atomic(tmp_path):
+    path = tmp_path / 'data.json'
+    dump_atomic({'a': 1}, str(path))
+    assert json.loads(path.read_text()) == {'a': 1}
+
+    # The file is unchanged, and no temporary file is left, if writing fails
+    with pytest.raises(TypeError):
+        dump_atomic({'a': object()}, str(path))
+    assert json.loads(path.read_text()) == {'a': 1}
+    assert [p.name for p in tmp_path.iterdir()] == ['data.json']
+
+
+def test_concurrent(tmp_path):
+    path = tmp_path / 'data.json'
+    values = [{'value': 'x' * 10000 * i} for i in range(8)]
+    threads = [threading.Thread(target=dump_atomic, args=(value, str(path))) for value in values]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One of the writes, not a mix of them
+    assert json.loads(path.read_text()) in values
+    assert [p.name for p in tmp_path.iterdir()] == ['data.json']
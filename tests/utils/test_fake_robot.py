@@ -0,0 +1,79 @@
+from io import BytesIO
+
+import pytest
+import requests
+
+from opentrons_http_api.defs.enums import Action, EngineStatus, SettingId
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+
+
+@pytest.fixture
+def robot():
+    with FakeRobot(num_runs=3, num_protocols=2, num_commands=10, run_duration=0.2) as robot:
+        yield robot
+
+
+@pytest.fixture
+def client(robot: FakeRobot):
+    with RobotClient(robot.host, port=robot.port, timeout=5) as client:
+        yield client
+
+
+def test_general(robot: FakeRobot, client: RobotClient):
+    assert client.health().name == 'fake-robot'
+    assert client.robot_settings().name == 'fake-robot'
+
+    client.set_lights(True)
+    assert client.lights()
+
+    client.set_setting(SettingId.SHORT_FIXED_TRASH, True)
+    assert {setting.id: setting.value for setting in client.settings()}['shortFixedTrash']
+
+    assert robot.requests[('POST', Paths.ROBOT_LIGHTS)] == 1
+
+    with pytest.raises(requests.HTTPError):
+        client.run('not_a_run')
+
+
+def test_run(client: RobotClient):
+    assert len(client.runs()) == 3
+    assert len(client.protocols()) == 2
+
+    protocol_file = BytesIO(b'protocol')
+    protocol_file.name = 'protocol.py'
+    protocol_info = client.upload_protocol(protocol_file)
+    assert protocol_info.files[0]['name'] == 'protocol.py'
+    assert client.protocol(protocol_info.id).analysisSummaries[0]['status'] == 'completed'
+
+    assert client.current_run() is None
+    run_info = client.create_run(protocol_info.id)
+    assert run_info.status_.is_idle
+    assert client.current_run().id == run_info.id
+    assert len(client.runs()) == 4
+
+    client.action_run(run_info.id, Action.PLAY)
+    assert client.watch_run(run_info.id, interval=0.02).wait(timeout=5) is EngineStatus.SUCCEEDED
+
+    run_info = client.run(run_info.id)
+    assert run_info.completedAt is not None
+    commands = list(client.iter_commands(run_info.id, page_length=3))
+    assert len(commands) == 10
+    assert client.run_command(run_info.id, commands[-1]['id'])['result']
+
+
+def test_stop(client: RobotClient):
+    run_info = client.create_run('protocol_0')
+    client.action_run(run_info.id, Action.PLAY)
+    client.action_run(run_info.id, Action.STOP)
+    assert client.run(run_info.id).status_.status is EngineStatus.STOPPED
+
+
+def test_fail(robot: FakeRobot, client: RobotClient):
+    robot.fail_runs = 1
+    run_info = client.create_run('protocol_0')
+    client.action_run(run_info.id, Action.PLAY)
+    assert client.watch_run(run_info.id, interval=0.02).wait(timeout=5) is EngineStatus.FAILED
+    assert client.run(run_info.id).errors_[0].detail == 'protocol failed'
+    assert robot.fail_runs == 0
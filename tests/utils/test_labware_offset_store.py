@@ -0,0 +1,84 @@
+import pytest
+
+from opentrons_http_api.defs.dict_data import LabwareOffset, RunInfo
+from opentrons_http_api.defs.enums import Action
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+from opentrons_http_api.utils.labware_offset_store import LabwareOffsetStore
+
+
+PLATE = 'opentrons/corning_96_wellplate_360ul_flat/2'
+TIPS = 'opentrons/opentrons_96_tiprack_300ul/1'
+
+
+def _offset(definition_uri: str, slot_name: str, x: float) -> dict:
+    return {'definitionUri': definition_uri, 'location': {'slotName': slot_name}, 'vector': {'x': x, 'y': 0., 'z': 0.}}
+
+
+def _run(run_id: str, created_at: str, offsets: list) -> RunInfo:
+    return RunInfo.from_dict({'id': run_id, 'createdAt': created_at,
+                              'labwareOffsets': [{**offset, 'id': 'id', 'createdAt': created_at}
+                                                 for offset in offsets]})
+
+
+def test_store(tmp_path):
+    path = tmp_path / 'offsets.json'
+    store = LabwareOffsetStore(str(path))
+    store.add([_offset(PLATE, '1', 0.1), LabwareOffset.create(TIPS, {'slotName': '2'}, {'x': 0.2, 'y': 0., 'z': 0.})])
+    assert len(store) == 2 and (TIPS, '2') in store
+    assert store.get(TIPS, '2').vector_.x == 0.2
+    assert store.get(TIPS, '3') is None
+
+    # The dicts are only rebuilt after a change
+    dicts = store.dicts()
+    assert store.dicts() is dicts
+    store.add([_offset(PLATE, '1', 0.3)])
+    assert store.dicts() is not dicts
+    assert store.dicts() == (_offset(TIPS, '2', 0.2), _offset(PLATE, '1', 0.3))
+
+    store.remove(TIPS, '2')
+    assert [offset.definitionUri for offset in store] == [PLATE]
+
+    # Persisted
+    assert LabwareOffsetStore(str(path)).dicts() == (_offset(PLATE, '1', 0.3), )
+
+
+def test_harvest():
+    store = LabwareOffsetStore()
+    runs = [_run('run_2', '2024-01-02', [_offset(PLATE, '1', 0.2)]),
+            _run('run_1', '2024-01-01', [_offset(PLATE, '1', 0.1), _offset(TIPS, '2', 0.1)])]
+    assert store.harvest(runs) == 2
+    # Later runs replace the offsets of earlier runs
+    assert store.get(PLATE, '1').vector['x'] == 0.2
+    assert store.get(TIPS, '2').vector['x'] == 0.1
+
+    # Runs are only harvested once
+    store.add([_offset(PLATE, '1', 0.5)])
+    assert store.harvest(runs) == 0
+    assert store.get(PLATE, '1').vector['x'] == 0.5
+
+
+def test_runs():
+    store = LabwareOffsetStore()
+    store.add([_offset(PLATE, '1', 0.1), _offset(TIPS, '2', 0.2)])
+
+    with FakeRobot(num_protocols=1) as robot, RobotClient(robot.host, port=robot.port) as client:
+        run_info = client.create_run('protocol_0', labware_offsets=store)
+        assert [offset.slotName for offset in run_info.labwareOffsets_] == ['1', '2']
+
+        # Offsets as dicts and LabwareOffset objects can be mixed
+        run_info = client.create_run('protocol_0', [_offset(PLATE, '3', 0.3), store.get(TIPS, '2')])
+        assert len(run_info.labwareOffsets) == 2
+        assert client.create_run('protocol_0', []).labwareOffsets == []
+
+        added = client.add_labware_offsets(run_info.id, store)
+        assert [offset.slotName for offset in added] == ['1', '2'] and all(offset.id for offset in added)
+        assert len(client.run(run_info.id).labwareOffsets) == 4
+
+        # The robot's IDs aren't stored
+        assert store.harvest([client.run(run_info.id)]) == 1
+        assert len(store) == 3 and 'id' not in store.dicts()[0]
+
+        client.action_run(run_info.id, Action.PLAY)
+        with pytest.raises(Exception):
+            client.add_labware_offsets(run_info.id, store)
@@ -0,0 +1,77 @@
+import json
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+from opentrons_http_api.defs.paths import Paths
+from opentrons_http_api.robot_client import RobotClient
+from opentrons_http_api.utils.fake_robot import FakeRobot
+from opentrons_http_api.utils.labware_registry import LabwareRegistry, definition_uri, missing_definitions
+
+
+PLATE = 'custom_beta/my_plate_96_wellplate/1'
+TUBES = 'custom_beta/my_tube_rack_24/1'
+
+
+def _definition(load_name: str, version: int = 1, depth: float = 10.) -> dict:
+    return {'namespace': 'custom_beta', 'version': version, 'parameters': {'loadName': load_name},
+            'wells': {'A1': {'depth': depth}}}
+
+
+def test_registry(tmp_path):
+    path = tmp_path / 'plate.json'
+    path.write_text(json.dumps(_definition('my_plate_96_wellplate'), indent=2))
+
+    registry = LabwareRegistry()
+    with patch('opentrons_http_api.utils.labware_registry.json.loads', side_effect=json.loads) as loads:
+        assert registry.add(str(path)) == PLATE
+        # The same file, or the same contents from another source, aren't parsed again
+        assert registry.add(str(path)) == PLATE
+        f = BytesIO(path.read_bytes())
+        assert registry.add(f) == PLATE and f.tell() == 0
+        assert loads.call_count == 1
+
+        # The same definition formatted differently is parsed, but has the same hash
+        assert registry.add(json.dumps(_definition('my_plate_96_wellplate')).encode()) == PLATE
+        assert loads.call_count == 2
+
+    digest = registry.digest(PLATE)
+    assert registry.add(_definition('my_plate_96_wellplate')) == PLATE
+    assert registry.digest(PLATE) == digest
+    assert len(registry) == 1 and PLATE in registry
+    assert registry.get(PLATE) == _definition('my_plate_96_wellplate')
+
+    # Changed contents need a new version
+    with pytest.raises(ValueError):
+        registry.add(_definition('my_plate_96_wellplate', depth=11.))
+    assert registry.add(_definition('my_plate_96_wellplate', version=2, depth=11.)).endswith('/2')
+
+    registry.remove(PLATE)
+    assert PLATE not in registry and len(registry) == 1
+
+
+def test_missing():
+    registry = LabwareRegistry()
+    registry.add(_definition('my_plate_96_wellplate'))
+    registry.add(_definition('my_tube_rack_24'))
+
+    loaded = [_definition('my_plate_96_wellplate')]
+    assert [definition_uri(definition) for definition in registry.missing(loaded)] == [TUBES]
+    assert missing_definitions([_definition('my_plate_96_wellplate')], loaded) == ()
+
+
+def test_add_labware_definitions():
+    registry = LabwareRegistry()
+    registry.add(_definition('my_plate_96_wellplate'))
+    registry.add(_definition('my_tube_rack_24'))
+
+    with FakeRobot(num_protocols=1) as robot, RobotClient(robot.host, port=robot.port) as client:
+        run_info = client.create_run('protocol_0')
+        assert client.add_labware_definitions(run_info.id, [_definition('my_plate_96_wellplate')]) == (PLATE, )
+
+        # Only the definition the run doesn't have yet is sent
+        assert client.add_labware_definitions(run_info.id, registry) == (TUBES, )
+        assert client.add_labware_definitions(run_info.id, registry) == ()
+        assert robot.requests[('POST', Paths.RUNS_RUN_ID_LABWARE_DEFINITIONS)] == 2
+        assert len(client.loaded_labware_definitions(run_info.id)) == 2
@@ -0,0 +1,64 @@
+import mmap
+from io import BytesIO
+
+import pytest
+from urllib3 import encode_multipart_formdata
+
+from opentrons_http_api.utils.multipart import MultipartEncoder
+
+
+def _file(content: bytes, name: str) -> BytesIO:
+    f = BytesIO(content)
+    f.name = f'/some/dir/{name}'
+    return f
+
+
+def test_encoding():
+    protocol = b'protocol' * 1000
+    labware = b'{"labware": 1}'
+
+    encoder = MultipartEncoder([('files', _file(protocol, 'protocol.py')), ('files', _file(labware, 'labware.json'))],
+                               chunk_size=100, boundary='boundary')
+    assert encoder.content_type == 'multipart/form-data; boundary=boundary'
+
+    # Matches the encoding used by requests
+    expected, _ = encode_multipart_formdata([('files', ('protocol.py', protocol, 'application/octet-stream')),
+                                             ('files', ('labware.json', labware, 'application/octet-stream'))],
+                                            boundary='boundary')
+    assert len(encoder) == len(expected)
+    assert b''.join(encoder) == expected
+
+
+def test_read():
+    progress = []
+    encoder = MultipartEncoder([('files', BytesIO(b'abc'), 'a.py')], chunk_size=1,
+                               progress=lambda sent, total: progress.append((sent, total)))
+
+    first = encoder.read(10)
+    assert len(first) == 10
+    rest = encoder.read()
+    assert b'abc' in first + rest
+    assert encoder.read() == b''
+    assert progress == [(10, len(encoder)), (len(encoder), len(encoder))]
+
+
+def test_file_position():
+    f = BytesIO(b'headerbody')
+    f.seek(6)
+    body = MultipartEncoder([('files', f, 'a.py')], boundary='boundary').read()
+    assert b'body' in body and b'header' not in body
+
+
+def test_mmap(tmp_path):
+    path = tmp_path / 'protocol.py'
+    path.write_bytes(b'protocol')
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        assert b'protocol' in MultipartEncoder([('files', m, 'protocol.py')]).read()
+
+
+def test_file_changed():
+    f = BytesIO(b'abc')
+    encoder = MultipartEncoder([('files', f, 'a.py')])
+    f.truncate(1)
+    with pytest.raises(ValueError):
+        encoder.read()
@@ -2,7 +2,7 @@ from typing import Union, Type
 
 import pytest
 
-from opentrons_http_api.utils.parameterize_protocol import Parameter, inject_parameters
+from opentrons_http_api.utils.parameterize_protocol import Parameter, ProtocolTemplate, inject_parameters
 
 
 @pytest.mark.parametrize('name, type_, value, token_b, value_b', [
@@ -79,3 +79,42 @@ def test_inject_parameters():
             b"NUM_FLASHES = '''parameter: num_flashes'''\nDELAY_S = '''parameter: delay_s'''",
             [Parameter('num_flashes', int, 3)]
         )
+
+
+PROTOCOL = b"NUM_FLASHES = '''parameter: num_flashes'''\nDELAY_S = '''parameter: delay_s'''\n"
+
+
+def test_protocol_template():
+    template = ProtocolTemplate(PROTOCOL)
+    assert template.names == ('num_flashes', 'delay_s')
+
+    params = [Parameter('delay_s', float, 0.2), Parameter('num_flashes', int, 3)]
+    assert template.render(params) == b"NUM_FLASHES = 3\nDELAY_S = 0.2\n"
+    assert ProtocolTemplate(b'no parameters').render([]) == b'no parameters'
+
+    for params in ([Parameter('num_flashes', int, 3)],
+                   [Parameter('num_flashes', int, 3), Parameter('delay_s', float, 0.2), Parameter('fake', int, 1)],
+                   [Parameter('num_flashes', int, 3), Parameter('num_flashes', int, 4)]):
+        with pytest.raises(ValueError):
+            template.render(params)
+
+
+@pytest.mark.parametrize('protocol', [
+    b"A = '''parameter: a'''\nB = '''parameter: a'''",
+    b"A = '''parameter: a",
+])
+def test_protocol_template_invalid(protocol: bytes):
+    with pytest.raises(ValueError):
+        ProtocolTemplate(protocol)
+
+
+@pytest.mark.parametrize('max_workers, pool_threshold', [
+    (None, 1000),
+    (2, 0),
+])
+def test_protocol_template_render_many(max_workers, pool_threshold):
+    template = ProtocolTemplate(PROTOCOL)
+    param_sets = [[Parameter('num_flashes', int, i), Parameter('delay_s', float, i / 10)]
+                  for i in range(20)]
+    assert template.render_many(param_sets, max_workers, pool_threshold) == [
+        f'NUM_FLASHES = {i}\nDELAY_S = {i / 10}\n'.encode() for i in range(20)]
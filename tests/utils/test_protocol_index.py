@@ -0,0 +1,45 @@
+import json
+from io import BytesIO
+
+from opentrons_http_api.utils.protocol_index import ProtocolIndex
+
+
+def _file(content: bytes, name: str = 'protocol.py') -> BytesIO:
+    f = BytesIO(content)
+    f.name = name
+    return f
+
+
+def test_hash_files():
+    digest = ProtocolIndex.hash_files([_file(b'protocol'), _file(b'labware', 'labware.json')])
+    assert digest == ProtocolIndex.hash_files([_file(b'protocol'), _file(b'labware', 'labware.json')])
+    assert digest != ProtocolIndex.hash_files([_file(b'protoco'), _file(b'llabware', 'labware.json')])
+    assert digest != ProtocolIndex.hash_files([_file(b'protocol', 'other.py'), _file(b'labware', 'labware.json')])
+
+    # File positions are restored
+    f = _file(b'protocol')
+    f.seek(2)
+    assert ProtocolIndex.hash_files([f]) == ProtocolIndex.hash_files([_file(b'otocol')])
+    assert f.tell() == 2
+
+
+def test_index(tmp_path):
+    path = tmp_path / 'index.json'
+    index = ProtocolIndex(str(path))
+    index.put('robot_1', 'abc', 'protocol_1')
+    index.put('robot_1', 'def', 'protocol_2')
+    index.put('robot_2', 'abc', 'protocol_3')
+
+    assert index.get('robot_1', 'abc') == 'protocol_1'
+    assert index.get('robot_2', 'abc') == 'protocol_3'
+    assert index.get('robot_3', 'abc') is None
+
+    index.remove('robot_2', 'abc')
+    assert index.get('robot_2', 'abc') is None
+
+    index.prune('robot_1', ['protocol_2'])
+    assert index.get('robot_1', 'abc') is None
+
+    # Persisted
+    assert json.loads(path.read_text()) == {'robot_1': {'def': 'protocol_2'}, 'robot_2': {}}
+    assert ProtocolIndex(str(path)).get('robot_1', 'def') == 'protocol_2'